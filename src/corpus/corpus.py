@@ -1,14 +1,22 @@
 # SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
 # SPDX-License-Identifier: MIT
 
+import os
 import sys
 import click
 import gitlab
 import logging
 from corpus.extract import Extractor
 from corpus.export import Exporter
-from corpus.filter import Filter
+from corpus.filter import Filter, run_filters
+from corpus.utils.corpus_index import CorpusIndex, HASH_COLUMNS
+from corpus.synth import Synthesizer
+from corpus.utils.benchmark_suite import SIZES, compare, load_results, run_suite, save_results
+from corpus.utils.export_benchmark import run_benchmark
 from corpus.utils.helpers import Corpus, Config, load_neo4j_config
+from corpus.utils.neo4j_writer import BATCH_SIZE, connect
+from corpus.utils import profiling
+from corpus.utils.pipeline import QUEUE_SIZE, build_corpus
 
 logging.basicConfig(filename="corpus.log", filemode="w")
 logging.getLogger().addHandler((logging.StreamHandler(sys.stdout)))
@@ -29,8 +37,15 @@ command_config = click.make_pass_decorator(Config, ensure=True)
               help='Name of the GitLab instance, you want to analyze, if not the default value of your configuration')
 @click.option('--verbose', '-v', default=False,
               help='Prints more output during execution')
+@click.option('--profile', is_flag=True,
+              help='If set, the stages of the command and their steps are timed and a report is written')
+@click.option('--profile-report', default='out/profile.json',
+              help='Specifies the JSON file of the profiling report', show_default=True)
+@click.option('--profile-dump',
+              help='Directory, into which cProfile statistics and tracemalloc snapshots of every stage are written. '
+                   'Implies --profile')
 @command_config
-def cli(config, gl_config, neo4j_config, source, verbose):
+def cli(config, gl_config, neo4j_config, source, verbose, profile, profile_report, profile_dump):
     """Entry point to the corpus cli.
 
     :param config: 
@@ -38,11 +53,36 @@ def cli(config, gl_config, neo4j_config, source, verbose):
     :param neo4j_config: 
     :param source: 
     :param verbose: 
+    :param profile: 
+    :param profile_report: 
+    :param profile_dump: 
 
     """
     config.gl = gitlab.Gitlab.from_config(source, [gl_config])
     config.verbose = verbose
     config.neo4j_config = load_neo4j_config(neo4j_config)
+    if profile or profile_dump:
+        profiling.start(profile_dump)
+        context = click.get_current_context()
+        context.call_on_close(lambda: finish_profile(context.invoked_subcommand, profile_report))
+
+
+def finish_profile(command, report_file):
+    """This function stops the profiling of a command, prints the summary table and writes the report.
+
+    :param command: Name of the profiled command
+    :param report_file: Path to the JSON file of the report
+
+    """
+    profiler = profiling.stop()
+    if profiler is None:
+        return
+    report = profiler.report(command)
+    click.echo("\n".join(profiling.format_report(report)))
+    profiling.save_report(report, report_file)
+    click.echo("Profiling report written to {}.".format(report_file))
+    for path in profiler.dump():
+        click.echo("Profile written to {}.".format(path))
 
 
 @cli.command()
@@ -56,13 +96,25 @@ def cli(config, gl_config, neo4j_config, source, verbose):
 @click.option('--out', '-o', default='out/corpus.json',
               help='Specifies the output file', show_default=True)
 @click.option('--output-format', '-F', default='json',
-              help='Specifies the output format', show_default=True)
+              help='Specifies the output format: json, console, neo4j, neo4j-csv, sqlite, parquet or arrow',
+              show_default=True)
 @click.option('--include-private', '-p', is_flag=True,
               help='If set, GitLab projects with visibility private will be included as well')
+@click.option('--pretty', is_flag=True,
+              help='If set, the output file is written as indented JSON instead of compact JSON')
+@click.option('--sync', is_flag=True,
+              help='If set, only new and changed elements are written to Neo4J')
+@click.option('--tombstone', is_flag=True,
+              help='If set together with --sync, Neo4J nodes of elements, which are not contained in the corpus '
+                   'anymore, are marked as deleted')
+@click.option('--queue-size', default=QUEUE_SIZE, type=int,
+              help='Maximal number of projects waiting between two stages of the pipeline', show_default=True)
 @corpus
 @command_config
-def build(config, corpus_data, all_elements, filter_file, out, output_format, include_private):
-    """Run the pipeline extract -> filter -> export in one command.
+def build(config, corpus_data, all_elements, filter_file, out, output_format, include_private, pretty, sync,
+          tombstone, queue_size):
+    """Run the pipeline extract -> filter -> export in one command. Every project is filtered and exported, as soon
+    as it is extracted.
 
     :param config: 
     :param corpus_data: 
@@ -71,17 +123,24 @@ def build(config, corpus_data, all_elements, filter_file, out, output_format, in
     :param out: 
     :param output_format: 
     :param include_private: 
+    :param pretty: 
+    :param sync: 
+    :param tombstone: 
+    :param queue_size: 
 
     """
     extractor = Extractor(config.verbose, config.gl, corpus=corpus_data)
     corpus_filter = Filter(config.verbose, corpus=corpus_data, from_file=False)
+    with profiling.stage("load"):
+        corpus_filter.load_filters(filter_file=filter_file)
 
-    extractor.extract(all_elements=all_elements, include_private=include_private)
-    corpus_filter.load_filters(filter_file=filter_file)
-    corpus_filter.filter()
-
-    exporter = Exporter(config, corpus=corpus_filter.filtered_corpus, format_str=output_format, from_file=False)
-    exporter.export(out=out)
+    exporter = Exporter(config, corpus=Corpus(), format_str=output_format, from_file=False, pretty=pretty, sync=sync,
+                        tombstone=tombstone)
+    with profiling.stage("build"):
+        count = build_corpus(extractor, corpus_filter, exporter, out, all_elements=all_elements,
+                             include_private=include_private, queue_size=queue_size)
+    if config.verbose:
+        click.echo("{} projects were exported.".format(count))
 
 
 @cli.command()
@@ -93,9 +152,11 @@ def build(config, corpus_data, all_elements, filter_file, out, output_format, in
               help='Specifies the output file', show_default=True)
 @click.option('--include-private', '-p', is_flag=True,
               help='If set, GitLab projects with visibility private will be included as well')
+@click.option('--pretty', is_flag=True,
+              help='If set, the output file is written as indented JSON instead of compact JSON')
 @corpus
 @command_config
-def extract(config, corpus_data, all_elements, out, include_private):
+def extract(config, corpus_data, all_elements, out, include_private, pretty):
     """Extract projects from the specified GitLab instance and write the output to a file.
 
     :param config: 
@@ -103,26 +164,36 @@ def extract(config, corpus_data, all_elements, out, include_private):
     :param all_elements: 
     :param out: 
     :param include_private: 
+    :param pretty: 
 
     """
     extractor = Extractor(config.verbose, config.gl, corpus=corpus_data)
-    exporter = Exporter(config, corpus=corpus_data, format_str="json")
+    exporter = Exporter(config, corpus=corpus_data, format_str="json", pretty=pretty)
 
-    extractor.extract(all_elements=all_elements, include_private=include_private)
-    exporter.export(out=out)
+    with profiling.stage("extract"):
+        extractor.extract(all_elements=all_elements, include_private=include_private)
+    with profiling.stage("export"):
+        exporter.export(out=out)
 
 
 @cli.command()
-@click.option('--filter-file', '-f',
-              help='File in yaml format which defines the filters to be used on the corpus',
-              default='resources/filters.yaml', show_default=True)
+@click.option('--filter-file', '-f', multiple=True,
+              help='File in yaml format which defines the filters to be used on the corpus. Can be given several '
+                   'times, together with the same number of output files',
+              default=['resources/filters.yaml'], show_default=True)
 @click.option('--input-file', '-i', default='out/corpus.json',
               help='Specifies the file to load the corpus from', show_default=True)
-@click.option('--out', '-o', default='out/corpus.json',
-              help='Specifies the output file', show_default=True)
+@click.option('--out', '-o', multiple=True, default=['out/corpus.json'],
+              help='Specifies the output file. Can be given several times, once for every filter file',
+              show_default=True)
+@click.option('--cache', is_flag=True,
+              help='Caches the results of every filter predicate next to the input file and reuses them in later '
+                   'runs on the same input file')
+@click.option('--pretty', is_flag=True,
+              help='If set, the output file is written as indented JSON instead of compact JSON')
 @corpus
 @command_config
-def filter(config, corpus_data, filter_file, input_file, out):
+def filter(config, corpus_data, filter_file, input_file, out, cache, pretty):
     """Apply filters on a previously extracted corpus.
 
     :param config: 
@@ -130,15 +201,62 @@ def filter(config, corpus_data, filter_file, input_file, out):
     :param filter_file: 
     :param input_file: 
     :param out: 
+    :param cache: 
+    :param pretty: 
 
     """
-    corpus_filter = Filter(config.verbose, corpus=corpus_data, from_file=True, file=input_file)
+    if len(filter_file) != len(out):
+        raise click.BadParameter("The number of output files must match the number of filter files.",
+                                 param_hint="'--out'")
+    if len(filter_file) > 1:
+        if cache:
+            raise click.BadParameter("The cache can only be used with a single filter file.", param_hint="'--cache'")
+        corpus_filters = []
+        for file in filter_file:
+            corpus_filters.append(Filter(config.verbose, corpus=corpus_data))
+            corpus_filters[-1].load_filters(filter_file=file)
+        with profiling.stage("filter"):
+            run_filters(corpus_filters, input_file, out, indent=4 if pretty else None)
+        return
+
+    filter_file, out = filter_file[0], out[0]
+    corpus_filter = Filter(config.verbose, corpus=corpus_data)
 
-    corpus_filter.load_filters(filter_file=filter_file)
-    corpus_filter.filter()
+    with profiling.stage("load"):
+        corpus_filter.load_filters(filter_file=filter_file)
+        corpus_filter.load_corpus(input_file, cache=cache)
+    with profiling.stage("filter"):
+        corpus_filter.filter()
 
-    exporter = Exporter(config, corpus=corpus_filter.filtered_corpus, format_str="json")
-    exporter.export(out=out)
+    exporter = Exporter(config, corpus=corpus_filter.filtered_corpus, format_str="json", pretty=pretty)
+    with profiling.stage("export"):
+        exporter.export(out=out)
+
+
+@cli.command()
+@click.option('--input-file', '-i', default='out/corpus.json',
+              help='Specifies the corpus file to be indexed', show_default=True)
+@click.option('--hash-column', '-c', multiple=True, default=HASH_COLUMNS,
+              help='String attribute to be indexed for equality filters. Can be given several times',
+              show_default=True)
+@command_config
+def index(config, input_file, hash_column):
+    """Build secondary indexes for a previously extracted corpus, which speed up later filters on it.
+
+    :param config: 
+    :param input_file: 
+    :param hash_column: 
+
+    """
+    click.echo("Indexing...")
+    try:
+        with profiling.stage("index"):
+            corpus_index = CorpusIndex.build(input_file, hash_column)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--input-file'")
+    corpus_index.save()
+    if config.verbose:
+        click.echo("{} projects were indexed.".format(corpus_index.size))
 
 
 @cli.command()
@@ -147,10 +265,18 @@ def filter(config, corpus_data, filter_file, input_file, out):
 @click.option('--out', '-o', default='out/corpus.json',
               help='Specifies the output file', show_default=True)
 @click.option('--output-format', '-F', default='json',
-              help='Specifies the output format', show_default=True)
+              help='Specifies the output format: json, console, neo4j, neo4j-csv, sqlite, parquet or arrow',
+              show_default=True)
+@click.option('--pretty', is_flag=True,
+              help='If set, the output file is written as indented JSON instead of compact JSON')
+@click.option('--sync', is_flag=True,
+              help='If set, only new and changed elements are written to Neo4J')
+@click.option('--tombstone', is_flag=True,
+              help='If set together with --sync, Neo4J nodes of elements, which are not contained in the corpus '
+                   'anymore, are marked as deleted')
 @corpus
 @command_config
-def export(config, corpus_data, input_file, out, output_format):
+def export(config, corpus_data, input_file, out, output_format, pretty, sync, tombstone):
     """Export a previously extracted (and maybe filtered) corpus to another format.
 
     :param config: 
@@ -158,10 +284,159 @@ def export(config, corpus_data, input_file, out, output_format):
     :param input_file: 
     :param out: 
     :param output_format: 
+    :param pretty: 
+    :param sync: 
+    :param tombstone: 
+
+    """
+    with profiling.stage("load"):
+        exporter = Exporter(config, corpus=corpus_data, format_str=output_format, from_file=True, file=input_file,
+                            pretty=pretty, sync=sync, tombstone=tombstone)
+    with profiling.stage("export"):
+        exporter.export(out=out)
+
+
+@cli.command()
+@click.option('--projects', '-P', default=1000, type=int,
+              help='Number of projects to be generated', show_default=True)
+@click.option('--seed', default=0, type=int,
+              help='Seed of the corpus. The same seed and options generate the same corpus', show_default=True)
+@click.option('--users', type=int,
+              help='Number of users shared by the projects [default: half the number of projects]')
+@click.option('--distribution-file', '-d',
+              help='File in yaml format which defines the distributions of the numbers of elements and the '
+                   'frequencies of the languages')
+@click.option('--out', '-o', default='out/synthetic.jsonl',
+              help='Specifies the output file', show_default=True)
+@click.option('--pretty', is_flag=True,
+              help='If set, the output file is written as indented JSON instead of compact JSON')
+@command_config
+def synth(config, projects, seed, users, distribution_file, out, pretty):
+    """Generate a synthetic corpus for scale tests and write it to a file.
+
+    :param config: 
+    :param projects: 
+    :param seed: 
+    :param users: 
+    :param distribution_file: 
+    :param out: 
+    :param pretty: 
+
+    """
+    synthesizer = Synthesizer(projects, seed, users)
+    if distribution_file is not None:
+        try:
+            synthesizer.load_distributions(distribution_file)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--distribution-file'")
+    click.echo("Generating...")
+    with profiling.stage("synth"):
+        synthesizer.write(out, indent=4 if pretty else None)
+    if config.verbose:
+        click.echo("{} projects were written to {}.".format(projects, out))
+
+
+@cli.command()
+@click.option('--projects', '-P', default=1000, type=int,
+              help='Number of synthetic projects to be exported', show_default=True)
+@click.option('--seed', default=0, type=int,
+              help='Seed of the synthetic corpus', show_default=True)
+@click.option('--workers', '-w', default=1, type=int,
+              help='Number of concurrent writers', show_default=True)
+@click.option('--batch-size', '-b', default=BATCH_SIZE, type=int,
+              help='Number of nodes or relationships written in one transaction', show_default=True)
+@click.option('--neo4j', is_flag=True,
+              help='If set, the export is written to the database of the Neo4J config file, otherwise the round-trips '
+                   'are only counted')
+@command_config
+def benchmark(config, projects, seed, workers, batch_size, neo4j):
+    """Measure the Neo4J export of a synthetic corpus.
+
+    :param config: 
+    :param projects: 
+    :param seed: 
+    :param workers: 
+    :param batch_size: 
+    :param neo4j: 
+
+    """
+    graph = connect(config.neo4j_config) if neo4j else None
+    result = run_benchmark(list(Synthesizer(projects, seed).generate()), workers=workers, batch_size=batch_size,
+                           graph=graph)
+    click.echo("{} projects: {} nodes and {} relationships in {:.2f} seconds ({:.0f} entities per second)".format(
+        result["projects"], result["nodes"], result["relationships"], result["seconds"],
+        result["entities_per_second"]))
+    click.echo("{} round-trips ({:.2f} per project), {} transactions ({:.2f} per project), {} rows".format(
+        result["round_trips"], result["round_trips_per_project"], result["transactions"],
+        result["transactions_per_project"], result["rows"]))
+
+
+@cli.command(name='benchmark-suite')
+@click.option('--size', '-s', multiple=True, type=int, default=SIZES,
+              help='Number of projects of a synthetic corpus. Can be given several times', show_default=True)
+@click.option('--case', '-c', multiple=True,
+              help='Case to be run, e.g. extract, filter-regex or export-sqlite, or a stage like filter. Can be given '
+                   'several times [default: all cases]')
+@click.option('--filter-file', '-f', multiple=True,
+              help='Additional filter file, e.g. a filter template, which is run as case filter-<name of the file>. '
+                   'Can be given several times')
+@click.option('--repeat', '-r', default=1, type=int,
+              help='Number of timed runs of every case, the fastest run is reported', show_default=True)
+@click.option('--seed', default=0, type=int,
+              help='Seed of the synthetic corpora', show_default=True)
+@click.option('--no-isolate', is_flag=True,
+              help='If set, all cases run in the same process, so that the peak RSS is not measured per case')
+@click.option('--out', '-o', default='out/benchmark.json',
+              help='Specifies the file the results are written to', show_default=True)
+@click.option('--input-file', '-i',
+              help='Compares the results of an earlier run with the baseline instead of running the suite')
+@click.option('--baseline', '-b',
+              help='Results of an earlier run, e.g. of the main branch, to which the results are compared')
+@click.option('--threshold', '-t', default=0.2, type=float,
+              help='Allowed relative increase of the wall time and memory compared to the baseline', show_default=True)
+@command_config
+def benchmark_suite(config, size, case, filter_file, repeat, seed, no_isolate, out, input_file, baseline, threshold):
+    """Measure the extraction, filters and exports on synthetic corpora and compare the results with a baseline.
+
+    :param config: 
+    :param size: 
+    :param case: 
+    :param filter_file: 
+    :param repeat: 
+    :param seed: 
+    :param no_isolate: 
+    :param out: 
+    :param input_file: 
+    :param baseline: 
+    :param threshold: 
 
     """
-    exporter = Exporter(config, corpus=corpus_data, format_str=output_format, from_file=True, file=input_file)
-    exporter.export(out=out)
+    if input_file is not None:
+        results = load_results(input_file)
+    else:
+        filter_files = {os.path.splitext(os.path.basename(file))[0]: os.path.abspath(file) for file in filter_file}
+        results = run_suite(size, case, repeat, seed, isolate=not no_isolate, filter_files=filter_files)
+        save_results(results, out)
+        if config.verbose:
+            click.echo("Results written to {}.".format(out))
+    click.echo("{:<24} {:>8} {:>10} {:>12} {:>12} {:>14}".format("case", "projects", "seconds", "projects/s",
+                                                                  "peak RSS MB", "allocated MB"))
+    for result in results["results"]:
+        if "skipped" in result:
+            click.echo("{:<24} {:>8} skipped: {}".format(result["case"], result["size"], result["skipped"]))
+            continue
+        click.echo("{:<24} {:>8} {:>10.3f} {:>12.1f} {:>12.1f} {:>14.1f}".format(
+            result["case"], result["size"], result["seconds"], result["projects_per_second"],
+            (result["peak_rss_bytes"] or 0) / 2 ** 20, result["allocated_peak_bytes"] / 2 ** 20))
+    if baseline is not None:
+        regressions = compare(results, load_results(baseline), threshold)
+        for regression in regressions:
+            click.echo("Regression of {} in {} with {} projects: {:.4g} -> {:.4g} ({:+.0%})".format(
+                regression["metric"], regression["case"], regression["size"], regression["baseline"],
+                regression["current"], regression["ratio"] - 1))
+        if regressions:
+            raise click.ClickException("{} regressions compared to {}.".format(len(regressions), baseline))
+        click.echo("No regressions compared to {}.".format(baseline))
 
 
 if __name__ == '__main__':
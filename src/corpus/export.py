@@ -3,13 +3,11 @@
 
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import click
-import json
 import logging
-from json.decoder import JSONDecodeError
-from corpus.utils.export_models import Project as ProjectModel, NeoGraphObjectException
+from corpus.utils.export_models import Project as ProjectModel
 from corpus.utils.export_models import Namespace as NamespaceModel
-from corpus.utils.export_models import Language as LanguageModel
 from corpus.utils.export_models import User as UserModel
 from corpus.utils.export_models import File as FileModel
 from corpus.utils.export_models import Commit as CommitModel
@@ -17,9 +15,18 @@ from corpus.utils.export_models import Milestone as MilestoneModel
 from corpus.utils.export_models import Issue as IssueModel
 from corpus.utils.export_models import Mergerequest as MergerequestModel
 from corpus.utils.export_models import Release as ReleaseModel
-from py2neo import Graph, NodeMatcher
+from corpus.utils.export_models import MODELS
+from py2neo.errors import Neo4jError
 from corpus.utils.helpers import Corpus
-from corpus.utils.export_helpers import transform_language_dict, find_user_by_name
+from corpus.utils.corpus_io import load_corpus, CorpusWriter
+from corpus.utils.export_arrow import write_tables
+from corpus.utils.export_sqlite import write_database
+from corpus.utils.export_helpers import IdentityIndex, related_elements
+from corpus.utils.neo4j_csv import Neo4jCsvWriter
+from corpus.utils.neo4j_sync import HASH_PROPERTY, GraphSync, content_hash
+from corpus.utils.profiling import step
+from corpus.utils.neo4j_writer import BATCH_SIZE, GraphPartition, Neo4jWriter, connect, \
+    model_properties, neo4j_version
 
 """
 .. module:: export
@@ -32,18 +39,43 @@ try:
 except:
     pass
 
+# Number of projects, which a worker of the parallel Neo4J export writes at once
+CHUNK_SIZE = 50
+
+# Relationships of merge requests and releases to the elements of their attributes, which are matched by ID
+MERGEREQUEST_RELATIONSHIPS = [("author", "AUTHORED_BY", "User"), ("merged_by", "IS_MERGED_BY", "User"),
+                              ("closed_by", "IS_CLOSED_BY", "User"), ("assignees", "ASSIGNED_TO", "User"),
+                              ("commits", "HAS_COMMIT", "Commit"), ("close_issues", "CLOSES", "Issue")]
+RELEASE_RELATIONSHIPS = [("author", "AUTHORED_BY", "User"), ("commit", "COMMITTED_THROUGH", "Commit"),
+                         ("milestones", "BELONGS_TO", "Milestone")]
+
+# Relationships derived from the attributes of an element as tuples (type, outgoing) by the label of its node, which
+# are removed and written again in a synchronization, when the element has changed. The relationships of a project
+# to its namespace, users, languages and elements end at the project.
+OWNED_RELATIONSHIPS = {
+    "Project": [("BELONGS_TO", False), ("BELONGS_TO_PROJECT", False), ("OWNS", False), ("CONTRIBUTES_TO", False),
+                ("IS_CONTAINED_IN", False)],
+    "Commit": [("COMMITTED_BY", True)],
+    "Issue": [("AUTHORED_BY", True), ("ASSIGNED_TO", True), ("BELONGS_TO_MILESTONE", True)],
+    "Mergerequest": [(rel_type, True) for _, rel_type, _ in MERGEREQUEST_RELATIONSHIPS],
+    "Release": [(rel_type, True) for _, rel_type, _ in RELEASE_RELATIONSHIPS],
+}
+
 
 class Exporter:
     """This class provides a method to export a corpus in another format.
     
     Methods:
-        __init__(self, verbose, corpus, format_str, from_file=False, file="-")
+        __init__(self, config, corpus, format_str, from_file=False, file="-", pretty=False, sync=False,
+                 tombstone=False)
         export(self, out)
+        open_sink(self, out)
 
 
     """
 
-    def __init__(self, config, corpus, format_str, from_file=False, file="-"):
+    def __init__(self, config, corpus, format_str, from_file=False, file="-", pretty=False, sync=False,
+                 tombstone=False):
         """
         Exporter class constructor to initialize the object.
 
@@ -51,20 +83,31 @@ class Exporter:
         :param corpus: Input corpus, which will be exported
         :param from_file: Specifies, if the input corpus should be read from a file [default: ``False``]
         :param file: Path to input corpus
+        :param pretty: Writes indented JSON instead of compact JSON, if set to ``True`` [default: ``False``]
+        :param sync: Writes only new and changed elements to Neo4J, if set to ``True`` [default: ``False``]
+        :param tombstone: Marks nodes of elements, which are not contained in the corpus anymore, as deleted in a
+            synchronization, if set to ``True`` [default: ``False``]
 
         """
         self.verbose = config.verbose
         self.format = format_str
+        self.pretty = pretty
+        self.sync = None
+        self.sync_enabled = sync
+        self.tombstone = tombstone
         self.corpus = Corpus()
         self.graph = None
-        self.matcher = None
+        self.identities = IdentityIndex()
         self.neo4j_config = config.neo4j_config
+        self.json_properties = False
+        if self.neo4j_config is not None and "NEO4J" in self.neo4j_config:
+            self.json_properties = str(self.neo4j_config["NEO4J"].get("json_properties", False)).lower() in (
+                "true", "yes", "on", "1")
         if from_file:
-            with open(file, 'r') as f:
-                try:
-                    self.corpus.data = json.load(f)
-                except JSONDecodeError:
-                    log.critical("The input file does not contain valid JSON-data.")
+            try:
+                self.corpus.data = load_corpus(file)
+            except ValueError:
+                log.critical("The input file does not contain valid JSON-data.")
         else:
             self.corpus = corpus
 
@@ -77,10 +120,37 @@ class Exporter:
 
         click.echo("Exporting...")
         if self.format.lower() == "json":
-            with open(out, "w") as output:
+            with CorpusWriter(out, indent=4 if self.pretty else None) as writer:
                 if self.verbose:
                     log.info("Output written to {}".format(out))
-                json.dump(self.corpus.data, output, indent=4)
+                writer.write_corpus(self.corpus.data)
+        elif self.format.lower() in ("parquet", "arrow"):
+            if self.verbose:
+                log.info("Tables will be written to the directory {}.".format(out))
+            try:
+                counts = write_tables(self.corpus.data["Projects"], out, self.format.lower())
+            except ImportError as e:
+                log.critical(str(e))
+                return
+            if self.verbose:
+                for table, count in counts.items():
+                    log.info("{} rows written to table {}.".format(count, table))
+        elif self.format.lower() == "sqlite":
+            if self.verbose:
+                log.info("Output will be written to the SQLite database {}.".format(out))
+            counts = write_database(self.corpus.data["Projects"], out)
+            if self.verbose:
+                for table, count in counts.items():
+                    log.info("{} rows written to table {}.".format(count, table))
+        elif self.format.lower() == "neo4j-csv":
+            if self.verbose:
+                log.info("CSV files for neo4j-admin will be written to the directory {}.".format(out))
+            with Neo4jCsvWriter(out) as writer:
+                self.export_graph(writer)
+            if self.verbose:
+                log.info("{} nodes and {} relationships written.".format(writer.node_count, writer.relationship_count))
+            if writer.dropped:
+                log.warning("{} relationships to nodes, which are not exported, left out.".format(writer.dropped))
         elif self.format.lower() == "console":
             if self.verbose:
                 log.info("Output will be printed to console.")
@@ -90,159 +160,406 @@ class Exporter:
         elif self.format.lower() == "neo4j":
             if self.verbose:
                 log.info("Output will be exported to the Neo4J database.")
-            self.graph = Graph(f"{self.neo4j_config['NEO4J']['protocol']}://"
-                               f"{self.neo4j_config['NEO4J']['hostname']}:"
-                               f"{self.neo4j_config['NEO4J']['port']}",
-                               user=self.neo4j_config['NEO4J']['user'],
-                               password=self.neo4j_config['NEO4J']['password'])
-            self.matcher = NodeMatcher(self.graph)
+            self.graph = connect(self.neo4j_config)
             self.export_to_neo4j()
 
     def export_to_neo4j(self):
-        """This method exports the corpus to a neo4j database as specified in the configuration file."""
-        with click.progressbar(self.corpus.data["Projects"]) as bar:
-            for project in bar:
-                self.export_project(project)
+        """This method exports the corpus to a neo4j database as specified in the configuration file. The nodes and
+        relationships are written in batches, the batch size can be set by ``batch_size`` in the configuration file.
+        If ``workers`` is set to more than 1, the projects are written in parallel, see :meth:`export_parallel`.
+        In a synchronization, only new and changed elements and their relationships are written, see
+        :class:`corpus.utils.neo4j_sync.GraphSync`.
+
+        :returns: Tuple of the number of written nodes and relationships
+        :rtype: tuple
 
-    def export_category(self, category_model, category, project, get_or_create=False, pk=""):
         """
+        batch_size = int(self.neo4j_config['NEO4J'].get('batch_size', BATCH_SIZE))
+        workers = int(self.neo4j_config['NEO4J'].get('workers', 1))
+        self.prepare_graph()
+        start = time.time()
+        if workers > 1:
+            node_count, relationship_count = self.export_parallel(workers, batch_size)
+        else:
+            with Neo4jWriter(self.graph, batch_size, self.sync) as writer:
+                self.export_graph(writer)
+            node_count, relationship_count = writer.node_count, writer.relationship_count
+        if self.verbose:
+            duration = max(time.time() - start, 1e-9)
+            log.info("{} nodes and {} relationships exported in {:.1f} seconds ({:.0f} entities per second).".format(
+                node_count, relationship_count, duration, (node_count + relationship_count) / duration))
+        self.tombstone_removed(batch_size)
+        return node_count, relationship_count
+
+    def tombstone_removed(self, batch_size=BATCH_SIZE):
+        """This method marks the nodes of removed elements as deleted at the end of a synchronization, if requested.
 
-        :param category_model: 
-        :param category: 
-        :param project: 
-        :param get_or_create:  (Default value = False)
-        :param pk:  (Default value = "")
+        :param batch_size: Number of nodes marked in one transaction (Default value = BATCH_SIZE)
 
         """
-        try:
-            if isinstance(project[category], list):
-                for element in project[category]:
-                    try:
-                        if get_or_create:
-                            element_node = category_model.get_or_create(self.graph, element[pk], element)
-                        else:
-                            element_node = category_model.create(self.graph, element)
-                        yield element_node
-                    except NeoGraphObjectException:
-                        log.error("An element for category {} in project {} could not be exported. "
-                                  "The ID is missing.".format(category, project["id"]))
-            else:
+        if self.sync is not None and self.tombstone:
+            count = self.sync.tombstone(batch_size)
+            if self.verbose:
+                log.info("{} nodes of removed elements marked as deleted.".format(count))
+
+    def export_parallel(self, workers, batch_size=BATCH_SIZE):
+        """This method exports the corpus to a neo4j database with several concurrent transactions. First, the nodes,
+        which are shared by projects (users, languages, namespaces and milestones), are written once by a single
+        writer. Then chunks of projects are written concurrently with their nodes and relationships, each chunk by
+        its own writer; the uniqueness constraints make concurrent merges of the same node, e.g. a commit of a fork,
+        safe. Relationships to nodes of another chunk are written at the end, so that they do not depend on the order,
+        in which the chunks are written, see :class:`corpus.utils.neo4j_writer.GraphPartition`.
+
+        :param workers: Number of concurrent writers
+        :param batch_size: Number of nodes or relationships written in one transaction (Default value = BATCH_SIZE)
+        :returns: Tuple of the number of written nodes and relationships
+        :rtype: tuple
+
+        """
+        projects = self.corpus.data["Projects"]
+        self.identities = IdentityIndex.build(projects)
+        with Neo4jWriter(self.graph, batch_size, self.sync) as writer:
+            shared = GraphPartition(writer, shared=True)
+            for project in projects:
+                self.export_project(project, shared)
+        node_count, relationship_count = writer.node_count, writer.relationship_count
+
+        def export_chunk(chunk):
+            with Neo4jWriter(self.graph, batch_size, self.sync) as chunk_writer:
+                partition = GraphPartition(chunk_writer, shared=False)
+                for chunk_project in chunk:
+                    self.export_project(chunk_project, partition)
+            return len(chunk), chunk_writer, partition
+
+        partitions = []
+        chunks = [projects[index:index + CHUNK_SIZE] for index in range(0, len(projects), CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            with click.progressbar(length=len(projects)) as bar:
+                for future in as_completed([executor.submit(export_chunk, chunk) for chunk in chunks]):
+                    count, chunk_writer, partition = future.result()
+                    node_count += chunk_writer.node_count
+                    relationship_count += chunk_writer.relationship_count
+                    partitions.append(partition)
+                    bar.update(count)
+        with Neo4jWriter(self.graph, batch_size, self.sync) as writer:
+            for partition in partitions:
+                partition.write_deferred(writer)
+        return node_count, relationship_count + writer.relationship_count
+
+    def prepare_graph(self):
+        """This method creates the schema and starts the synchronization, if it is enabled."""
+        self.create_schema()
+        if self.sync_enabled:
+            self.sync = GraphSync(self.graph, {model.__primarylabel__: model.__primarykey__ for model in MODELS},
+                                  OWNED_RELATIONSHIPS)
+
+    def open_sink(self, out="-"):
+        """This method opens a sink, which exports projects one by one, e.g. while they are extracted and filtered.
+        JSON files, the console and the graph formats are written project by project. The other formats need all
+        projects to determine their columns, so their sink collects the projects and exports them on close.
+
+        :param out: Path to output file (Default value = "-")
+        :returns: Sink with the methods ``write(project)`` and ``close()``
+
+        """
+        output_format = self.format.lower()
+        if output_format == "json":
+            return CorpusWriter(out, indent=4 if self.pretty else None)
+        if output_format == "console":
+            return ConsoleSink()
+        if output_format == "neo4j-csv":
+            return GraphSink(self, Neo4jCsvWriter(out))
+        if output_format == "neo4j":
+            if self.graph is None:
+                self.graph = connect(self.neo4j_config)
+            batch_size = int(self.neo4j_config['NEO4J'].get('batch_size', BATCH_SIZE))
+            self.prepare_graph()
+            return GraphSink(self, Neo4jWriter(self.graph, batch_size, self.sync), batch_size)
+        return CollectingSink(self, out)
+
+    def create_schema(self):
+        """This method creates the uniqueness constraints and indexes of the export models, if they do not exist yet,
+        so that nodes are merged and matched by index lookups.
+
+        """
+        version = neo4j_version(self.graph)
+        for model in MODELS:
+            for statement in model.schema_statements(version):
                 try:
-                    yield category_model.create(self.graph, project[category])
-                except NeoGraphObjectException:
-                    log.error("An element of category {} in project {} could not be exported. "
-                              "The ID is missing.".format(category, project["id"]))
-        except KeyError:
-            log.info("No elements for category '{}' found in project {}.".format(category, project["id"]))
+                    self.graph.run(statement)
+                except Neo4jError as e:
+                    log.warning("The schema statement '{}' failed: {}".format(statement, e))
+
+    def export_graph(self, sink):
+        """This method adds the nodes and relationships of all projects to a writer. Users, which are referred to only
+        by name or email address, are looked up in an index of the users of the corpus. Since they may belong to
+        another project, the shared nodes of all projects are added first and then the projects, whose relationships
+        to nodes of later projects are added at the end, so that no relationship is written before its nodes,
+        whatever the batch size is, see :class:`corpus.utils.neo4j_writer.GraphPartition`.
+
+        :param sink: Writer, which receives the nodes and relationships, see
+            :class:`corpus.utils.neo4j_writer.Neo4jWriter` and :class:`corpus.utils.neo4j_csv.Neo4jCsvWriter`
+
+        """
+        projects = self.corpus.data["Projects"]
+        self.identities = IdentityIndex.build(projects)
+        shared, partition = GraphPartition(sink, shared=True), GraphPartition(sink, shared=False)
+        for project in projects:
+            self.export_project(project, shared)
+        with click.progressbar(projects) as bar:
+            for project in bar:
+                self.export_project(project, partition)
+        partition.write_deferred(sink)
+
+    def node_properties(self, model, element):
+        """This method converts an element into the properties of its node.
+
+        :param model: Export model of the element
+        :param element: The element
+        :returns: The node properties of the element and, in a synchronization, the hash of the element, which also
+            covers the attributes exported as relationships
+        :rtype: dict
 
-    def export_project(self, project):
         """
+        properties = model_properties(model, element, self.json_properties)
+        if self.sync is not None:
+            properties[HASH_PROPERTY] = content_hash(element)
+        return properties
+
+    def export_category(self, sink, category_model, category, project):
+        """This method adds the elements of a category of a project as nodes.
 
-        :param project: 
+        :param sink: Writer, which receives the nodes, see :class:`corpus.utils.neo4j_writer.Neo4jWriter` and
+            :class:`corpus.utils.neo4j_csv.Neo4jCsvWriter`
+        :param category_model: Export model of the elements
+        :param category: Name of the category
+        :param project: The project
+        :returns: Iterator of the exported elements
 
         """
         try:
-            project_node = ProjectModel.create(self.graph, project)
-        except NeoGraphObjectException:
+            elements = project[category]
+        except KeyError:
+            log.info("No elements for category '{}' found in project {}.".format(category, project["id"]))
+            return
+        if not isinstance(elements, list):
+            elements = [elements]
+        for element in elements:
+            key = category_model.node_key(element, project) if isinstance(element, dict) else None
+            if key is None:
+                log.error("An element for category {} in project {} could not be exported. "
+                          "The ID is missing.".format(category, project["id"]))
+                continue
+            properties = self.node_properties(category_model, element)
+            properties[category_model.__primarykey__] = key
+            sink.node(category_model.__primarylabel__, category_model.__primarykey__, properties)
+            yield element
+
+    def export_project(self, project, sink):
+        """This method adds the nodes and relationships of a project to a writer.
+
+        :param project: The project
+        :param sink: Writer, which receives the nodes and relationships, see
+            :class:`corpus.utils.neo4j_writer.Neo4jWriter` and :class:`corpus.utils.neo4j_csv.Neo4jCsvWriter`
+
+        """
+        if project.get("id") is None:
             log.error("A project could not be exported. The ID is missing.")
             return
+        with step("export.project"):
+            sink.node("Project", "id", self.node_properties(ProjectModel, project))
+        project_node = ("Project", "id", project["id"])
 
-        for namespace_node in self.export_category(NamespaceModel, "namespace", project):
-            namespace_node.belongs_to.update(project_node)
-            self.graph.push(namespace_node)
+        def relate_user(rel_type, start, user_id=None, name=None, email=None):
+            if user_id is None:
+                user_id = self.identities.lookup(name, email)
+            if user_id is not None:
+                sink.relationship(rel_type, start, ("User", "id", user_id))
 
-        for owner_node in self.export_category(UserModel, "owner", project):
-            owner_node.owns.update(project_node)
-            self.graph.push(owner_node)
+        with step("export.namespace"):
+            for namespace in self.export_category(sink, NamespaceModel, "namespace", project):
+                sink.relationship("BELONGS_TO", ("Namespace", "id", namespace["id"]), project_node)
 
-        for user_node in self.export_category(UserModel, "users", project, True, "id"):
-            user_node.belongs_to.update(project_node)
-            self.graph.push(user_node)
+        with step("export.owner"):
+            for owner in self.export_category(sink, UserModel, "owner", project):
+                sink.relationship("OWNS", ("User", "id", owner["id"]), project_node)
 
-        try:
-            for contributor in project["contributors"]:
-                user_node = find_user_by_name(self.graph, contributor["name"])
-                if user_node is not None:
-                    user_node.contributes_to.update(project_node)
-                    self.graph.push(user_node)
-        except KeyError:
-            log.info("No contributor found for project {}.".format(project["id"]))
+        with step("export.users"):
+            for user in self.export_category(sink, UserModel, "users", project):
+                sink.relationship("BELONGS_TO", ("User", "id", user["id"]), project_node)
 
-        for commit_node in self.export_category(CommitModel, "commits", project, True, "id"):
-            commit_node.belongs_to.update(project_node)
-            user_node = find_user_by_name(self.graph, commit_node.committer_name)
-            if user_node is not None:
-                commit_node.committed_by.update(user_node)
-            self.graph.push(commit_node)
+        with step("export.contributors"):
+            try:
+                for contributor in project["contributors"]:
+                    user_id = self.identities.lookup(contributor.get("name"), contributor.get("email"))
+                    if user_id is not None:
+                        sink.relationship("CONTRIBUTES_TO", ("User", "id", user_id), project_node)
+            except KeyError:
+                log.info("No contributor found for project {}.".format(project["id"]))
+
+        with step("export.commits"):
+            for commit in self.export_category(sink, CommitModel, "commits", project):
+                sink.relationship("BELONGS_TO", ("Commit", "id", commit["id"]), project_node)
+                relate_user("COMMITTED_BY", ("Commit", "id", commit["id"]), name=commit.get("committer_name"),
+                            email=commit.get("committer_email"))
+
+        with step("export.files"):
+            for file in self.export_category(sink, FileModel, "files", project):
+                sink.relationship("BELONGS_TO", ("File", "key", FileModel.node_key(file, project)), project_node)
+
+        with step("export.languages"):
+            for name, value in project.get("languages", {}).items():
+                sink.node("Language", "name", {"name": name})
+                sink.relationship("IS_CONTAINED_IN", ("Language", "name", name), project_node, {"value": value})
+
+        with step("export.milestones"):
+            for milestone in self.export_category(sink, MilestoneModel, "milestones", project):
+                sink.relationship("BELONGS_TO_PROJECT", ("Milestone", "id", milestone["id"]), project_node)
+
+        with step("export.issues"):
+            for issue in self.export_category(sink, IssueModel, "issues", project):
+                issue_node = ("Issue", "id", issue["id"])
+                sink.relationship("BELONGS_TO", issue_node, project_node)
+                for category, rel_type in [("author", "AUTHORED_BY"), ("assignees", "ASSIGNED_TO")]:
+                    for user in related_elements(issue, category, "name"):
+                        relate_user(rel_type, issue_node, user.get("id"), user["name"])
+                for milestone in related_elements(issue, "milestone", "id"):
+                    sink.relationship("BELONGS_TO_MILESTONE", issue_node, ("Milestone", "id", milestone["id"]))
+
+        with step("export.mergerequests"):
+            for mergerequest in self.export_category(sink, MergerequestModel, "mergerequests", project):
+                mergerequest_node = ("Mergerequest", "id", mergerequest["id"])
+                sink.relationship("BELONGS_TO", mergerequest_node, project_node)
+                for category, rel_type, label in MERGEREQUEST_RELATIONSHIPS:
+                    for element in related_elements(mergerequest, category, "id"):
+                        sink.relationship(rel_type, mergerequest_node, (label, "id", element["id"]))
+
+        with step("export.releases"):
+            for release in self.export_category(sink, ReleaseModel, "releases", project):
+                release_node = ("Release", "key", ReleaseModel.node_key(release, project))
+                for category, rel_type, label in RELEASE_RELATIONSHIPS:
+                    for element in related_elements(release, category, "id"):
+                        sink.relationship(rel_type, release_node, (label, "id", element["id"]))
+
+
+class ConsoleSink:
+    """This class prints projects.
 
-        for file_node in self.export_category(FileModel, "files", project):
-            file_node.belongs_to.update(project_node)
-            self.graph.push(file_node)
+    Methods:
+        write(self, project)
+        close(self)
+        abort(self)
 
-        for language in transform_language_dict(project["languages"]):
-            try:
-                language_node = LanguageModel.get_or_create(self.graph, language["name"], language)
-                language_node.is_contained_in.update(project_node, {'value': language['value']})
-                self.graph.push(language_node)
-            except NeoGraphObjectException:
-                log.error("A language for project {} could not be exported. "
-                          "The ID is missing.".format(project["id"]))
-
-        for milestone_node in self.export_category(MilestoneModel, "milestones", project):
-            milestone_node.belongs_to_project.update(project_node)
-            self.graph.push(milestone_node)
-
-        for issue_node in self.export_category(IssueModel, "issues", project):
-            self.update_attribute(issue_node.author, issue_node.authored_by, by_id=False)
-            self.update_attribute(issue_node.assignees, issue_node.assigned_to, by_id=False)
-            self.update_attribute(issue_node.milestone, issue_node.belongs_to_milestone, model=MilestoneModel)
-            self.graph.push(issue_node)
-
-        for mergerequest_node in self.export_category(MergerequestModel, "mergerequests", project):
-            self.update_attribute(mergerequest_node.author, mergerequest_node.authored_by, model=UserModel)
-            self.update_attribute(mergerequest_node.merged_by, mergerequest_node.is_merged_by, model=UserModel)
-            self.update_attribute(mergerequest_node.closed_by, mergerequest_node.is_closed_by, model=UserModel)
-            self.update_attribute(mergerequest_node.assignees, mergerequest_node.assigned_to, model=UserModel)
-            self.update_attribute(mergerequest_node.commits, mergerequest_node.has_commit, model=CommitModel)
-            self.update_attribute(mergerequest_node.close_issues, mergerequest_node.closes, model=IssueModel)
-            self.graph.push(mergerequest_node)
-
-        for release_node in self.export_category(ReleaseModel, "releases", project):
-            self.update_attribute(release_node.author, release_node.authored_by, model=UserModel)
-            self.update_attribute(release_node.commit, release_node.committed_through, model=CommitModel)
-            self.update_attribute(release_node.milestones, release_node.belongs_to, model=MilestoneModel)
-            self.graph.push(release_node)
-
-    def update_attribute(self, src_attribute, node_attribute, model=None, by_id=True):
-        """
-
-        :param src_attribute: 
-        :param node_attribute: 
-        :param model:  (Default value = None)
-        :param by_id:  (Default value = True)
-
-        """
-        if by_id:
-            if src_attribute:
-                src_dict = eval(src_attribute)
-                if isinstance(src_dict, list):
-                    for element in src_dict:
-                        node = model.get(self.graph, {"id": element["id"]})
-                        if node:
-                            node_attribute.update(node)
-                else:
-                    node = model.get(self.graph, {"id": src_dict["id"]})
-                    if node:
-                        node_attribute.update(node)
-        else:
-            if src_attribute:
-                src_dict = eval(src_attribute)
-                if isinstance(src_dict, list):
-                    for element in src_dict:
-                        node = find_user_by_name(self.graph, element["name"])
-                        if node:
-                            node_attribute.update(node)
-                else:
-                    node = find_user_by_name(self.graph, src_dict["name"])
-                    if node:
-                        node_attribute.update(node)
+
+    """
+
+    def write(self, project):
+        """This method prints a project.
+
+        :param project: The project
+
+        """
+        click.echo(str(project) + "\n")
+
+    def close(self):
+        """Nothing has to be finished."""
+
+    def abort(self):
+        """Nothing has to be discarded."""
+
+
+class GraphSink:
+    """This class exports projects one by one as nodes and relationships. The users of a project are added to the
+    identity index before the project is exported, so committers and contributors can only be resolved to users of
+    the same or an earlier project.
+
+    Methods:
+        __init__(self, exporter, writer, batch_size=BATCH_SIZE)
+        write(self, project)
+        close(self)
+        abort(self)
+
+
+    """
+
+    def __init__(self, exporter, writer, batch_size=BATCH_SIZE):
+        """GraphSink class constructor to initialize the object.
+
+        :param exporter: The exporter
+        :param writer: Writer, which receives the nodes and relationships, see
+            :class:`corpus.utils.neo4j_writer.Neo4jWriter` and :class:`corpus.utils.neo4j_csv.Neo4jCsvWriter`
+        :param batch_size: Number of nodes marked as deleted in one transaction (Default value = BATCH_SIZE)
+
+        """
+        self.exporter = exporter
+        self.writer = writer
+        self.batch_size = batch_size
+        self.exporter.identities = IdentityIndex()
+
+    def write(self, project):
+        """This method exports a project into the graph.
+
+        :param project: The project
+
+        """
+        for user in related_elements(project, "owner", "id") + related_elements(project, "users", "id"):
+            self.exporter.identities.add(user)
+        self.exporter.export_project(project, self.writer)
+
+    def close(self):
+        """This method writes the remaining nodes and relationships."""
+        self.writer.close()
+        self.exporter.tombstone_removed(self.batch_size)
+        if self.exporter.verbose:
+            log.info("{} nodes and {} relationships written.".format(self.writer.node_count,
+                                                                     self.writer.relationship_count))
+        if getattr(self.writer, "dropped", 0):
+            log.warning("{} relationships to nodes, which are not exported, left out.".format(self.writer.dropped))
+
+    def abort(self):
+        """This method stops the export after an error. Since the projects are not complete, no nodes are marked as
+        deleted, see :meth:`corpus.utils.neo4j_writer.Neo4jWriter.abort` and
+        :meth:`corpus.utils.neo4j_csv.Neo4jCsvWriter.abort`.
+
+        """
+        self.writer.abort()
+
+
+class CollectingSink:
+    """This class collects projects and exports them on close.
+
+    Methods:
+        __init__(self, exporter, out)
+        write(self, project)
+        close(self)
+        abort(self)
+
+
+    """
+
+    def __init__(self, exporter, out):
+        """CollectingSink class constructor to initialize the object.
+
+        :param exporter: The exporter
+        :param out: Path to the output
+
+        """
+        self.exporter = exporter
+        self.out = out
+        self.exporter.corpus = Corpus()
+
+    def write(self, project):
+        """This method adds a project to the corpus of the exporter.
+
+        :param project: The project
+
+        """
+        self.exporter.corpus.data["Projects"].append(project)
+
+    def close(self):
+        """This method exports the collected projects."""
+        self.exporter.export(self.out)
+
+    def abort(self):
+        """This method discards the collected projects, so that no incomplete output is written."""
+        self.exporter.corpus = Corpus()
@@ -4,12 +4,15 @@ import click
 import gitlab
 from gitlab.v4.objects import ProjectManager
 
+from corpus.utils.profiling import profiled, step
+
 """
 .. module:: extract
 .. moduleauthor:: Emanuel Caricato <emanuel.caricato@dlr.de>
 """
 
 
+@profiled("extract.get_users")
 def get_users(project):
     """This function returns a list of users for a specified project.
 
@@ -27,6 +30,7 @@ def get_users(project):
         return None
 
 
+@profiled("extract.get_commits")
 def get_commits(project):
     """This function returns a list of commits, the last, and the first commit for a specified project.
 
@@ -44,6 +48,7 @@ def get_commits(project):
         return None, None, None
 
 
+@profiled("extract.get_contributors")
 def get_contributors(project):
     """This function returns a list of contributors for a specified project.
 
@@ -59,6 +64,7 @@ def get_contributors(project):
         return None
 
 
+@profiled("extract.get_issues")
 def get_issues(project):
     """This function returns a list of issues for a specified project.
 
@@ -73,6 +79,7 @@ def get_issues(project):
     return None
 
 
+@profiled("extract.get_mergerequests")
 def get_mergerequests(project):
     """This function returns a list of mergerequests for a specified project.
 
@@ -102,6 +109,7 @@ def get_mergerequests(project):
         return None
 
 
+@profiled("extract.get_pipelinestatistics")
 def get_pipelinestatistics(project):
     """This function returns the pipeline statistics for a specified project.
 
@@ -130,6 +138,7 @@ def get_pipelinestatistics(project):
         return None
 
 
+@profiled("extract.get_milestones")
 def get_milestones(project):
     """This function returns a list of milestones for a specified project.
 
@@ -147,6 +156,7 @@ def get_milestones(project):
         return None
 
 
+@profiled("extract.get_rootdir")
 def get_rootdir(project, project_dict):
     """This function returns a list of files from the root directory for a specified project.
 
@@ -162,6 +172,7 @@ def get_rootdir(project, project_dict):
         return None
 
 
+@profiled("extract.get_projectstatistics")
 def get_projectstatistics(project, verbose, name):
     """This function returns the project statistics for a specified project.
 
@@ -184,6 +195,7 @@ def get_projectstatistics(project, verbose, name):
         return None
 
 
+@profiled("extract.get_releases")
 def get_releases(project):
     """This function returns a list of releases for a specified project.
 
@@ -207,6 +219,9 @@ class Extractor:
     Methods:
         __init__(self, verbose, gitlab_manager, corpus)
         extract(self, all_elements)
+        extract_projects(self, objects, include_private)
+        iter_projects(self, all_elements, include_private=False)
+        extract_project(self, project, include_private)
 
 
     """
@@ -249,68 +264,102 @@ class Extractor:
             if self.verbose:
                 click.echo("{} projects found.".format(bar.length))
             for project in bar:
-                project_dict = project.attributes
-
-                # only extract public or internal projects
-                if project_dict['visibility'] != "private" or include_private:
-                    # extract issue statistics
-                    project_dict['issue_statistics'] = \
-                        project.issuesstatistics.get(scope="all").attributes["statistics"]
-
-                    # extract project languages
-                    project_dict['languages'] = project.languages()
-
-                    # extract members of the project
-                    users = get_users(project)
-                    if users is not None:
-                        project_dict['users'] = users
-
-                    # extract commits
-                    commits, first_commit, last_commit = get_commits(project)
-                    if commits is not None:
-                        project_dict['commits'], project_dict['first_commit'], project_dict['last_commit'] = \
-                            commits, first_commit, last_commit
-
-                    # extract contributors
-                    contributors = get_contributors(project)
-                    if contributors is not None:
-                        project_dict['contributors'] = contributors
-
-                    # extract all issues
-                    issues = get_issues(project)
-                    if issues is not None:
-                        project_dict['issues'] = issues
-
-                    # extract all merge requests
-                    mergerequests = get_mergerequests(project)
-                    if mergerequests is not None:
-                        project_dict['mergerequests'] = mergerequests
-
-                    # extract pipeline statistics
-                    pipelinestatistics = get_pipelinestatistics(project)
-                    if pipelinestatistics is not None:
-                        project_dict['pipelines'] = pipelinestatistics
-
-                    # extract milestones
-                    milestones = get_milestones(project)
-                    if milestones is not None:
-                        project_dict['milestones'] = milestones
-
-                    # extract the main directory of the project
-                    rootdir = get_rootdir(project, project_dict)
-                    if rootdir is not None:
-                        project_dict['files'] = rootdir
-
-                    # try to extract project statistics (only works for projects where the user has write
-                    # access)
-                    project_statistics = get_projectstatistics(project, self.verbose, project_dict['name'])
-                    if project_statistics is not None:
-                        project_dict['project_statistics'] = project_statistics
-
-                    # extract releases
-                    releases = get_releases(project)
-                    if releases is not None:
-                        project_dict['releases'] = releases
-
+                project_dict = self.extract_project(project, include_private)
+                if project_dict is not None:
                     # add all extracted data to the corpus
                     self.corpus.data["Projects"].append(project_dict)
+
+    def iter_projects(self, all_elements, include_private=False):
+        """This method extracts the projects of the defined GitLab instance one by one, so that they can be processed
+        while the extraction goes on. The pages of the project list are requested, when they are needed.
+
+        :param all_elements: Ignores the pagination of the GitLab-API and extracts all projects, if set to ``True``.
+        :param include_private: Includes private GitLab projects as well, if set to ``True``. (Default value = False)
+        :returns: Iterator of the extracted projects
+
+        """
+        for manager in self.managers:
+            if isinstance(manager, ProjectManager):
+                objects = manager.list(as_list=False) if all_elements else manager.list()
+                for project in objects:
+                    project_dict = self.extract_project(project, include_private)
+                    if project_dict is not None:
+                        yield project_dict
+
+    @profiled("extract.project")
+    def extract_project(self, project, include_private):
+        """This method extracts the attributes and elements of a project.
+
+        :param project: The project object of python-gitlab
+        :param include_private: Includes private GitLab projects as well, if set to ``True``.
+        :returns: The project as dictionary, ``None`` if it is private and private projects are not included
+        :rtype: dict or None
+
+        """
+        project_dict = project.attributes
+
+        # only extract public or internal projects
+        if project_dict['visibility'] != "private" or include_private:
+            # extract issue statistics
+            with step("extract.issue_statistics"):
+                project_dict['issue_statistics'] = \
+                    project.issuesstatistics.get(scope="all").attributes["statistics"]
+
+            # extract project languages
+            with step("extract.languages"):
+                project_dict['languages'] = project.languages()
+
+            # extract members of the project
+            users = get_users(project)
+            if users is not None:
+                project_dict['users'] = users
+
+            # extract commits
+            commits, first_commit, last_commit = get_commits(project)
+            if commits is not None:
+                project_dict['commits'], project_dict['first_commit'], project_dict['last_commit'] = \
+                    commits, first_commit, last_commit
+
+            # extract contributors
+            contributors = get_contributors(project)
+            if contributors is not None:
+                project_dict['contributors'] = contributors
+
+            # extract all issues
+            issues = get_issues(project)
+            if issues is not None:
+                project_dict['issues'] = issues
+
+            # extract all merge requests
+            mergerequests = get_mergerequests(project)
+            if mergerequests is not None:
+                project_dict['mergerequests'] = mergerequests
+
+            # extract pipeline statistics
+            pipelinestatistics = get_pipelinestatistics(project)
+            if pipelinestatistics is not None:
+                project_dict['pipelines'] = pipelinestatistics
+
+            # extract milestones
+            milestones = get_milestones(project)
+            if milestones is not None:
+                project_dict['milestones'] = milestones
+
+            # extract the main directory of the project
+            rootdir = get_rootdir(project, project_dict)
+            if rootdir is not None:
+                project_dict['files'] = rootdir
+
+            # try to extract project statistics (only works for projects where the user has write
+            # access)
+            project_statistics = get_projectstatistics(project, self.verbose, project_dict['name'])
+            if project_statistics is not None:
+                project_dict['project_statistics'] = project_statistics
+
+            # extract releases
+            releases = get_releases(project)
+            if releases is not None:
+                project_dict['releases'] = releases
+
+            return project_dict
+        return None
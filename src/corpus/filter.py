@@ -1,6 +1,7 @@
 # SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
 # SPDX-License-Identifier: MIT
 
+import contextlib
 import json
 import re
 import sys
@@ -9,12 +10,25 @@ import click
 import yaml
 
 from corpus.utils.helpers import Corpus
+from corpus.utils.filter_cache import FilterCache
+from corpus.utils.profiling import timed_predicate
+from corpus.utils.corpus_index import CorpusIndex
+from corpus.utils.corpus_io import load_corpus, iter_projects, read_projects, CorpusWriter
+from corpus.utils.filter_regex import analyze_regex, combine_patterns, compile_matcher, compile_regex
+from corpus.utils.filter_expressions import (And, Or, Not, Comparison, Languages, Aggregate,
+                                             InvalidExpressionException, parse_expression, parse_attribute, plan,
+                                             shared_subexpressions)
 
 """
 .. module:: filter
 .. moduleauthor:: Emanuel Caricato <emanuel.caricato@dlr.de>
 """
 
+# Bit reserved for project languages, which are not named in any language filter
+UNKNOWN_LANGUAGE = 1
+
+LANGUAGE_CATEGORIES = ["any_languages", "atleast_languages", "atmost_languages", "exact_languages"]
+
 
 class InvalidOperatorException(Exception):
     """ """
@@ -89,51 +103,254 @@ def eval_condition(attribute, operator, condition):
     elif isinstance(attribute, float):
         condition = float(condition)
 
+    # Numbers and strings (e.g. ISO dates) can be ordered
+    ordered = isinstance(attribute, (int, float)) or (isinstance(attribute, str) and isinstance(condition, str))
+
     if operator == "==":
         return attribute == condition
     elif operator == "!=":
         return attribute != condition
-    elif operator == "<=" and (isinstance(attribute, int) or isinstance(attribute, float)):
+    elif operator == "<=" and ordered:
         return attribute <= condition
-    elif operator == "<" and (isinstance(attribute, int) or isinstance(attribute, float)):
+    elif operator == "<" and ordered:
         return attribute < condition
-    elif operator == ">=" and (isinstance(attribute, int) or isinstance(attribute, float)):
+    elif operator == ">=" and ordered:
         return attribute >= condition
-    elif operator == ">" and (isinstance(attribute, int) or isinstance(attribute, float)):
+    elif operator == ">" and ordered:
         return attribute > condition
     elif operator == "contains" and isinstance(attribute, str) and isinstance(condition, str):
         return condition in attribute
     elif isinstance(attribute, str) and isinstance(condition, str) and operator == "regex":
-        re.escape(condition)
-        return re.match(condition, attribute) is not None
+        return compile_regex(condition).match(attribute) is not None
     else:
         raise InvalidOperatorException("Invalid Operator in filter file", operator)
 
 
+def iter_path_values(value, segments, index=0):
+    """This function yields all values found under a path. Lists on the path are expanded, missing attributes and
+    ``None`` values are skipped.
+
+    :param value: Value the path starts at
+    :param segments: Segments of the path
+    :param index: Index of the next segment to be resolved (Default value = 0)
+
+    """
+    if isinstance(value, list):
+        for element in value:
+            yield from iter_path_values(element, segments, index)
+    elif index == len(segments):
+        if value is not None:
+            yield value
+    elif isinstance(value, dict) and segments[index] in value:
+        yield from iter_path_values(value[segments[index]], segments, index + 1)
+
+
+def aggregate_values(function, values):
+    """This function aggregates values with one of the functions ``count``, ``distinct``, ``min``, ``max`` or
+    ``sum``.
+
+    :param function: Name of the aggregate function
+    :param values: Iterable of the values
+    :returns: The aggregated value
+    :raises KeyError: If ``min``, ``max`` or ``sum`` are applied to no values at all
+
+    """
+    if function == "count":
+        return sum(1 for _ in values)
+    elif function == "distinct":
+        return len({json.dumps(value, sort_keys=True) if isinstance(value, (dict, list)) else value
+                    for value in values})
+    values = list(values)
+    if len(values) == 0:
+        raise KeyError(function)
+    if function == "min":
+        return min(values)
+    elif function == "max":
+        return max(values)
+    return sum(values)
+
+
+def compile_accessor(attribute):
+    """This function compiles the attribute of a comparison into an accessor, which reads the attribute's value from
+    a project. The path is split only once, when the filters are loaded.
+
+    :param attribute: Name, dotted path or :class:`corpus.utils.filter_expressions.Aggregate`
+    :returns: Function, which returns the value for a project and raises ``KeyError`` if it is missing
+    :rtype: callable
+
+    """
+    if isinstance(attribute, Aggregate):
+        function, segments = attribute.function, attribute.path.split(".")
+        operator, condition = attribute.operator, attribute.value
+        if operator is None:
+            return lambda project: aggregate_values(function, iter_path_values(project, segments))
+
+        def passes(value):
+            try:
+                return eval_condition(value, operator, condition)
+            except (ValueError, InvalidOperatorException):
+                return False
+        return lambda project: aggregate_values(function, (value for value in iter_path_values(project, segments)
+                                                           if passes(value)))
+    if "." not in attribute:
+        return lambda project: project[attribute]
+
+    segments = attribute.split(".")
+
+    def accessor(project):
+        value = project
+        for segment in segments:
+            if not isinstance(value, dict):
+                raise KeyError(segment)
+            value = value[segment]
+        return value
+    return accessor
+
+
+def compile_comparison(comparison):
+    """This function compiles a comparison of a project attribute into a predicate. Projects without the attribute
+    do not pass the comparison. Values of aggregates are computed only once per project, even if several comparisons
+    use them. Regular expressions are compiled once and prefiltered by their literals.
+
+    :param comparison: The comparison
+    :returns: The predicate
+    :rtype: callable
+    :raises InvalidExpressionException: If the regular expression of the comparison is invalid
+
+    """
+    operator, value = comparison.operator, comparison.value
+    matcher = None
+    if operator == "regex" and isinstance(value, str):
+        try:
+            matcher = compile_matcher(value)
+        except re.error:
+            raise InvalidExpressionException("Invalid regular expression in filter file", value)
+    accessor = compile_accessor(comparison.path)
+    if isinstance(comparison.path, Aggregate):
+        key, aggregate = comparison.path.key, accessor
+
+        def accessor(project, memo):
+            if key not in memo:
+                memo[key] = aggregate(project)
+            return memo[key]
+    else:
+        get_attribute = accessor
+
+        def accessor(project, memo):
+            return get_attribute(project)
+
+    def predicate(project, memo):
+        try:
+            attribute = accessor(project, memo)
+            if matcher is not None and isinstance(attribute, str):
+                return matcher(attribute)
+            return eval_condition(attribute, operator, value)
+        except KeyError:
+            return False
+        except ValueError:
+            return True
+        except InvalidOperatorException:
+            sys.exit(-1)
+    return predicate
+
+
+def combine_regexes(nodes):
+    """This function combines the regex comparisons of the same attribute in a disjunction into one comparison with
+    an alternation of the patterns, so that the attribute is matched only once.
+
+    :param nodes: Children of the disjunction
+    :returns: Children of the disjunction with combined comparisons
+    :rtype: list
+
+    """
+    groups, result = {}, []
+    for node in nodes:
+        if isinstance(node, Comparison) and node.operator == "regex" and isinstance(node.path, str) \
+                and isinstance(node.value, str):
+            try:
+                combinable = analyze_regex(node.value)[1]
+            except re.error:
+                combinable = False
+            if combinable:
+                if node.path not in groups:
+                    groups[node.path] = []
+                    result.append(node.path)  # placeholder for the combined comparison
+                groups[node.path].append(node)
+                continue
+        result.append(node)
+    for position, node in enumerate(result):
+        if isinstance(node, str):
+            group = groups[node]
+            result[position] = group[0] if len(group) == 1 else \
+                Comparison(node, "regex", combine_patterns([comparison.value for comparison in group]))
+    return result
+
+
+def comparison_candidates(index, comparison):
+    """This function selects the projects of an indexed corpus, which can pass a comparison. The values are converted
+    like in :func:`eval_condition`, so the selected projects are a superset of the projects passing the comparison.
+
+    :param index: Index of the corpus
+    :param comparison: The comparison
+    :returns: Set of project indexes, ``None`` if the index cannot answer the comparison
+    :rtype: set or None
+
+    """
+    path, operator, value = comparison.path, comparison.operator, comparison.value
+    if isinstance(path, Aggregate):
+        return None
+    if operator == "==" and index.has_hash(path):
+        return index.lookup(path, value)
+    if operator not in ("==", "<", "<=", ">", ">=") or not index.has_column(path):
+        return None
+    try:  # integer attributes are compared with the truncated value
+        low, high = sorted((int(value), float(value)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if operator == "==":
+        return index.range(path, low, high)
+    elif operator in (">", ">="):
+        return index.range(path, low=low)
+    return index.range(path, high=high)
+
+
 class Filter:
     """This class implements the filter options for the corpus, by loading the filter options as specified in the
     :ref:`how_to_write_a_filter_file`.
     
     Methods:
-        __init__(self, verbose, corpus, from_file=False, file="-")
+        __init__(self, verbose, corpus, from_file=False, file="-", cache=False)
         load_filters(self, filter_file)
+        load_corpus(self, file, cache=False)
+        index_locations(self, file)
+        index_candidates(self, index, node)
+        language_candidates(self, index, node)
+        required_attributes(self)
         load_languages(self, filter_option, category)
-        filter(self)
+        intern_language(self, language)
+        language_mask(self, project)
+        build_plan(self)
+        compile_predicate(self, node, shared=frozenset())
+        filter(self, sink=None)
+        iter_filtered(self, projects)
+        iter_file(self, file)
+        filter_bitmap(self, projects)
+        keep_attributes(self, project)
         filter_project(self, project)
-        check_languages(self, filter_option, project)
+        check_languages(self, filter_option, project, project_mask=None)
 
 
     """
 
-    filtered_corpus = Corpus()
-
-    def __init__(self, verbose, corpus, from_file=False, file="-"):
+    def __init__(self, verbose, corpus, from_file=False, file="-", cache=False):
         """Filter class constructor to initialize the object.
 
         :param verbose: Prints more output, if set to ``True``
         :param corpus: Input corpus, which will be filtered
         :param from_file: Specifies, if the input corpus should be read from a file [default: ``False``]
         :param file: Path to input corpus
+        :param cache: Reuse the results of filter predicates from earlier runs on the same corpus file. Only used,
+            if the corpus is read from a file [default: ``False``]
 
         """
         self.verbose = verbose
@@ -142,11 +359,18 @@ class Filter:
         self.atleast_languages = {}
         self.atmost_languages = {}
         self.exact_languages = {}
+        self.language_bits = {}
+        self.language_masks = {category: 0 for category in LANGUAGE_CATEGORIES}
         self.attributes = []
+        self.attribute_keys = ()
+        self.expressions = []
+        self.plan = And([])
+        self.predicate = self.compile_predicate(self.plan)
         self.input_corpus = Corpus()
+        self.filtered_corpus = Corpus()
+        self.cache = FilterCache(file) if cache and from_file else None
         if from_file:
-            with open(file, 'r') as f:
-                self.input_corpus.data = json.load(f)
+            self.input_corpus.data = load_corpus(file)
         else:
             self.input_corpus = corpus
 
@@ -169,17 +393,141 @@ class Filter:
                         else:
                             self.filters[category] = filters["filters"][category]  # add all other filters
 
+                if filters.get("expressions") is not None:  # add boolean filter expressions
+                    expressions = filters["expressions"]
+                    for expression in (expressions if isinstance(expressions, list) else [expressions]):
+                        self.expressions.append(parse_expression(expression))
+
                 if filters["attributes"] is not None:  # add all attributes to be shown in corpus
                     for attribute in filters["attributes"]:
                         self.attributes.append(attribute)
+            self.build_plan()
+        except InvalidExpressionException:
+            sys.exit(-1)
         except FileNotFoundError:
             if self.verbose:
                 click.echo("No filter configuration file found. No filters will be applied.")
             else:
                 pass
 
+    def load_corpus(self, file, cache=False):
+        """This method loads the input corpus from a file after the filters were loaded. Only the attributes, which are
+        used by the filters or shown in the resulting corpus, are kept in memory. If the corpus file was indexed with
+        ``corpus index``, only the projects selected by the index are read.
+
+        :param file: Path to input corpus
+        :param cache: Reuse the results of filter predicates from earlier runs on the same corpus file. The cache
+            covers all projects of the corpus, so the index is not used [default: ``False``]
+
+        """
+        self.input_corpus = Corpus()
+        self.cache = FilterCache(file) if cache else None
+        locations = self.index_locations(file) if not cache else None
+        if locations is None:
+            self.input_corpus.data = load_corpus(file, self.required_attributes())
+        else:
+            self.input_corpus.data = {"Projects": list(read_projects(file, locations, self.required_attributes()))}
+
+    def index_locations(self, file):
+        """This method looks up the projects of an indexed corpus file, which can pass the filters.
+
+        :param file: Path to input corpus
+        :returns: Positions of the selected projects in the corpus file, ``None`` if the corpus file is not indexed
+            or the index cannot narrow down the projects
+        :rtype: list or None
+
+        """
+        index = CorpusIndex.load(file)
+        candidates = self.index_candidates(index, self.plan) if index is not None else None
+        if candidates is None:
+            return None
+        if self.verbose:
+            click.echo("{} of {} projects were selected by the index.".format(len(candidates), index.size))
+        return index.locations(candidates)
+
+    def index_candidates(self, index, node):
+        """This method selects the projects of an indexed corpus, which can pass a planned expression. The selected
+        projects still have to be filtered, conditions, which cannot be answered by the index, are left to the
+        predicate.
+
+        :param index: Index of the corpus, see :class:`corpus.utils.corpus_index.CorpusIndex`
+        :param node: Node of the planned expression
+        :returns: Set of project indexes, ``None`` if the index cannot narrow down the projects
+        :rtype: set or None
+
+        """
+        if isinstance(node, And):
+            result = None
+            for child in node.children:
+                candidates = self.index_candidates(index, child)
+                if candidates is not None:
+                    result = candidates if result is None else result & candidates
+            return result
+        elif isinstance(node, Or):
+            result = set()
+            for child in node.children:
+                candidates = self.index_candidates(index, child)
+                if candidates is None:
+                    return None
+                result |= candidates
+            return result
+        elif isinstance(node, Languages):
+            return self.language_candidates(index, node)
+        elif isinstance(node, Comparison):
+            return comparison_candidates(index, node)
+        return None
+
+    def language_candidates(self, index, node):
+        """This method selects the projects of an indexed corpus, which can pass a language filter, from the posting
+        lists of the filtered languages.
+
+        :param index: Index of the corpus
+        :param node: The language filter
+        :returns: Set of project indexes, ``None`` if the index cannot answer the language filter
+        :rtype: set or None
+
+        """
+        if len(node.languages) == 0:
+            return None
+        matches = []
+        try:
+            for language, evaluation in node.languages.items():
+                matches.append({project for project, percentage in index.languages(language)
+                                if eval_percentage(percentage, evaluation)})
+        except (KeyError, TypeError, ValueError, InvalidOperatorException):
+            return None  # the predicate reports invalid filters
+        if node.category in ("atleast_languages", "exact_languages"):
+            return set.intersection(*matches)
+        return set.union(*matches)
+
+    def required_attributes(self):
+        """This method returns the top-level attributes of a project, which are needed to filter it and to build the
+        resulting corpus.
+
+        :returns: Set of attribute names, ``None`` if all attributes are shown in the resulting corpus
+        :rtype: set or None
+
+        """
+        if len(self.attributes) == 0:
+            return None
+        required = set(self.attributes)
+        stack = [self.plan]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (And, Or)):
+                stack.extend(node.children)
+            elif isinstance(node, Not):
+                stack.append(node.child)
+            elif isinstance(node, Languages):
+                required.add("languages")
+            else:
+                path = node.path.path if isinstance(node.path, Aggregate) else node.path
+                required.add(path.split(".")[0])
+        return required
+
     def load_languages(self, language_list, category):
-        """This method loads the languages to be filtered and stores them in a list.
+        """This method loads the languages to be filtered and stores them in a list. Every language is interned as a
+        single bit, so that the language set of each category can be stored as a bitmask.
 
         :param language_list: List containing all filter options regarding the language category as specified in the
             :ref:`how_to_write_a_filter_file`
@@ -200,31 +548,235 @@ class Filter:
                     self.atmost_languages[element] = language_list[element]
                 else:
                     self.exact_languages[element] = language_list[element]
+                self.language_masks[category] |= self.intern_language(element)
+
+    def intern_language(self, language):
+        """This method assigns a unique bit to a language name. Bit 0 is reserved for languages, which are not part of
+        any language filter.
+
+        :param language: Name of the language
+        :returns: The bit representing the language
+        :rtype: int
+
+        """
+        try:
+            return self.language_bits[language]
+        except KeyError:
+            bit = 1 << (len(self.language_bits) + 1)
+            self.language_bits[language] = bit
+            return bit
+
+    def language_mask(self, project):
+        """This method builds the bitmask of the languages used in a project.
 
-    def filter(self):
+        :param project: The project, whose languages are converted
+        :returns: Bitmask of the project languages
+        :rtype: int
+
+        """
+        mask = 0
+        for language in project["languages"]:
+            mask |= self.language_bits.get(language, UNKNOWN_LANGUAGE)
+        return mask
+
+    def build_plan(self):
+        """This method combines the loaded filters and expressions into one expression, which is planned and compiled
+        into the predicate used by :meth:`filter_project`.
+
+        """
+        nodes = []
+        for filter_option, condition in self.filters.items():
+            if filter_option in self.language_masks:
+                languages = {"any_languages": self.any_languages, "atleast_languages": self.atleast_languages,
+                             "atmost_languages": self.atmost_languages,
+                             "exact_languages": self.exact_languages}[filter_option]
+                nodes.append(Languages(filter_option, languages))
+            elif isinstance(condition, dict):
+                nodes.append(Comparison(parse_attribute(filter_option), condition.get('operator'),
+                                        condition.get('value')))
+            elif condition is not None:
+                nodes.append(Comparison(parse_attribute(filter_option), "==", condition))
+        self.attribute_keys = tuple(dict.fromkeys(self.attributes))
+        self.plan = plan(And(nodes + self.expressions))
+        self.predicate = self.compile_predicate(self.plan, shared_subexpressions(self.plan))
+
+    def compile_predicate(self, node, shared=frozenset()):
+        """This method compiles a planned expression into a predicate. A predicate is called with a project and a
+        dictionary, which caches intermediate results for that project.
+
+        :param node: Node of the planned expression
+        :param shared: Keys of subexpressions, whose results are cached per project (Default value = frozenset())
+        :returns: The predicate
+        :rtype: callable
+
+        """
+        if isinstance(node, (And, Or)):
+            children = [self.compile_predicate(child, shared)
+                        for child in (node.children if isinstance(node, And) else combine_regexes(node.children))]
+            if isinstance(node, And):
+                def predicate(project, memo):
+                    for child in children:
+                        if not child(project, memo):
+                            return False
+                    return True
+            else:
+                def predicate(project, memo):
+                    for child in children:
+                        if child(project, memo):
+                            return True
+                    return False
+        elif isinstance(node, Not):
+            negated = self.compile_predicate(node.child, shared)
+
+            def predicate(project, memo):
+                return not negated(project, memo)
+        elif isinstance(node, Languages):
+            category = node.category
+
+            mask_key = (id(self), "language_mask")  # the bits of the languages differ between filters
+
+            def predicate(project, memo):
+                if mask_key not in memo:
+                    memo[mask_key] = self.language_mask(project)
+                return self.check_languages(category, project, memo[mask_key])
+        else:
+            predicate = compile_comparison(node)
+
+        if not isinstance(node, (And, Or, Not)):  # every condition is a step of a profiled filter
+            predicate = timed_predicate("filter." + node.key, predicate)
+
+        if node.key in shared:
+            key = node.key
+            evaluate = predicate
+
+            def predicate(project, memo):
+                if key not in memo:
+                    memo[key] = evaluate(project, memo)
+                return memo[key]
+        return predicate
+
+    def filter(self, sink=None):
         """This method filters the extracted corpus by using the previously loaded filter options. If no filter
         options were set, all projects will be kept in the resulting corpus. If no attributes are specified, all
-        attributes will be kept in the resulting corpus.
+        attributes will be kept in the resulting corpus. Every call starts a new resulting corpus.
 
+        :param sink: Object with a method ``write(project)``, e.g. a :class:`corpus.utils.corpus_io.CorpusWriter`,
+            which receives the resulting projects instead of :attr:`filtered_corpus` (Default value = None)
 
         """
         click.echo("Filtering...")
+        self.filtered_corpus = Corpus()
         projects_dict = self.input_corpus.data["Projects"]
-        if len(self.filters) > 0:
-            with click.progressbar(projects_dict) as bar:
-                for project in bar:
-                    if self.filter_project(project):
-                        self.filtered_corpus.data["Projects"].append({key: value for key, value in project.items()
-                                                                      if key in self.attributes
-                                                                      or len(self.attributes) == 0})
-        elif len(self.attributes) > 0:
+        if sink is None and len(self.filters) == 0 and len(self.expressions) == 0 and len(self.attributes) == 0:
+            self.filtered_corpus.data = self.input_corpus.data
+            return
+        write = sink.write if sink is not None else self.filtered_corpus.data["Projects"].append
+        if self.cache is not None and (len(self.filters) > 0 or len(self.expressions) > 0):
+            for project in self.iter_filtered(projects_dict):
+                write(project)
+            if self.verbose:
+                click.echo("{} of {} filter predicates were loaded from the cache."
+                           .format(self.cache.hits, self.cache.hits + self.cache.misses))
+        else:
             with click.progressbar(projects_dict) as bar:
-                for project in bar:
-                    self.filtered_corpus.data["Projects"].append({key: value for key, value in project.items()
-                                                                  if key in self.attributes
-                                                                  or len(self.attributes) == 0})
+                for project in self.iter_filtered(bar):
+                    write(project)
+
+    def iter_filtered(self, projects):
+        """This method yields the projects passing the filters, reduced to the attributes shown in the resulting
+        corpus. The projects are filtered lazily, so only the current project has to be held in memory.
+
+        :param projects: Iterable of projects. Has to be a list, if the cache is used
+        :returns: Iterator of the resulting projects
+
+        """
+        if len(self.filters) == 0 and len(self.expressions) == 0:
+            for project in projects:
+                yield self.keep_attributes(project)
+        elif self.cache is not None:
+            passes = self.filter_bitmap(projects)
+            for index, project in enumerate(projects):
+                if passes[index >> 3] >> (index & 7) & 1:
+                    yield self.keep_attributes(project)
         else:
-            self.filtered_corpus.data = self.input_corpus.data
+            for project in projects:
+                if self.filter_project(project):
+                    yield self.keep_attributes(project)
+
+    def iter_file(self, file):
+        """This method reads a corpus file project by project and yields the projects passing the filters, so that
+        filtering needs memory only for a single project. If the corpus file was indexed, only the projects selected
+        by the index are read.
+
+        :param file: Path to input corpus
+        :returns: Iterator of the resulting projects
+
+        """
+        locations = self.index_locations(file)
+        if locations is None:
+            projects = iter_projects(file, self.required_attributes())
+        else:
+            projects = read_projects(file, locations, self.required_attributes())
+        cache, self.cache = self.cache, None  # the cache needs all projects at once
+        try:
+            yield from self.iter_filtered(projects)
+        finally:
+            self.cache = cache
+
+    def filter_bitmap(self, projects):
+        """This method evaluates the planned filters predicate by predicate on all projects. The bitmap of every
+        predicate is loaded from the cache or computed and stored in the cache, so that later runs only evaluate
+        predicates, which changed.
+
+        :param projects: List of all projects in the corpus
+        :returns: Bitmap with bit ``i`` set, if project ``i`` passes the filters
+        :rtype: bytes
+
+        """
+        size = len(projects)
+        everything = (1 << size) - 1
+        memos = [{} for _ in projects]
+
+        def evaluate(node):
+            if isinstance(node, And):
+                result = everything
+                for child in node.children:
+                    if result == 0:
+                        break
+                    result &= evaluate(child)
+                return result
+            if isinstance(node, Or):
+                result = 0
+                for child in node.children:
+                    if result == everything:
+                        break
+                    result |= evaluate(child)
+                return result
+            if isinstance(node, Not):
+                return everything & ~evaluate(node.child)
+            bitmap = self.cache.load(node.key, size)
+            if bitmap is None:
+                predicate = self.compile_predicate(node)
+                bits = bytearray((size + 7) // 8)
+                for index, project in enumerate(projects):
+                    if predicate(project, memos[index]):
+                        bits[index >> 3] |= 1 << (index & 7)
+                bitmap = int.from_bytes(bits, "little")
+                self.cache.store(node.key, bitmap, size)
+            return bitmap
+
+        return evaluate(self.plan).to_bytes((size + 7) // 8, "little")
+
+    def keep_attributes(self, project):
+        """This method removes all attributes from a project, which should not be shown in the resulting corpus.
+
+        :param project: The project
+        :returns: The project with the specified attributes only
+
+        """
+        if len(self.attribute_keys) == 0:
+            return project
+        return {key: project[key] for key in self.attribute_keys if key in project}
 
     def filter_project(self, project):
         """This method applies the specified filters to a project.
@@ -233,57 +785,91 @@ class Filter:
         :returns: True`` if the project passes the filter criteria and ``False`` otherwise.
 
         """
-        return_val = True
-        for filter_option in self.filters:
-            if re.match('.*_languages', filter_option):  # filter project languages
-                if return_val:
-                    if self.filters[filter_option] is not None:
-                        return_val = self.check_languages(filter_option, project)
-            elif return_val:  # filter other attributes
-                try:
-                    operator = self.filters[filter_option]['operator']
-                    condition = self.filters[filter_option]['value']
-                    return_val = eval_condition(project[filter_option], operator, condition)
-                except ValueError:
-                    pass
-                except InvalidOperatorException:
-                    sys.exit(-1)
-        return return_val
-
-    def check_languages(self, filter_option, project):
-        """This method applies the language filters to a project.
+        return self.predicate(project, {})
+
+    def check_languages(self, filter_option, project, project_mask=None):
+        """This method applies the language filters to a project. The language sets are compared as bitmasks, the
+        percentages are only evaluated for the languages the project and the filter have in common.
 
         :param filter_option: The language filter category
         :param project: The project to be checked
+        :param project_mask: Bitmask of the project languages, will be computed if not given (Default value = None)
         :returns: True``` if the language filters evaluate to true and ``False`` otherwise
 
         """
-        project_languages = list(project["languages"].keys())
+        if filter_option not in self.language_masks:
+            return False  # no languages to be filtered
+        if project_mask is None:
+            project_mask = self.language_mask(project)
+        filter_mask = self.language_masks[filter_option]
         if filter_option == "any_languages":  # project contains any language specified in the filter
-            filter_languages = list(self.any_languages.keys())
-            for item in project_languages:
-                if item in filter_languages:
-                    return eval_percentage(project["languages"][item], self.any_languages[item])
-                else:
-                    return False
+            if project_mask & filter_mask == 0:
+                return False
+            try:
+                return any(eval_percentage(percentage, self.any_languages[language])
+                           for language, percentage in project["languages"].items()
+                           if language in self.any_languages)
+            except InvalidOperatorException:
+                sys.exit(-1)
         elif filter_option == "atleast_languages":  # project contains at least the languages specified in the filter
-            filter_languages = list(self.atleast_languages.keys())
-            if all(elem in project_languages for elem in filter_languages) and len(project_languages) > 0:
-                return eval_all_percentages(project_languages, project, self.atleast_languages)
-            else:
+            if project_mask == 0 or filter_mask & ~project_mask:
                 return False
+            return eval_all_percentages(project["languages"], project, self.atleast_languages)
         elif filter_option == "exact_languages":  # project contains exactly the languages specified in the filter
-            filter_languages = list(self.exact_languages.keys())
-            if all(elem in filter_languages for elem in project_languages) \
-                    and len(filter_languages) == len(project_languages):
-                return eval_all_percentages(project_languages, project, self.exact_languages)
-            else:
+            if project_mask != filter_mask:
                 return False
-        elif filter_option == "atmost_languages":  # project contains at most the languages specified in the filter
-            filter_languages = list(self.atmost_languages.keys())
-            if all(elem in filter_languages for elem in project_languages) and len(project_languages) > 0:
-                return eval_all_percentages(project_languages, project, self.atmost_languages)
-            else:
+            return eval_all_percentages(project["languages"], project, self.exact_languages)
+        else:  # project contains at most the languages specified in the filter
+            if project_mask == 0 or project_mask & ~filter_mask:
                 return False
+            return eval_all_percentages(project["languages"], project, self.atmost_languages)
+
+
+def run_filters(corpus_filters, input_file, outs, indent=None):
+    """This function applies several filters to a corpus file in a single pass. The corpus is read once, keeping the
+    attributes needed by any of the filters, and every project is written to the outputs of all filters it passes.
+    Conditions, which occur in more than one filter, are evaluated only once per project. If the corpus file is
+    indexed, only the projects selected by the index for any of the filters are read.
+
+    :param corpus_filters: List of filters, whose filter files were loaded already
+    :param input_file: Path to input corpus
+    :param outs: List of output files, one for every filter
+    :param indent: Indentation of the JSON output, compact output if ``None`` (Default value = None)
+    :returns: Number of projects written to each output file
+    :rtype: list
+
+    """
+    shared = shared_subexpressions(*[corpus_filter.plan for corpus_filter in corpus_filters])
+    predicates = [corpus_filter.compile_predicate(corpus_filter.plan, shared) for corpus_filter in corpus_filters]
+
+    keys = set()
+    for corpus_filter in corpus_filters:
+        required = corpus_filter.required_attributes()
+        if required is None:
+            keys = None
+            break
+        keys |= required
+
+    projects = None
+    index = CorpusIndex.load(input_file)
+    if index is not None:
+        candidates = set()
+        for corpus_filter in corpus_filters:
+            selected = corpus_filter.index_candidates(index, corpus_filter.plan)
+            if selected is None:
+                break
+            candidates |= selected
         else:
-            return False  # no languages to be filtered
+            projects = read_projects(input_file, index.locations(candidates), keys)
+    if projects is None:
+        projects = iter_projects(input_file, keys)
+
+    click.echo("Filtering...")
+    with contextlib.ExitStack() as stack:
+        writers = [stack.enter_context(CorpusWriter(out, indent=indent)) for out in outs]
+        for project in projects:
+            memo = {}
+            for corpus_filter, predicate, writer in zip(corpus_filters, predicates, writers):
+                if predicate(project, memo):
+                    writer.write(corpus_filter.keep_attributes(project))
+    return [writer.count for writer in writers]
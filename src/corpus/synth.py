@@ -0,0 +1,307 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import datetime
+import math
+import random
+
+import click
+import yaml
+
+from corpus.utils.corpus_io import CorpusWriter
+
+"""
+.. module:: synth
+
+Generation of synthetic corpora with the attributes of extracted GitLab projects for scale tests of the filter,
+export and load stages. The numbers of elements of a project follow configurable distributions, e.g. the long tail of
+the number of commits, and every project is generated from its own random number generator, which is seeded by the
+seed of the corpus and the project ID. Therefore, a corpus is reproducible and the projects can be written one by
+one, so that corpora of any size can be generated with constant memory.
+"""
+
+# Distributions of the numbers of elements of a project. Supported are "lognormal" (mu, sigma), "pareto" (alpha,
+# scale), "uniform" (min, max) and "constant" (value); every distribution can be bounded by min and max.
+DISTRIBUTIONS = {
+    "commits": {"distribution": "lognormal", "mu": 3.0, "sigma": 1.5, "min": 1, "max": 100000},
+    "issues": {"distribution": "lognormal", "mu": 1.0, "sigma": 1.5, "max": 20000},
+    "mergerequests": {"distribution": "lognormal", "mu": 0.5, "sigma": 1.5, "max": 10000},
+    "mergerequest_commits": {"distribution": "lognormal", "mu": 0.5, "sigma": 0.8, "min": 1, "max": 100},
+    "milestones": {"distribution": "lognormal", "mu": -0.5, "sigma": 1.0, "max": 200},
+    "releases": {"distribution": "lognormal", "mu": -0.5, "sigma": 1.2, "max": 500},
+    "files": {"distribution": "lognormal", "mu": 2.3, "sigma": 0.8, "min": 1, "max": 1000},
+    "users": {"distribution": "lognormal", "mu": 1.0, "sigma": 0.8, "min": 1, "max": 500},
+    "languages": {"distribution": "lognormal", "mu": 0.7, "sigma": 0.6, "min": 1, "max": 10},
+}
+
+# Relative frequencies of the languages of projects
+LANGUAGES = {"Python": 25, "JavaScript": 15, "Shell": 12, "Java": 10, "C++": 10, "C": 8, "HTML": 8, "CSS": 6,
+             "CMake": 6, "Jupyter Notebook": 5, "MATLAB": 4, "TeX": 4, "Fortran": 3, "Go": 2, "Rust": 2,
+             "TypeScript": 3, "Dockerfile": 4, "Makefile": 3}
+
+GIVEN_NAMES = ["Anna", "Ben", "Clara", "David", "Eva", "Felix", "Greta", "Hannes", "Ida", "Jonas", "Katrin", "Lukas",
+               "Marie", "Niklas", "Olga", "Paul", "Rita", "Simon", "Tina", "Uwe"]
+SURNAMES = ["Bauer", "Fischer", "Hoffmann", "Klein", "Koch", "Krause", "Lange", "Meyer", "Müller", "Neumann",
+            "Richter", "Schmidt", "Schneider", "Schulz", "Wagner", "Weber", "Wolf", "Zimmermann"]
+FILE_SUFFIXES = [".py", ".md", ".txt", ".yml", ".json", ".c", ".h", ".java", ".js", ".sh", ""]
+
+START_DATE = datetime.datetime(2012, 1, 1, tzinfo=datetime.timezone.utc)
+SECONDS = 12 * 365 * 24 * 3600
+
+
+def timestamp(seconds):
+    """This function converts a time of the synthetic corpus into a timestamp.
+
+    :param seconds: Seconds after ``START_DATE``
+    :returns: The time in the format of the GitLab API
+    :rtype: str
+
+    """
+    return (START_DATE + datetime.timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def sample(rng, distribution):
+    """This function draws a number of elements from a distribution.
+
+    :param rng: The random number generator
+    :param distribution: Dictionary with the name of the distribution, its parameters and optional bounds
+    :returns: The number of elements
+    :rtype: int
+
+    """
+    kind = distribution.get("distribution", "constant")
+    if kind == "lognormal":
+        value = rng.lognormvariate(distribution.get("mu", 0.0), distribution.get("sigma", 1.0))
+    elif kind == "pareto":
+        value = distribution.get("scale", 1.0) * rng.paretovariate(distribution.get("alpha", 1.5))
+    elif kind == "uniform":
+        value = rng.randint(distribution.get("min", 0), distribution.get("max", 10))
+    elif kind == "constant":
+        value = distribution.get("value", 0)
+    else:
+        raise ValueError("Unknown distribution '{}'.".format(kind))
+    value = max(int(math.floor(value)), distribution.get("min", 0))
+    return min(value, distribution["max"]) if "max" in distribution else value
+
+
+class Synthesizer:
+    """This class generates a synthetic corpus, whose projects have the attributes and elements of extracted projects:
+    namespace, owner, users, commits, contributors, issues, merge requests with their commits and closed issues,
+    milestones, releases, files, languages and statistics.
+
+    Methods:
+        __init__(self, projects, seed=0, users=None, distributions=None, languages=None)
+        load_distributions(self, distribution_file)
+        user(self, user_id)
+        project(self, project_id)
+        generate(self)
+        write(self, out, indent=None)
+
+
+    """
+
+    def __init__(self, projects, seed=0, users=None, distributions=None, languages=None):
+        """Synthesizer class constructor to initialize the object.
+
+        :param projects: Number of projects
+        :param seed: Seed of the corpus (Default value = 0)
+        :param users: Number of users of the GitLab instance, which are shared by the projects, ``projects // 2 + 1``
+            if not given (Default value = None)
+        :param distributions: Distributions, whose parameters and bounds replace the ones in ``DISTRIBUTIONS``
+            (Default value = None)
+        :param languages: Relative frequencies of the languages, which replace ``LANGUAGES`` (Default value = None)
+
+        """
+        self.projects = projects
+        self.seed = seed
+        self.users = users or projects // 2 + 1
+        self.distributions = {name: dict(distribution) for name, distribution in DISTRIBUTIONS.items()}
+        for name, distribution in (distributions or {}).items():
+            self.distributions[name] = dict(self.distributions.get(name, {}), **distribution)
+        self.languages = dict(languages or LANGUAGES)
+
+    def load_distributions(self, distribution_file):
+        """This method loads distributions and language frequencies from a file with the keys ``distributions`` and
+        ``languages``, e.g. ``distributions: {commits: {distribution: pareto, alpha: 1.2, max: 50000}}``. The
+        parameters and bounds of a distribution replace the given ones of the default distribution, the others, e.g.
+        the bound ``min: 1`` of the commits, are kept.
+
+        :param distribution_file: Path to the file in yaml format
+
+        """
+        with open(distribution_file, "r") as f:
+            settings = yaml.safe_load(f) or {}
+        for name, distribution in (settings.get("distributions") or {}).items():
+            if name not in self.distributions:
+                raise ValueError("Unknown element '{}' in the distribution file.".format(name))
+            self.distributions[name] = dict(self.distributions[name], **distribution)
+        if settings.get("languages"):
+            self.languages = dict(settings["languages"])
+
+    def user(self, user_id):
+        """This method generates a user of the GitLab instance.
+
+        :param user_id: ID of the user
+        :returns: The user, which is the same for the same ID
+        :rtype: dict
+
+        """
+        given_name = GIVEN_NAMES[user_id % len(GIVEN_NAMES)]
+        surname = SURNAMES[(user_id // len(GIVEN_NAMES)) % len(SURNAMES)]
+        username = "{}.{}{}".format(given_name, surname, user_id).lower()
+        return {"id": user_id, "name": "{}, {}".format(surname, given_name), "username": username, "state": "active",
+                "avatar_url": None, "web_url": "https://gitlab.example.com/{}".format(username),
+                "public_email": "{}@example.com".format(username)}
+
+    def project(self, project_id):
+        """This method generates a project.
+
+        :param project_id: ID of the project
+        :returns: The project
+        :rtype: dict
+
+        """
+        rng = random.Random("{}:{}".format(self.seed, project_id))
+
+        def count(name):
+            return sample(rng, self.distributions[name])
+
+        def brief(user):
+            return {key: user[key] for key in ("id", "name", "username", "state", "avatar_url", "web_url")}
+
+        members = [self.user(user_id) for user_id in
+                   rng.sample(range(1, self.users + 1), min(max(count("users"), 1), self.users))]
+        owner = members[0]  # every project has at least its owner as member
+        path = "project-{}".format(project_id)
+        web_url = "https://gitlab.example.com/{}/{}".format(owner["username"], path)
+        created = rng.randrange(SECONDS // 2)
+
+        commits = []
+        commit_count = count("commits")
+        for index in range(commit_count):
+            author = rng.choice(members)
+            sha = "{:040x}".format(rng.getrandbits(160))
+            date = timestamp(created + (SECONDS - created) * index // commit_count)
+            commits.append({"id": sha, "short_id": sha[:8], "created_at": date,
+                            "parent_ids": [commits[-1]["id"]] if commits else [], "title": "Commit {}".format(index),
+                            "message": "Commit {}\n".format(index), "author_name": author["name"],
+                            "author_email": author["public_email"], "authored_date": date,
+                            "committer_name": author["name"], "committer_email": author["public_email"],
+                            "committed_date": date, "web_url": "{}/-/commit/{}".format(web_url, sha),
+                            "project_id": project_id})
+        commits.reverse()  # the API lists the newest commit first
+        contributions = {}
+        for commit in commits:
+            contributions[commit["author_email"]] = contributions.get(commit["author_email"], 0) + 1
+        contributors = [{"name": member["name"], "email": member["public_email"],
+                         "commits": contributions[member["public_email"]], "additions": rng.randrange(10000),
+                         "deletions": rng.randrange(5000)}
+                        for member in members if member["public_email"] in contributions]
+
+        milestones = [{"id": project_id * 1000 + index, "iid": index + 1, "project_id": project_id,
+                       "title": "Milestone {}".format(index + 1), "state": rng.choice(["active", "closed"]),
+                       "created_at": timestamp(created), "web_url": "{}/-/milestones/{}".format(web_url, index + 1)}
+                      for index in range(count("milestones"))]
+        issues = []
+        for index in range(count("issues")):
+            state = rng.choice(["opened", "closed", "closed"])
+            milestone = rng.choice(milestones) if milestones and rng.random() < 0.5 else None
+            issues.append({"id": project_id * 100000 + index, "iid": index + 1, "project_id": project_id,
+                           "title": "Issue {}".format(index + 1), "description": "", "state": state,
+                           "created_at": timestamp(created + rng.randrange(SECONDS - created)),
+                           "labels": rng.sample(["bug", "feature", "documentation"], rng.randint(0, 2)),
+                           "milestone": {key: milestone[key] for key in ("id", "iid", "project_id")}
+                           if milestone is not None else None,
+                           "author": brief(rng.choice(members)), "assignees": [brief(rng.choice(members))],
+                           "user_notes_count": rng.randrange(20), "upvotes": rng.randrange(5),
+                           "time_stats": {"time_estimate": 0, "total_time_spent": 0},
+                           "web_url": "{}/-/issues/{}".format(web_url, index + 1)})
+        mergerequests = []
+        for index in range(count("mergerequests")):
+            state = rng.choice(["merged", "merged", "opened", "closed"])
+            author = brief(rng.choice(members))
+            mergerequests.append({
+                "id": project_id * 100000 + index, "iid": index + 1, "project_id": project_id,
+                "title": "Merge request {}".format(index + 1), "description": "", "state": state,
+                "created_at": timestamp(created + rng.randrange(SECONDS - created)),
+                "merged_by": brief(owner) if state == "merged" else None, "author": author,
+                "assignees": [author], "reviewers": [brief(rng.choice(members))],
+                "source_branch": "feature-{}".format(index + 1), "target_branch": "master",
+                "source_project_id": project_id, "target_project_id": project_id, "draft": False,
+                "merge_status": "can_be_merged", "has_conflicts": False,
+                "commits": rng.sample(commits, min(count("mergerequest_commits"), len(commits))),
+                "close_issues": rng.sample(issues, 1) if issues and rng.random() < 0.3 else []})
+        releases = []
+        for index in range(count("releases")):
+            tag_name = "v{}.{}.0".format(index // 10, index % 10)
+            releases.append({
+                "tag_name": tag_name, "name": "Release {}".format(tag_name), "description": "",
+                "created_at": timestamp(created + rng.randrange(SECONDS - created)), "author": brief(owner),
+                "commit": {key: value for key, value in rng.choice(commits).items() if key != "web_url"}
+                if commits else None,
+                "milestones": rng.sample(milestones, 1) if milestones else [],
+                "assets": {"count": 1, "sources": [{"format": "zip", "url": "{}/-/archive/{}.zip".format(
+                    web_url, tag_name)}], "links": []}})
+        files = []
+        for index in range(count("files")):
+            name = "file{}{}".format(index, rng.choice(FILE_SUFFIXES))
+            files.append({"id": "{:040x}".format(rng.getrandbits(160)), "name": name,
+                          "type": rng.choice(["blob", "blob", "tree"]), "path": name, "mode": "100644"})
+
+        names = list(self.languages)
+        chosen = set()
+        for _ in range(min(count("languages"), len(names))):
+            chosen.add(rng.choices(names, weights=[self.languages[name] for name in names])[0])
+        shares = {name: rng.random() ** 2 + 0.01 for name in sorted(chosen)}
+        total = sum(shares.values())
+        languages = {name: round(100 * share / total, 2)
+                     for name, share in sorted(shares.items(), key=lambda item: -item[1])}
+
+        closed = sum(1 for issue in issues if issue["state"] == "closed")
+        return {
+            "id": project_id, "description": "Synthetic project {}".format(project_id),
+            "name": "Project {}".format(project_id),
+            "name_with_namespace": "{} / Project {}".format(owner["name"], project_id), "path": path,
+            "path_with_namespace": "{}/{}".format(owner["username"], path), "created_at": timestamp(created),
+            "default_branch": "master", "tag_list": [], "topics": [],
+            "ssh_url_to_repo": "git@gitlab.example.com:{}/{}.git".format(owner["username"], path),
+            "http_url_to_repo": web_url + ".git", "web_url": web_url, "readme_url": web_url + "/-/README.md",
+            "forks_count": sample(rng, {"distribution": "lognormal", "mu": -1.0, "sigma": 1.5}),
+            "star_count": sample(rng, {"distribution": "lognormal", "mu": -0.5, "sigma": 1.5}),
+            "last_activity_at": commits[0]["committed_date"] if commits else timestamp(created),
+            "namespace": {"id": owner["id"], "name": owner["name"], "path": owner["username"], "kind": "user",
+                          "full_path": owner["username"], "parent_id": None,
+                          "web_url": owner["web_url"]},
+            "visibility": rng.choice(["public", "internal", "internal"]), "owner": brief(owner),
+            "archived": rng.random() < 0.1, "empty_repo": not commits, "issues_enabled": True,
+            "merge_requests_enabled": True, "wiki_enabled": rng.random() < 0.5, "creator_id": owner["id"],
+            "open_issues_count": len(issues) - closed,
+            "issue_statistics": {"counts": {"all": len(issues), "closed": closed, "opened": len(issues) - closed}},
+            "languages": languages, "users": members, "commits": commits,
+            "first_commit": commits[-1] if commits else None, "last_commit": commits[0] if commits else None,
+            "contributors": contributors, "issues": issues, "mergerequests": mergerequests,
+            "pipelines": {"successful": 0, "failed": 0, "canceled": 0, "pending": 0, "total": 0},
+            "milestones": milestones, "files": files, "releases": releases,
+        }
+
+    def generate(self):
+        """This method generates the projects one by one.
+
+        :returns: Iterator of the projects
+
+        """
+        for project_id in range(1, self.projects + 1):
+            yield self.project(project_id)
+
+    def write(self, out, indent=None):
+        """This method writes the projects into a corpus file, which may be compressed or in the JSON Lines format
+        according to its suffix.
+
+        :param out: Path to the output file
+        :param indent: Indentation of the JSON output, compact output if ``None`` (Default value = None)
+
+        """
+        with CorpusWriter(out, indent=indent) as writer:
+            with click.progressbar(self.generate(), length=self.projects) as bar:
+                for project in bar:
+                    writer.write(project)
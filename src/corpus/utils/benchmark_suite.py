@@ -0,0 +1,249 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from corpus.export import Exporter
+from corpus.extract import Extractor
+from corpus.filter import Filter
+from corpus.synth import LANGUAGES, Synthesizer
+from corpus.utils.corpus_io import load_corpus
+from corpus.utils.export_benchmark import RecordingGraph
+from corpus.utils.fake_gitlab import FakeGitlab
+from corpus.utils.helpers import Config, Corpus
+from corpus.utils.profiling import peak_rss
+
+"""
+.. module:: benchmark_suite
+
+Benchmark suite of the pipeline stages: the extraction from a fake GitLab instance, filters with scalar, regex and
+language conditions and the export into every output format. Every case runs on synthetic corpora of several sizes,
+by default in a new process, so that the peak RSS belongs to the case. The results are written into a JSON file,
+which can be compared with the results of an earlier run to find regressions.
+"""
+
+SIZES = [100, 1000]
+
+# Filter files of the filter cases, the language case has conditions for many languages like the filter templates
+FILTERS = {
+    "scalar": {"filters": {"star_count": {"operator": ">=", "value": 1},
+                           "visibility": {"operator": "==", "value": "internal"},
+                           "archived": {"operator": "==", "value": False}},
+               "attributes": ["id", "name", "star_count"]},
+    "regex": {"filters": {"name": {"operator": "regex", "value": "Project \\d*[13579]$"},
+                          "description": {"operator": "regex", "value": ".*[Ss]ynthetic"}},
+              "attributes": ["id", "name"]},
+    "languages": {"filters": {
+        "any_languages": {"Python": {"operator": ">=", "value": 20.0}, "C++": {"operator": ">=", "value": 20.0},
+                          "Fortran": {"operator": ">", "value": 0.0}},
+        "atmost_languages": dict({name: {"operator": "<=", "value": 90.0} for name in LANGUAGES},
+                                 **{"Language {}".format(index): {"operator": "<=", "value": 50.0}
+                                    for index in range(400)})},
+        "attributes": ["id", "name", "languages"]},
+}
+
+EXPORT_FORMATS = ["json", "console", "neo4j", "neo4j-csv", "sqlite", "parquet", "arrow"]
+
+STAGES = ["extract", "filter", "export"]
+
+CASES = ["extract"] + ["filter-" + name for name in FILTERS] + ["export-" + name for name in EXPORT_FORMATS]
+
+# Metrics, which are compared with the baseline. Larger values are worse.
+METRICS = ["seconds", "peak_rss_bytes", "allocated_peak_bytes"]
+
+
+def prepare_case(case, corpus_file, directory, filter_files=None):
+    """This function prepares a case, so that only the work of the pipeline stage is measured.
+
+    :param case: Name of the case, see ``CASES``
+    :param corpus_file: Path to the synthetic corpus
+    :param directory: Directory for the output of the case
+    :param filter_files: Dictionary of the names and paths of filter files, which replace the ones of ``FILTERS``
+        (Default value = None)
+    :returns: Function, which runs the case
+    :rtype: callable
+
+    """
+    config = Config()
+    if case == "extract":
+        projects = load_corpus(corpus_file)["Projects"]
+
+        def run():
+            Extractor(False, FakeGitlab(projects), Corpus()).extract(all_elements=True)
+        return run
+    if case.startswith("filter-"):
+        name = case[len("filter-"):]
+        filter_file = (filter_files or {}).get(name) or os.path.join(directory, name + ".yaml")
+        if not os.path.exists(filter_file):
+            with open(filter_file, "w") as f:
+                yaml.safe_dump(FILTERS[name], f)
+
+        def run():
+            corpus_filter = Filter(False, corpus=Corpus())
+            corpus_filter.load_filters(filter_file)
+            corpus_filter.load_corpus(corpus_file)
+            corpus_filter.filter()
+        return run
+    if case.startswith("export-"):
+        output_format = case[len("export-"):]
+        if output_format in ("parquet", "arrow"):
+            import pyarrow  # noqa: F401, raises ImportError without the optional dependencies
+        corpus = Corpus()
+        corpus.data = load_corpus(corpus_file)
+        out = os.path.join(directory, "export-{}".format(output_format.replace("-", "_")))
+        if output_format in ("json", "sqlite"):
+            out += "." + ("json" if output_format == "json" else "db")
+        config.neo4j_config = {"NEO4J": {}}
+
+        def run():
+            exporter = Exporter(config, corpus, output_format)
+            if output_format == "neo4j":
+                exporter.graph = RecordingGraph()
+                exporter.export_to_neo4j()
+            elif output_format == "console":
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    exporter.export(out)
+            else:
+                exporter.export(out)
+        return run
+    raise ValueError("Unknown benchmark case '{}'.".format(case))
+
+
+def run_case(case, size, corpus_file, directory, repeat=1, filter_files=None):
+    """This function measures a case. The wall time is the minimum of ``repeat`` runs, the peak of the allocated
+    memory is measured by an additional run with :mod:`tracemalloc`.
+
+    :param case: Name of the case, see ``CASES``
+    :param size: Number of projects of the corpus
+    :param corpus_file: Path to the synthetic corpus
+    :param directory: Directory for the output of the case
+    :param repeat: Number of timed runs (Default value = 1)
+    :param filter_files: Dictionary of the names and paths of filter files (Default value = None)
+    :returns: Dictionary of the case, the size and the measured values
+    :rtype: dict
+
+    """
+    try:
+        run = prepare_case(case, corpus_file, directory, filter_files)
+    except ImportError as e:
+        return {"case": case, "size": size, "skipped": str(e)}
+    seconds = None
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        seconds = duration if seconds is None else min(seconds, duration)
+    rss = peak_rss()
+    tracemalloc.start()
+    try:
+        run()
+        allocated = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"case": case, "size": size, "seconds": seconds, "projects_per_second": size / max(seconds, 1e-9),
+            "peak_rss_bytes": rss, "allocated_peak_bytes": allocated}
+
+
+def run_suite(sizes=None, cases=None, repeat=1, seed=0, isolate=True, filter_files=None, directory=None):
+    """This function runs the cases of the suite on synthetic corpora of several sizes.
+
+    :param sizes: Numbers of projects of the corpora (Default value = SIZES)
+    :param cases: Names of the cases or stages like ``filter`` (Default value = CASES)
+    :param repeat: Number of timed runs of every case (Default value = 1)
+    :param seed: Seed of the synthetic corpora (Default value = 0)
+    :param isolate: Runs every case in a new process, if set to ``True`` (Default value = True)
+    :param filter_files: Dictionary of the names and paths of additional filter files, which are run as cases
+        ``filter-<name>`` (Default value = None)
+    :param directory: Directory for the corpora and the output, a temporary directory if not given
+        (Default value = None)
+    :returns: The results with information about the environment
+    :rtype: dict
+
+    """
+    filter_files = dict(filter_files or {})
+    selected = CASES + ["filter-" + name for name in filter_files if "filter-" + name not in CASES]
+    if cases:
+        selected = [case for case in selected if any(case == name or name in STAGES and case.startswith(name + "-")
+                                                      for name in cases)]
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = directory or temporary
+        os.makedirs(directory, exist_ok=True)
+        for size in sizes or SIZES:
+            corpus_file = os.path.join(directory, "corpus-{}.jsonl".format(size))
+            Synthesizer(size, seed).write(corpus_file)
+            for case in selected:
+                arguments = (case, size, corpus_file, directory, repeat, filter_files)
+                if isolate:
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        results.append(executor.submit(run_case, *arguments).result())
+                else:
+                    results.append(run_case(*arguments))
+    return {"created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(), "platform": platform.platform(), "seed": seed,
+            "isolated": isolate, "results": results}
+
+
+def compare(results, baseline, threshold=0.2):
+    """This function compares results with the results of an earlier run. A metric has regressed, if it is larger
+    than its baseline value by more than the threshold.
+
+    :param results: The current results, see :func:`run_suite`
+    :param baseline: The results of the earlier run
+    :param threshold: Allowed relative increase of a metric (Default value = 0.2)
+    :returns: List of the regressions with the case, the size, the metric, both values and their ratio
+    :rtype: list
+
+    """
+    previous = {(result["case"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        before = previous.get((result["case"], result["size"]))
+        if before is None:
+            continue
+        for metric in METRICS:
+            if not before.get(metric) or result.get(metric) is None:
+                continue
+            ratio = result[metric] / before[metric]
+            if ratio > 1 + threshold:
+                regressions.append({"case": result["case"], "size": result["size"], "metric": metric,
+                                    "baseline": before[metric], "current": result[metric], "ratio": ratio})
+    return regressions
+
+
+def save_results(results, path):
+    """This function writes the results of a run of the suite into a file.
+
+    :param results: The results, see :func:`run_suite`
+    :param path: Path to the JSON file
+
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4)
+
+
+def load_results(path):
+    """This function reads the results of a run of the suite from a file.
+
+    :param path: Path to the JSON file
+    :returns: The results, see :func:`run_suite`
+    :rtype: dict
+
+    """
+    with open(path, "r") as f:
+        return json.load(f)
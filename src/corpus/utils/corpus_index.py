@@ -0,0 +1,251 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import bisect
+import json
+import os
+
+from corpus.utils.corpus_io import compression, open_reader
+from corpus.utils.filter_cache import corpus_fingerprint
+
+"""
+.. module:: corpus_index
+
+Secondary indexes over a corpus file. The index is stored next to the corpus in the file ``<corpus file>.index`` and
+contains the position of every project in the corpus file, sorted columns of all numeric attributes, posting lists of
+the project languages and hash indexes of some string attributes. Filters use the index to select the projects, which
+can pass, and decode only these projects from the corpus file.
+"""
+
+# Increase, if the layout of the index file changes
+INDEX_VERSION = 1
+
+HASH_COLUMNS = ["name", "path", "path_with_namespace", "visibility", "namespace.name", "namespace.path",
+                "namespace.full_path", "namespace.kind"]
+
+
+def iter_columns(value, path=""):
+    """This function yields the paths and values of all attributes of a project, which are not dictionaries. Nested
+    dictionaries are expanded into dotted paths, lists are not expanded.
+
+    :param value: The project or a nested dictionary
+    :param path: Path of ``value`` in the project (Default value = "")
+
+    """
+    for key, element in value.items():
+        if isinstance(element, dict):
+            yield from iter_columns(element, path + key + ".")
+        else:
+            yield path + key, element
+
+
+def is_number(value):
+    """This function checks, if a value can be stored in a numeric column.
+
+    :param value: Value of an attribute
+    :returns: ``True``, if the value is an integer or a float, but no boolean
+    :rtype: bool
+
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class CorpusIndex:
+    """This class holds the secondary indexes of a corpus file.
+
+    Every column lists the projects, whose attribute can be looked up in the index, in the order of the attribute
+    values. Projects, whose attribute has a value of another type (e.g. ``None``), are listed separately as
+    ``other``, because the filters might still compare them.
+
+    Methods:
+        __init__(self, corpus_file, data)
+        build(cls, corpus_file, hash_columns=None)
+        load(cls, corpus_file)
+        save(self)
+        locations(self, projects)
+        everything(self)
+        has_column(self, path)
+        has_hash(self, path)
+        range(self, path, low=None, high=None)
+        lookup(self, path, value)
+        languages(self, language)
+        with_languages(self)
+
+
+    """
+
+    def __init__(self, corpus_file, data):
+        """CorpusIndex class constructor to initialize the object.
+
+        :param corpus_file: Path to the corpus file
+        :param data: Content of the index file
+
+        """
+        self.corpus_file = corpus_file
+        self.data = data
+        self.size = len(data["offsets"])
+
+    @classmethod
+    def build(cls, corpus_file, hash_columns=None):
+        """This method reads the corpus file once and builds its index.
+
+        :param corpus_file: Path to the corpus file
+        :param hash_columns: Paths of the string attributes to be indexed (Default value = None, see
+            ``HASH_COLUMNS``)
+        :returns: The index
+        :rtype: CorpusIndex
+        :raises ValueError: If the corpus file is compressed, as compressed files cannot be read at an offset
+
+        """
+        if compression(corpus_file) is not None:
+            raise ValueError("Compressed corpus files cannot be indexed")
+        hash_columns = set(HASH_COLUMNS if hash_columns is None else hash_columns)
+        fingerprint = corpus_fingerprint(corpus_file)
+        offsets, numeric, hashes, languages, with_languages = [], {}, {}, {}, []
+        with open_reader(corpus_file) as reader:
+            for category, offset, length, project in reader:
+                if category != "Projects" or not isinstance(project, dict):
+                    continue
+                index = len(offsets)
+                offsets.append([offset, length])
+                for path, value in iter_columns(project):
+                    column = numeric.setdefault(path, {"entries": [], "other": []})
+                    if is_number(value):
+                        column["entries"].append((value, index))
+                    else:
+                        column["other"].append(index)
+                    if path in hash_columns:
+                        column = hashes.setdefault(path, {"values": {}, "other": []})
+                        if isinstance(value, str):
+                            column["values"].setdefault(value, []).append(index)
+                        else:
+                            column["other"].append(index)
+                if isinstance(project.get("languages"), dict):
+                    with_languages.append(index)
+                    for language, percentage in project["languages"].items():
+                        languages.setdefault(language, []).append([index, percentage])
+
+        columns = {}
+        for path, column in numeric.items():
+            if len(column["entries"]) > 0:
+                column["entries"].sort()
+                columns[path] = {"values": [value for value, _ in column["entries"]],
+                                 "projects": [index for _, index in column["entries"]],
+                                 "other": column["other"]}
+        data = {"version": INDEX_VERSION, "fingerprint": fingerprint, "offsets": offsets, "columns": columns,
+                "hashes": hashes, "languages": languages, "with_languages": with_languages}
+        return cls(corpus_file, data)
+
+    @classmethod
+    def load(cls, corpus_file):
+        """This method loads the index of a corpus file.
+
+        :param corpus_file: Path to the corpus file
+        :returns: The index or ``None``, if there is no index or the corpus file changed after it was indexed
+        :rtype: CorpusIndex or None
+
+        """
+        if compression(corpus_file) is not None:
+            return None
+        try:
+            with open(corpus_file + ".index", "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or data.get("fingerprint") != corpus_fingerprint(corpus_file):
+            return None
+        return cls(corpus_file, data)
+
+    def save(self):
+        """This method writes the index next to the corpus file."""
+        path = self.corpus_file + ".index"
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.data, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def locations(self, projects):
+        """This method returns the positions of projects in the corpus file.
+
+        :param projects: Indexes of the projects
+        :returns: List of tuples ``(offset, length)`` in bytes, in the order of the corpus file
+        :rtype: list
+
+        """
+        return [tuple(self.data["offsets"][index]) for index in sorted(projects)]
+
+    def everything(self):
+        """This method returns all projects of the corpus.
+
+        :returns: Indexes of all projects
+        :rtype: set
+
+        """
+        return set(range(self.size))
+
+    def has_column(self, path):
+        """This method checks, if a numeric attribute is indexed.
+
+        :param path: Path of the attribute
+        :returns: ``True``, if the numeric attribute is indexed
+        :rtype: bool
+
+        """
+        return path in self.data["columns"]
+
+    def has_hash(self, path):
+        """This method checks, if a string attribute is indexed.
+
+        :param path: Path of the attribute
+        :returns: ``True``, if the string attribute is indexed
+        :rtype: bool
+
+        """
+        return path in self.data["hashes"]
+
+    def range(self, path, low=None, high=None):
+        """This method selects the projects, whose numeric attribute lies within a closed range, and the projects,
+        whose attribute is not a number.
+
+        :param path: Path of the attribute
+        :param low: Lower bound of the range, unbounded if ``None`` (Default value = None)
+        :param high: Upper bound of the range, unbounded if ``None`` (Default value = None)
+        :returns: Indexes of the projects
+        :rtype: set
+
+        """
+        column = self.data["columns"][path]
+        start = 0 if low is None else bisect.bisect_left(column["values"], low)
+        end = len(column["values"]) if high is None else bisect.bisect_right(column["values"], high)
+        return set(column["projects"][start:end]).union(column["other"])
+
+    def lookup(self, path, value):
+        """This method selects the projects, whose string attribute equals a value, and the projects, whose attribute
+        is not a string.
+
+        :param path: Path of the attribute
+        :param value: The value
+        :returns: Indexes of the projects
+        :rtype: set
+
+        """
+        column = self.data["hashes"][path]
+        return set(column["values"].get(value, []) if isinstance(value, str) else []).union(column["other"])
+
+    def languages(self, language):
+        """This method returns the projects using a language.
+
+        :param language: Name of the language
+        :returns: List of pairs ``[project index, percentage]`` of all projects using the language
+        :rtype: list
+
+        """
+        return self.data["languages"].get(language, [])
+
+    def with_languages(self):
+        """This method returns the projects, which have languages.
+
+        :returns: Indexes of all projects, which have languages
+        :rtype: set
+
+        """
+        return set(self.data["with_languages"])
@@ -0,0 +1,615 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import gzip
+import io
+import json
+import os
+import re
+
+from corpus.utils.profiling import profiled
+
+try:
+    import orjson
+except ImportError:  # optional dependency, install the extra "fast"
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, install the extra "zstd"
+    zstandard = None
+
+"""
+.. module:: corpus_io
+
+Streaming access to corpus files. A corpus file is read in chunks and every project is decoded on its own, so the
+text of the whole file is never held in memory. If only some attributes of the projects are needed, all other
+attributes are dropped directly after a project is decoded.
+
+Corpus files are written with a serializer, which converts a value to UTF-8 encoded JSON. By default, the native
+encoder of ``orjson`` is used, if it is installed, and the C encoder of the standard library otherwise.
+
+The format of a corpus file is chosen by its suffix. Files ending with ``.jsonl`` contain one project per line (JSON
+Lines) instead of the object ``{"Projects": [...]}``. Files ending with ``.gz`` or ``.zst`` are compressed with gzip
+or Zstandard and are compressed and decompressed while they are streamed, e.g. ``corpus.jsonl.zst``.
+"""
+
+CHUNK_SIZE = 1 << 20
+BUFFER_SIZE = 1 << 20
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+ZSTD_THREADS = -1  # one compression thread per CPU core
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+
+
+def byte_length(text):
+    """This function returns the length of a text encoded in UTF-8.
+
+    :param text: The text
+    :returns: Number of bytes of the encoded text
+    :rtype: int
+
+    """
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def compression(file):
+    """This function returns the compression of a corpus file by its suffix.
+
+    :param file: Path to the corpus file
+    :returns: ``"gzip"``, ``"zstd"`` or ``None`` for uncompressed files
+    :rtype: str or None
+
+    """
+    if file.endswith(".gz"):
+        return "gzip"
+    elif file.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def is_json_lines(file):
+    """This function checks, if a corpus file is in the JSON Lines format.
+
+    :param file: Path to the corpus file
+    :returns: ``True``, if the corpus file contains one project per line
+    :rtype: bool
+
+    """
+    if compression(file) is not None:
+        file = file.rsplit(".", 1)[0]
+    return file.endswith(".jsonl")
+
+
+def open_binary(file, mode="rb", level=None):
+    """This function opens a corpus file as binary stream, which compresses or decompresses the data according to the
+    suffix of the file.
+
+    :param file: Path to the corpus file
+    :param mode: ``"rb"`` or ``"wb"`` (Default value = "rb")
+    :param level: Compression level, the default level of the compression if ``None`` (Default value = None)
+    :returns: The binary stream
+    :raises ImportError: If the file is compressed with Zstandard and the package ``zstandard`` is not installed
+
+    """
+    kind = compression(file)
+    if kind == "gzip":
+        if mode == "rb":
+            return gzip.open(file, "rb")
+        return gzip.open(file, "wb", compresslevel=GZIP_LEVEL if level is None else level)
+    elif kind == "zstd":
+        if zstandard is None:
+            raise ImportError("The package zstandard is needed for the corpus file {}".format(file))
+        if mode == "rb":
+            reader = zstandard.ZstdDecompressor().stream_reader(open(file, "rb"), read_across_frames=True,
+                                                                closefd=True)
+            return io.BufferedReader(reader, CHUNK_SIZE)
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL if level is None else level, threads=ZSTD_THREADS)
+        return compressor.stream_writer(open(file, "wb"), closefd=True)
+    return open(file, mode)
+
+
+class CorpusReader:
+    """This class reads a corpus file of the form ``{"Projects": [...]}`` element by element. Every element is
+    decoded on its own by the C decoder of the standard library and reduced to the requested attributes right away, so
+    the attributes, which are not requested, are released before the next element is read.
+
+    Methods:
+        __init__(self, file, keys=None, chunk_size=CHUNK_SIZE)
+        __iter__(self)
+
+
+    """
+
+    def __init__(self, file, keys=None, chunk_size=CHUNK_SIZE):
+        """CorpusReader class constructor to initialize the object.
+
+        :param file: Corpus file opened in text mode without newline translation
+        :param keys: Attributes of the projects to be kept, all attributes if ``None`` (Default value = None)
+        :param chunk_size: Number of characters read at once (Default value = CHUNK_SIZE)
+
+        """
+        self.file = file
+        self.keys = tuple(keys) if keys is not None else None
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.mark = 0  # index in the buffer, whose offset in the file is known
+        self.mark_offset = 0  # offset of the mark in the file in bytes
+        self.eof = False
+        self.metadata = {}  # top-level values of the corpus, which are not lists
+
+    def fill(self, position, size=0):
+        """This method drops the buffer up to ``position`` and reads the next chunk.
+
+        :param position: First index of the buffer, which is still needed
+        :param size: Minimum number of characters to read (Default value = 0)
+        :returns: ``False``, if the end of the file is reached
+
+        """
+        data = self.file.read(max(self.chunk_size, size))
+        self.mark_offset = self.offset(position)
+        self.mark = 0
+        self.buffer = self.buffer[position:] + data
+        if not data:
+            self.eof = True
+        return bool(data)
+
+    def offset(self, position):
+        """This method returns the offset of a position in the buffer in the file in bytes. Positions have to be
+        passed in increasing order.
+
+        :param position: Index in the buffer
+
+        """
+        self.mark_offset += byte_length(self.buffer[self.mark:position])
+        self.mark = position
+        return self.mark_offset
+
+    def skip_whitespace(self, position):
+        """This method skips whitespace and returns the index of the next character, which is not whitespace.
+
+        :param position: Index in the buffer
+
+        """
+        while True:
+            position = WHITESPACE.match(self.buffer, position).end()
+            if position < len(self.buffer):
+                return position
+            if not self.fill(position):
+                raise ValueError("Unexpected end of corpus file")
+            position = 0
+
+    def expect(self, position, token):
+        """This method skips the whitespace and an expected character.
+
+        :param position: Index in the buffer
+        :param token: The expected character
+        :returns: Index after the character
+        :rtype: int
+        :raises ValueError: If the next character is not the expected one
+
+        """
+        position = self.skip_whitespace(position)
+        if self.buffer[position] != token:
+            raise ValueError("Expected '{}' at offset {} of corpus file".format(token, self.offset(position)))
+        return position + 1
+
+    def decode(self, position):
+        """This method decodes the value starting at ``position``. The buffer is refilled as long as the value is
+        incomplete.
+
+        :param position: Index of the first character of the value
+        :returns: Tuple of the value, its start and its end index in the buffer
+        :rtype: tuple
+
+        """
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, position)
+                # numbers and constants might continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    return value, position, end
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # read at least as much as already buffered, so that large values are not decoded too often
+            self.fill(position, len(self.buffer) - position)
+            position = 0
+
+    def __iter__(self):
+        """This method yields the elements of all lists in the corpus, e.g. the projects.
+
+        :returns: Iterator of tuples ``(category, offset, length, element)``, where offset and length describe the
+            position of the element in the file in bytes
+
+        """
+        position = self.expect(0, "{")
+        position = self.skip_whitespace(position)
+        if self.buffer[position] == "}":
+            return
+        while True:
+            category, position, end = self.decode(position)
+            position = self.expect(end, ":")
+            position = self.skip_whitespace(position)
+            if self.buffer[position] == "[":
+                position = self.skip_whitespace(position + 1)
+                if self.buffer[position] == "]":
+                    position += 1
+                else:
+                    while True:
+                        element, position, end = self.decode(position)
+                        if self.keys is not None and isinstance(element, dict):
+                            element = {key: element[key] for key in self.keys if key in element}
+                        offset = self.offset(position)
+                        yield category, offset, self.offset(end) - offset, element
+                        position = self.skip_whitespace(end)
+                        if self.buffer[position] == "]":
+                            position += 1
+                            break
+                        position = self.skip_whitespace(self.expect(position, ","))
+            else:
+                self.metadata[category], _, position = self.decode(position)
+            position = self.skip_whitespace(position)
+            if self.buffer[position] == "}":
+                return
+            position = self.skip_whitespace(self.expect(position, ","))
+
+
+class JsonLinesReader:
+    """This class reads a corpus file with one project per line.
+
+    Methods:
+        __init__(self, file, keys=None)
+        __iter__(self)
+
+
+    """
+
+    def __init__(self, file, keys=None):
+        """JsonLinesReader class constructor to initialize the object.
+
+        :param file: Corpus file opened in binary mode
+        :param keys: Attributes of the projects to be kept, all attributes if ``None`` (Default value = None)
+
+        """
+        self.file = file
+        self.keys = tuple(keys) if keys is not None else None
+        self.metadata = {}
+
+    def __iter__(self):
+        """This method yields the projects.
+
+        :returns: Iterator of tuples ``("Projects", offset, length, project)``, where offset and length describe the
+            position of the line in the file in bytes
+
+        """
+        offset = 0
+        for line in self.file:
+            if line.strip():
+                project = json.loads(line)
+                if self.keys is not None and isinstance(project, dict):
+                    project = {key: project[key] for key in self.keys if key in project}
+                yield "Projects", offset, len(line), project
+            offset += len(line)
+
+
+@contextlib.contextmanager
+def open_reader(file, keys=None):
+    """This function opens a corpus file and returns a reader for its format, see :class:`CorpusReader` and
+    :class:`JsonLinesReader`.
+
+    :param file: Path to the corpus file
+    :param keys: Attributes of the projects to be kept, all attributes if ``None`` (Default value = None)
+
+    """
+    if is_json_lines(file):
+        with open_binary(file) as f:
+            yield JsonLinesReader(f, keys)
+    elif compression(file) is None:
+        with open(file, "r", encoding="utf-8", newline="") as f:
+            yield CorpusReader(f, keys)
+    else:
+        with io.TextIOWrapper(open_binary(file), encoding="utf-8", newline="") as f:
+            yield CorpusReader(f, keys)
+
+
+def iter_projects(file, keys=None):
+    """This function yields the projects of a corpus file one by one.
+
+    :param file: Path to the corpus file
+    :param keys: Attributes of the projects to be kept, all attributes if ``None`` (Default value = None)
+
+    """
+    with open_reader(file, keys) as reader:
+        for category, _, _, element in reader:
+            if category == "Projects":
+                yield element
+
+
+def read_projects(file, locations, keys=None):
+    """This function decodes single projects of a corpus file, e.g. the projects selected by a
+    :class:`corpus.utils.corpus_index.CorpusIndex`.
+
+    :param file: Path to the corpus file
+    :param locations: Iterable of tuples ``(offset, length)`` in bytes, in increasing order
+    :param keys: Attributes of the projects to be kept, all attributes if ``None`` (Default value = None)
+
+    """
+    keys = tuple(keys) if keys is not None else None
+    with open_binary(file) as f:
+        for offset, length in locations:
+            f.seek(offset)
+            project = json.loads(f.read(length))
+            if keys is not None:
+                project = {key: project[key] for key in keys if key in project}
+            yield project
+
+
+def load_corpus(file, keys=None):
+    """This function loads the data of a corpus file.
+
+    :param file: Path to the corpus file
+    :param keys: Attributes of the projects to be kept, all attributes if ``None`` (Default value = None)
+    :returns: The corpus data as dictionary
+    :rtype: dict
+
+    """
+    data = {"Projects": []}
+    with open_reader(file, keys) as reader:
+        for category, _, _, element in reader:
+            data.setdefault(category, []).append(element)
+        data.update(reader.metadata)
+    return data
+
+
+def dumps_json(value, indent=None):
+    """This function serializes a value with the encoder of the standard library.
+
+    :param value: The value
+    :param indent: Indentation of the JSON output, compact output if ``None`` (Default value = None)
+    :returns: The UTF-8 encoded JSON
+    :rtype: bytes
+
+    """
+    if indent is None:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return json.dumps(value, indent=indent).encode("utf-8")
+
+
+def dumps_orjson(value, indent=None):
+    """This function serializes a value with ``orjson``. Pretty printed output and values, which ``orjson`` does
+    not support (e.g. integers with more than 64 bits), are serialized by :func:`dumps_json`.
+
+    :param value: The value
+    :param indent: Indentation of the JSON output, compact output if ``None`` (Default value = None)
+    :returns: The UTF-8 encoded JSON
+    :rtype: bytes
+
+    """
+    if indent is None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return dumps_json(value, indent)
+
+
+SERIALIZERS = {"json": dumps_json}
+if orjson is not None:
+    SERIALIZERS["orjson"] = dumps_orjson
+
+
+def get_serializer(name=None):
+    """This function returns a serializer by its name.
+
+    :param name: Name of the serializer, the fastest available serializer if ``None`` (Default value = None)
+    :returns: Function, which serializes a value and an indentation to UTF-8 encoded JSON
+    :rtype: callable
+    :raises KeyError: If no serializer of that name is available
+
+    """
+    if name is None:
+        name = "orjson" if "orjson" in SERIALIZERS else "json"
+    return SERIALIZERS[name]
+
+
+class CorpusWriter:
+    """This class writes a corpus file of the form ``{"Projects": [...]}`` element by element. The output is
+    collected in a buffer and written to the file in large chunks. JSON Lines files contain only the projects, one
+    project per line. The corpus is written into a temporary file next to the output file, which replaces the output
+    file, when the writer is closed. If the writer is aborted, e.g. because the export failed, the temporary file is
+    removed and the output file is left unchanged, so that a truncated corpus is never taken for a complete one.
+
+    Methods:
+        __init__(self, file, indent=None, serializer=None, buffer_size=BUFFER_SIZE, level=None)
+        emit(self, data)
+        serialize(self, value, depth)
+        key(self, category)
+        begin(self, category)
+        end(self)
+        write(self, project, category="Projects")
+        write_value(self, category, value)
+        write_corpus(self, data)
+        flush(self)
+        close(self)
+        abort(self)
+
+
+    """
+
+    def __init__(self, file, indent=None, serializer=None, buffer_size=BUFFER_SIZE, level=None):
+        """CorpusWriter class constructor to initialize the object and open the output file.
+
+        :param file: Path to the output file, compressed according to its suffix
+        :param indent: Indentation of the JSON output, compact output if ``None``. Ignored for JSON Lines files
+            (Default value = None)
+        :param serializer: Function, which serializes a value, see :func:`get_serializer` (Default value = None)
+        :param buffer_size: Number of bytes collected before they are written to the file
+            (Default value = BUFFER_SIZE)
+        :param level: Compression level of compressed files (Default value = None)
+
+        """
+        directory, name = os.path.split(file)
+        self.path = file
+        # the temporary file keeps the suffix, which selects the compression
+        self.temporary = os.path.join(directory, ".tmp-{}-{}-{}".format(os.getpid(), id(self), name))
+        self.file = open_binary(self.temporary, "wb", level)
+        self.json_lines = is_json_lines(file)
+        self.indent = indent if not self.json_lines else None
+        self.dumps = serializer if serializer is not None else get_serializer()
+        self.buffer_size = buffer_size
+        self.buffer = bytearray(b"{" if not self.json_lines else b"")
+        self.count = 0
+        self.category = None
+        self.keys = 0  # number of top-level keys written
+        self.elements = 0  # number of elements in the current category
+        if indent is None:
+            self.key_separator, self.prefix, self.separator = b":", b"", b","
+        else:
+            self.key_separator = b": "
+            self.prefix = b"\n" + b" " * 2 * indent
+            self.separator = b"," + self.prefix
+
+    def emit(self, data):
+        """This method adds bytes to the buffer and writes it, if it is full.
+
+        :param data: Bytes to be written
+
+        """
+        self.buffer += data
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def serialize(self, value, depth):
+        """This method converts a value into JSON.
+
+        :param value: The value
+        :param depth: Level of indentation of the value
+        :returns: The encoded JSON, which is indented according to its level
+        :rtype: bytes
+
+        """
+        text = self.dumps(value, self.indent)
+        if self.indent is not None:
+            text = text.replace(b"\n", b"\n" + b" " * depth * self.indent)
+        return text
+
+    def key(self, category):
+        """This method writes a top-level key of the corpus, after the value of the previous key is ended.
+
+        :param category: Name of the top-level key
+
+        """
+        if self.category is not None:
+            self.end()
+        if self.indent is None:
+            prefix = b"," if self.keys else b""
+        else:
+            prefix = (b",\n" if self.keys else b"\n") + b" " * self.indent
+        self.emit(prefix + json.dumps(category).encode("utf-8") + self.key_separator)
+        self.keys += 1
+
+    def begin(self, category):
+        """This method starts a list of elements, e.g. of projects.
+
+        :param category: Name of the list
+
+        """
+        self.key(category)
+        self.emit(b"[")
+        self.category = category
+        self.elements = 0
+
+    def end(self):
+        """This method finishes the current list of elements."""
+        if self.indent is not None and self.elements:
+            self.emit(b"\n" + b" " * self.indent + b"]")
+        else:
+            self.emit(b"]")
+        self.category = None
+
+    @profiled("json.write")
+    def write(self, project, category="Projects"):
+        """This method appends a project to the corpus file.
+
+        :param project: The project
+        :param category: Name of the list the project is appended to (Default value = "Projects")
+
+        """
+        if self.json_lines:
+            if category == "Projects":
+                self.emit(self.dumps(project, None) + b"\n")
+                self.count += 1
+            return
+        if category != self.category:
+            self.begin(category)
+        self.emit((self.separator if self.elements else self.prefix) + self.serialize(project, 2))
+        self.elements += 1
+        self.count += 1
+
+    def write_value(self, category, value):
+        """This method writes a top-level value of the corpus, which is not a list of elements.
+
+        :param category: Name of the value
+        :param value: The value
+
+        """
+        if self.json_lines:
+            return
+        self.key(category)
+        self.emit(self.serialize(value, 1))
+
+    def write_corpus(self, data):
+        """This method writes all lists and values of a corpus.
+
+        :param data: The corpus data as dictionary
+
+        """
+        for category, value in data.items():
+            if isinstance(value, list):
+                if not self.json_lines:
+                    self.begin(category)
+                for element in value:
+                    self.write(element, category)
+            else:
+                self.write_value(category, value)
+
+    @profiled("json.flush")
+    def flush(self):
+        """This method writes the buffer to the file."""
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        """This method finishes and closes the corpus file."""
+        if not self.json_lines:
+            if self.keys == 0:
+                self.begin("Projects")
+            if self.category is not None:
+                self.end()
+            self.emit(b"}" if self.indent is None else b"\n}\n")
+        self.flush()
+        self.file.close()
+        os.replace(self.temporary, self.path)
+
+    def abort(self):
+        """This method closes the corpus file without finishing it and removes it. The output file is not changed."""
+        try:
+            self.file.close()
+        finally:
+            if os.path.exists(self.temporary):
+                os.remove(self.temporary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,127 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import os
+
+from corpus.utils.export_tables import TABLES, convert_value, iter_rows, table_types
+from corpus.utils.profiling import profiled
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional dependency, install the extra "arrow"
+    pyarrow = None
+
+"""
+.. module:: export_arrow
+
+Export of a corpus into columnar files, one file per table of :mod:`corpus.utils.export_tables`. Parquet files are
+written in row groups with dictionary encoded columns, Arrow IPC files are written uncompressed, so that they can be
+memory-mapped.
+"""
+
+ROW_GROUP_SIZE = 1 << 16
+
+FILE_SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def arrow_type(kind):
+    """This function maps the type of a column to an Arrow type.
+
+    :param kind: Type of a column, see :data:`corpus.utils.export_tables.COLUMN_TYPES`
+    :returns: The Arrow type
+
+    """
+    return {"bool": pyarrow.bool_(), "int": pyarrow.int64(), "float": pyarrow.float64(),
+            "str": pyarrow.string()}[kind]
+
+
+class ArrowTableWriter:
+    """This class writes the rows of one table in batches to a Parquet or Arrow IPC file.
+
+    Methods:
+        __init__(self, path, types, file_format="parquet", row_group_size=ROW_GROUP_SIZE)
+        write(self, row)
+        flush(self)
+        close(self)
+
+
+    """
+
+    def __init__(self, path, types, file_format="parquet", row_group_size=ROW_GROUP_SIZE):
+        """ArrowTableWriter class constructor to initialize the object and open the output file.
+
+        :param path: Path to the output file
+        :param types: Dictionary of the column names and types
+        :param file_format: ``"parquet"`` or ``"arrow"`` (Default value = "parquet")
+        :param row_group_size: Number of rows written at once (Default value = ROW_GROUP_SIZE)
+
+        """
+        self.types = types
+        self.schema = pyarrow.schema([(column, arrow_type(kind)) for column, kind in types.items()])
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.count = 0
+        if file_format == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, use_dictionary=True, compression="zstd")
+        else:
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, row):
+        """This method appends a row to the table.
+
+        :param row: The row
+
+        """
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """This method writes the collected rows as one row group."""
+        if len(self.rows) == 0:
+            return
+        columns = [pyarrow.array([convert_value(row.get(column), kind) for row in self.rows], arrow_type(kind))
+                   for column, kind in self.types.items()]
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+        self.count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        """This method writes the remaining rows and closes the file."""
+        self.flush()
+        self.writer.close()
+
+
+@profiled("tables.write")
+def write_tables(projects, directory, file_format="parquet", row_group_size=ROW_GROUP_SIZE):
+    """This function writes the projects into one file per table. The projects are read twice, first to determine
+    the columns of the tables and then to write the rows.
+
+    :param projects: List of projects
+    :param directory: Output directory
+    :param file_format: ``"parquet"`` or ``"arrow"`` (Default value = "parquet")
+    :param row_group_size: Number of rows in a row group (Default value = ROW_GROUP_SIZE)
+    :returns: Number of rows written to each table
+    :rtype: dict
+    :raises ImportError: If the package pyarrow is not installed
+
+    """
+    if pyarrow is None:
+        raise ImportError("The package pyarrow is needed for the output format {}".format(file_format))
+    types = table_types(projects)
+    os.makedirs(directory, exist_ok=True)
+    writers = {}
+    try:
+        for table in TABLES:
+            columns = types[table] if len(types[table]) > 0 else {"id" if table == "projects" else "project_id": "int"}
+            writers[table] = ArrowTableWriter(os.path.join(directory, table + FILE_SUFFIXES[file_format]), columns,
+                                              file_format, row_group_size)
+        for project in projects:
+            for table, row in iter_rows(project):
+                writers[table].write(row)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {table: writer.count for table, writer in writers.items()}
@@ -0,0 +1,211 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+from corpus.export import Exporter
+from corpus.utils.helpers import Config, Corpus
+from corpus.utils.neo4j_writer import BATCH_SIZE
+
+"""
+.. module:: export_benchmark
+
+Benchmark of the Neo4J export, which does not need a database. The export runs against a :class:`RecordingGraph`,
+which counts the round-trips, transactions and rows instead of sending them to a server, or which forwards them to a
+real database, e.g. a local Neo4J started from a tarball. Since the numbers of round-trips and transactions per
+project do not depend on the machine, a query per node or project, which slips into the export, shows up in them.
+"""
+
+# Version reported by the recording graph without a database, which selects the current schema syntax
+RECORDED_VERSION = "5.0.0"
+
+
+class RecordingCursor:
+    """This class is the result of a query of a :class:`RecordingGraph` without a database.
+
+    Methods:
+        __init__(self, value)
+        evaluate(self)
+
+
+    """
+
+    def __init__(self, value=None):
+        """RecordingCursor class constructor to initialize the object.
+
+        :param value: Value returned by :meth:`evaluate` (Default value = None)
+
+        """
+        self.value = value
+
+    def __iter__(self):
+        return iter(())
+
+    def evaluate(self):
+        """This method returns a single value like the result of a query.
+
+        :returns: The value of the first column of the first record
+
+        """
+        return self.value
+
+
+class RecordingTransaction:
+    """This class counts the queries and rows of a transaction of a :class:`RecordingGraph`.
+
+    Methods:
+        __init__(self, graph, tx=None)
+        run(self, query, **parameters)
+
+
+    """
+
+    def __init__(self, graph, tx=None):
+        """RecordingTransaction class constructor to initialize the object.
+
+        :param graph: The recording graph
+        :param tx: Transaction of the database, to which the queries are forwarded (Default value = None)
+
+        """
+        self.graph = graph
+        self.tx = tx
+
+    def run(self, query, **parameters):
+        """This method counts a query and its rows and forwards it to the database, if there is one.
+
+        :param query: The query
+        :param parameters: Parameters of the query, a list ``rows`` or ``keys`` is counted as rows
+        :returns: The cursor of the result, which counts all rows as written without a database
+
+        """
+        rows = parameters.get("rows", parameters.get("keys", ()))
+        self.graph.record(queries=1, rows=len(rows))
+        if self.tx is not None:
+            return self.tx.run(query, **parameters)
+        return RecordingCursor(len(rows))
+
+
+class RecordingGraph:
+    """This class provides the part of the interface of :class:`py2neo.Graph`, which is used by the export, and counts
+    every round-trip to the database. A round-trip is a query outside a transaction, a query inside a transaction, a
+    commit or a rollback. If a graph is given, all calls are forwarded to it. The counters are thread-safe, so that
+    the parallel export can be measured as well.
+
+    Methods:
+        __init__(self, graph=None)
+        record(self, **counts)
+        run(self, statement)
+        begin(self)
+        commit(self, tx)
+        rollback(self, tx)
+        statistics(self)
+
+
+    """
+
+    def __init__(self, graph=None):
+        """RecordingGraph class constructor to initialize the object.
+
+        :param graph: Graph of a database, to which the calls are forwarded (Default value = None)
+
+        """
+        self.graph = graph
+        self.lock = threading.Lock()
+        self.counts = {"round_trips": 0, "queries": 0, "statements": 0, "transactions": 0, "rollbacks": 0, "rows": 0}
+
+    def record(self, **counts):
+        """This method adds to the counters. Every query and statement is a round-trip.
+
+        :param counts: Values added to the counters
+
+        """
+        with self.lock:
+            for name, value in counts.items():
+                self.counts[name] += value
+            self.counts["round_trips"] += counts.get("queries", 0) + counts.get("statements", 0)
+
+    def run(self, statement):
+        """This method counts a statement outside a transaction, e.g. a schema statement.
+
+        :param statement: The statement
+        :returns: The cursor of the result
+
+        """
+        self.record(statements=1)
+        if self.graph is not None:
+            return self.graph.run(statement)
+        return RecordingCursor(RECORDED_VERSION if "dbms.components" in statement else None)
+
+    def begin(self):
+        """This method begins a transaction, which records its queries.
+
+        :returns: A new transaction
+        :rtype: RecordingTransaction
+
+        """
+        return RecordingTransaction(self, self.graph.begin() if self.graph is not None else None)
+
+    def commit(self, tx):
+        """This method counts a commit as transaction and round-trip.
+
+        :param tx: The transaction
+
+        """
+        self.record(transactions=1, round_trips=1)
+        if self.graph is not None:
+            self.graph.commit(tx.tx)
+
+    def rollback(self, tx):
+        """This method counts a rollback as round-trip.
+
+        :param tx: The transaction
+
+        """
+        self.record(rollbacks=1, round_trips=1)
+        if self.graph is not None:
+            self.graph.rollback(tx.tx)
+
+    def statistics(self):
+        """This method returns the numbers of the recorded queries and rows.
+
+        :returns: A copy of the counters
+        :rtype: dict
+
+        """
+        with self.lock:
+            return dict(self.counts)
+
+
+def run_benchmark(projects, workers=1, batch_size=BATCH_SIZE, graph=None):
+    """This function exports projects to a recording graph and measures the export.
+
+    :param projects: List of projects
+    :param workers: Number of concurrent writers (Default value = 1)
+    :param batch_size: Number of nodes or relationships written in one transaction (Default value = BATCH_SIZE)
+    :param graph: Graph of a database, to which the export is forwarded (Default value = None)
+    :returns: Dictionary of the counters of the graph, the numbers of exported nodes and relationships, the duration
+        in seconds, the entities per second and the round-trips and transactions per project
+    :rtype: dict
+
+    """
+    config = Config()
+    config.neo4j_config = {"NEO4J": {"batch_size": batch_size, "workers": workers}}
+    corpus = Corpus()
+    corpus.data = {"Projects": projects}
+    exporter = Exporter(config, corpus, "neo4j")
+    exporter.graph = RecordingGraph(graph)
+    start = time.perf_counter()
+    node_count, relationship_count = exporter.export_to_neo4j()
+    duration = max(time.perf_counter() - start, 1e-9)
+    result = exporter.graph.statistics()
+    result.update({
+        "projects": len(projects),
+        "nodes": node_count,
+        "relationships": relationship_count,
+        "seconds": duration,
+        "entities_per_second": (node_count + relationship_count) / duration,
+        "round_trips_per_project": result["round_trips"] / max(len(projects), 1),
+        "transactions_per_project": result["transactions"] / max(len(projects), 1),
+    })
+    return result
@@ -1,39 +1,105 @@
 # SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
 # SPDX-License-Identifier: MIT
 
-from corpus.utils.export_models import User as UserModel
 
+def name_variants(name):
+    """This function returns the names, under which a user may be stored: the name itself and the name in the form
+    "surname, forename".
+
+    :param name: Name of the user
+    :returns: List of names, which is empty if the name is missing
+    :rtype: list
 
-def transform_language_dict(language_dict):
     """
+    if not name:
+        return []
+    parts = name.split()
+    if len(parts) < 2:
+        return [name]
+    return [name, parts[-1] + ", " + parts[0]]
 
-    :param language_dict: 
 
-    """
-    language = dict()
-    for name, value in language_dict.items():
-        language["name"] = name
-        language["value"] = value
-        yield language
+def related_elements(element, attribute, key):
+    """This function returns the elements, which an attribute of an element refers to. The attribute may contain
+    a single element or a list of elements.
 
+    :param element: Dictionary of the element
+    :param attribute: Name of the attribute
+    :param key: Attribute, which the related elements must contain to be matched
+    :returns: List of the related elements
+    :rtype: list
 
-def find_user_by_name(graph, name):
     """
+    related = element.get(attribute)
+    if not isinstance(related, list):
+        related = [related]
+    return [item for item in related if isinstance(item, dict) and item.get(key) is not None]
+
+
+class IdentityIndex:
+    """This class maps the names, usernames and email addresses of the users of a corpus to their IDs, so that
+    commits, contributors and issues, which refer to users only by their name, can be related to them without
+    querying the database.
+
+    Methods:
+        __init__(self)
+        build(cls, projects)
+        add(self, user)
+        lookup(self, name=None, email=None)
 
-    :param graph: 
-    :param name: 
 
     """
-    if name is None or "":
+
+    def __init__(self):
+        """IdentityIndex class constructor to initialize the object."""
+        self.names = {}
+        self.usernames = {}
+        self.emails = {}
+
+    @classmethod
+    def build(cls, projects):
+        """This method builds the index from the owners and users of projects.
+
+        :param projects: Iterable of projects
+        :returns: The index
+        :rtype: IdentityIndex
+
+        """
+        index = cls()
+        for project in projects:
+            for user in related_elements(project, "owner", "id") + related_elements(project, "users", "id"):
+                index.add(user)
+        return index
+
+    def add(self, user):
+        """This method adds a user. If several users have the same name, username or email address, the first one
+        is kept.
+
+        :param user: Dictionary of the user, which contains its ID
+
+        """
+        if user.get("name"):
+            self.names.setdefault(user["name"], user["id"])
+        if user.get("username"):
+            self.usernames.setdefault(user["username"], user["id"])
+        for key in ("email", "public_email"):
+            if user.get(key):
+                self.emails.setdefault(user[key].lower(), user["id"])
+
+    def lookup(self, name=None, email=None):
+        """This method looks up a user by email address, name, name in the form "surname, forename" or username.
+
+        :param name: Name of the user (Default value = None)
+        :param email: Email address of the user (Default value = None)
+        :returns: The ID of the user, ``None`` if no user is found
+        :rtype: int or str or None
+
+        """
+        if email and email.lower() in self.emails:
+            return self.emails[email.lower()]
+        for variant in name_variants(name):
+            if variant in self.names:
+                return self.names[variant]
+        if name:
+            return self.usernames.get(name)
         return None
-    node = graph.run("match (u:User) where u.name=$x return u", x=name).evaluate()
-    if not node:
-        try:
-            forename = name.split()[0]
-            surname = name.split()[-1]
-            node = graph.run("match (u:User) where u.name=$x return u", x=surname + ", " + forename).evaluate()
-        except IndexError:
-            pass
-    if node:
-        return UserModel.wrap(node)
-    return None
@@ -2,7 +2,8 @@
 # http://doi.org/10.5281/zenodo.3469386
 
 from py2neo import Graph
-from py2neo.ogm import GraphObject, RelatedObjects, Property, RelatedFrom, RelatedTo
+from py2neo.ogm import GraphObject, Property, RelatedFrom, RelatedTo
+from corpus.utils.neo4j_writer import model_properties
 
 
 class NeoGraphObjectException(Exception):
@@ -14,6 +15,11 @@ class NeoGraphObject(GraphObject):
     """ """
     __unique_constraints__ = []
 
+    # Attribute, which identifies an element only within its project, e.g. the tag of a release. If it is set, the
+    # __primarykey__ is composed of the project ID and this attribute, so that elements of different projects with
+    # the same value are exported as different nodes.
+    __projectkey__ = None
+
     def __init__(self):
         super().__init__()
         self.__unique_constraints__ = NeoGraphObject.__unique_constraints__
@@ -47,12 +53,8 @@ class NeoGraphObject(GraphObject):
         obj = cls()
         if cls.__primarykey__ not in attributes:
             raise NeoGraphObjectException(f"Primary '{obj.__primarykey__}' not in attributes")
-        for attr, attr_value in attributes.items():
-            if hasattr(obj, attr) and not isinstance(getattr(obj, attr), RelatedObjects):
-                if not isinstance(attr_value, dict) and not isinstance(attr_value, list):
-                    setattr(obj, attr, attr_value)
-                else:
-                    setattr(obj, attr, str(attr_value))
+        for key, value in model_properties(cls, attributes).items():
+            obj.__node__[key] = value
         graph.create(obj)
         return obj
 
@@ -102,16 +104,57 @@ class NeoGraphObject(GraphObject):
         return obj
 
     @classmethod
-    def set_constraints(cls, graph: Graph):
-        """Sets all unique constraints defined in current class
+    def node_key(cls, element, project):
+        """Returns the value of the __primarykey__ of an element.
+
+        :param element: Dictionary of the element
+        :param project: Dictionary of the project, which contains the element
+        :returns: The key, ``None`` if the element misses the attribute it is built from
+
+        """
+        if cls.__projectkey__ is None:
+            return element.get(cls.__primarykey__)
+        if element.get(cls.__projectkey__) is None:
+            return None
+        return "{}:{}".format(project["id"], element[cls.__projectkey__])
+
+    @classmethod
+    def schema_statements(cls, version=(5, 0)):
+        """Returns the statements, which create the schema of the current class idempotently: a uniqueness
+        constraint for the __primarykey__ and lookup indexes for the other keys in __unique_constraints__, which are
+        unique only within a project (e.g. ``iid``).
+
+        :param version: Version of the Neo4J server as tuple ``(major, minor)`` (Default value = (5, 0))
+        :type version: tuple
+        :returns: The Cypher statements
+        :rtype: list
+
+        """
+        label = cls.__primarylabel__
+        if version >= (4, 4):
+            constraint = "CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:`{label}`) REQUIRE n.`{key}` IS UNIQUE"
+        else:
+            constraint = "CREATE CONSTRAINT {name} IF NOT EXISTS ON (n:`{label}`) ASSERT n.`{key}` IS UNIQUE"
+        index = "CREATE INDEX {name} IF NOT EXISTS FOR (n:`{label}`) ON (n.`{key}`)"
+        statements = [constraint.format(name="{}_{}_unique".format(label, cls.__primarykey__).lower(), label=label,
+                                        key=cls.__primarykey__)]
+        for key in cls.__unique_constraints__:
+            if key != cls.__primarykey__:
+                statements.append(index.format(name="{}_{}_index".format(label, key).lower(), label=label, key=key))
+        return statements
+
+    @classmethod
+    def set_constraints(cls, graph: Graph, version=(5, 0)):
+        """Sets all unique constraints and indexes defined in current class, if they do not exist yet
 
         :param graph: The graph instance
         :type graph: Graph
-        :param graph: Graph: 
+        :param version: Version of the Neo4J server as tuple ``(major, minor)`` (Default value = (5, 0))
+        :type version: tuple
 
         """
-        for key in cls.__unique_constraints__:
-            graph.schema.create_uniqueness_constraint(str(cls.__name__), key)
+        for statement in cls.schema_statements(version):
+            graph.run(statement)
 
 
 class Project(NeoGraphObject):
@@ -367,14 +410,19 @@ class Issue(NeoGraphObject):
 
 
 class File(NeoGraphObject):
-    """ """
+    """Export model representing a file of the root directory of a project. The ID is the SHA of the content, which
+    repeats across projects (e.g. a license file), so files are identified by the project and their path.
+    """
     __primarylabel__ = "File"
-    __primarykey__ = "id"
+    __primarykey__ = "key"
+    __projectkey__ = "path"
 
     __unique_constraints__ = [
+        "key",
         "id"
     ]
 
+    key = Property("key")
     id = Property("id")
     name = Property("name")
     file_type = Property("type")
@@ -482,14 +530,19 @@ class Mergerequest(NeoGraphObject):
 
 
 class Release(NeoGraphObject):
-    """ """
+    """Export model representing a release. Tags like "v1.0" repeat across projects, so releases are identified by
+    the project and their tag.
+    """
     __primarylabel__ = "Release"
-    __primarykey__ = "tag_name"
+    __primarykey__ = "key"
+    __projectkey__ = "tag_name"
 
     __unique_constraints__ = [
+        "key",
         "tag_name"
     ]
 
+    key = Property("key")
     author = Property("author")
     commit = Property("commit")
     milestones = Property("milestones")
@@ -506,3 +559,6 @@ class Release(NeoGraphObject):
     authored_by = RelatedTo(User)
     committed_through = RelatedTo(Commit)
     belongs_to = RelatedTo(Milestone)
+
+
+MODELS = [Project, Namespace, User, Language, Milestone, Issue, File, Commit, Mergerequest, Release]
@@ -0,0 +1,185 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import sqlite3
+
+from corpus.utils.export_tables import ColumnTypes, convert_value, flatten
+from corpus.utils.profiling import profiled
+
+"""
+.. module:: export_sqlite
+
+Export of a corpus into a SQLite database. The database contains the entities of the Neo4J export in normalized
+tables: namespaces, users and languages, which are shared by projects, are stored once and linked to the projects by
+the tables ``project_users`` and ``project_languages``. All other elements of a project refer to it by the column
+``project_id``. The rows are inserted in batches inside one transaction, the indexes are created after loading.
+"""
+
+BATCH_SIZE = 10000
+
+# Attributes of a project, which are stored in separate tables
+ENTITY_ATTRIBUTES = ["namespace", "owner", "users", "contributors", "commits", "files", "languages", "milestones",
+                     "issues", "mergerequests", "releases"]
+
+# Tables with the elements of project attributes, which are lists
+CHILD_TABLES = ["contributors", "commits", "files", "milestones", "issues", "mergerequests", "releases"]
+
+TABLES = ["projects", "namespaces", "users", "project_users", "languages", "project_languages"] + CHILD_TABLES
+
+# Key columns of the tables, whose rows are shared by projects and stored only once
+KEYS = {"projects": ("id",), "namespaces": ("id",), "users": ("id",), "languages": ("name",)}
+
+# Columns, which are indexed after loading, if the table contains them
+INDEXES = {
+    "projects": ["namespace_id", "owner_id"],
+    "project_users": ["project_id", "user_id"],
+    "project_languages": ["project_id", "language"],
+    "contributors": ["project_id", "name"],
+    "commits": ["project_id", "id", "committer_name"],
+    "files": ["project_id"],
+    "milestones": ["project_id", "id"],
+    "issues": ["project_id", "id", "author.id"],
+    "mergerequests": ["project_id", "id", "author.id"],
+    "releases": ["project_id", "tag_name"],
+}
+
+SQL_TYPES = {"bool": "INTEGER", "int": "INTEGER", "float": "REAL", "str": "TEXT"}
+
+
+def quote(name):
+    """This function quotes an identifier for SQLite.
+
+    :param name: Name of a table or column
+    :returns: The quoted identifier
+    :rtype: str
+
+    """
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def iter_entities(project):
+    """This function normalizes a project into rows of the tables in ``TABLES``.
+
+    :param project: The project
+    :returns: Iterator of tuples ``(table, row)``
+
+    """
+    project_id = project.get("id")
+    row = flatten({key: value for key, value in project.items() if key not in ENTITY_ATTRIBUTES})
+    namespace, owner = project.get("namespace"), project.get("owner")
+    row["namespace_id"] = namespace.get("id") if isinstance(namespace, dict) else None
+    row["owner_id"] = owner.get("id") if isinstance(owner, dict) else None
+    yield "projects", row
+    if isinstance(namespace, dict):
+        yield "namespaces", flatten(namespace)
+    if isinstance(owner, dict):
+        yield "users", flatten(owner)
+        yield "project_users", {"project_id": project_id, "user_id": owner.get("id"), "role": "owner"}
+    users = project.get("users")
+    if isinstance(users, list):
+        for user in users:
+            if isinstance(user, dict):
+                yield "users", flatten(user)
+                yield "project_users", {"project_id": project_id, "user_id": user.get("id"), "role": "user"}
+    for table in CHILD_TABLES:
+        elements = project.get(table)
+        if not isinstance(elements, list):
+            continue
+        for element in elements:
+            row = {"project_id": project_id}
+            if isinstance(element, dict):
+                flatten(element, row=row)
+                row["project_id"] = project_id  # the key wins over an attribute of the same name
+            else:
+                row["value"] = element
+            yield table, row
+    languages = project.get("languages")
+    if isinstance(languages, dict):
+        for name, value in languages.items():
+            yield "languages", {"name": name}
+            yield "project_languages", {"project_id": project_id, "language": name, "value": value}
+
+
+def database_types(projects):
+    """This function collects the columns and types of all tables of the database.
+
+    :param projects: Iterable of projects
+    :returns: Dictionary of the tables and the column types of each table
+    :rtype: dict
+
+    """
+    types = {table: ColumnTypes() for table in TABLES}
+    for project in projects:
+        for table, row in iter_entities(project):
+            types[table].update(row)
+    resolved = {}
+    for table, column_types in types.items():
+        resolved[table] = column_types.resolve()
+        if len(resolved[table]) == 0:
+            resolved[table] = {column: "int" for column in KEYS.get(table, ("project_id",))}
+    return resolved
+
+
+@profiled("sqlite.write")
+def write_database(projects, path, batch_size=BATCH_SIZE):
+    """This function writes the projects into a SQLite database. Existing tables of the export are replaced. The
+    projects are read twice, first to determine the columns of the tables and then to insert the rows.
+
+    :param projects: List of projects
+    :param path: Path to the database file
+    :param batch_size: Number of rows inserted at once (Default value = BATCH_SIZE)
+    :returns: Number of rows inserted into each table
+    :rtype: dict
+
+    """
+    types = database_types(projects)
+    statements = {table: "INSERT INTO {} VALUES ({})".format(quote(table), ", ".join("?" * len(columns)))
+                  for table, columns in types.items()}
+    counts = {table: 0 for table in TABLES}
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            for table, columns in types.items():
+                connection.execute("DROP TABLE IF EXISTS {}".format(quote(table)))
+                connection.execute("CREATE TABLE {} ({})".format(quote(table), ", ".join(
+                    "{} {}".format(quote(column), SQL_TYPES[kind]) for column, kind in columns.items())))
+
+        batches = {table: [] for table in TABLES}
+        seen = {table: set() for table in KEYS}
+
+        def flush(table):
+            connection.executemany(statements[table], batches[table])
+            counts[table] += len(batches[table])
+            batches[table] = []
+
+        with connection:
+            for project in projects:
+                for table, row in iter_entities(project):
+                    if table in KEYS:
+                        key = tuple(row.get(column) for column in KEYS[table])
+                        if None not in key:
+                            if key in seen[table]:
+                                continue
+                            seen[table].add(key)
+                    columns = types[table]
+                    batches[table].append([convert_value(row.get(column), kind) for column, kind in columns.items()])
+                    if len(batches[table]) >= batch_size:
+                        flush(table)
+            for table in TABLES:
+                flush(table)
+
+        with connection:
+            for table in TABLES:
+                for column in KEYS.get(table, ()):
+                    connection.execute("CREATE UNIQUE INDEX {} ON {} ({})".format(
+                        quote("{}_{}_key".format(table, column)), quote(table), quote(column)))
+                for column in INDEXES.get(table, []):
+                    if column in types[table]:
+                        connection.execute("CREATE INDEX {} ON {} ({})".format(
+                            quote("{}_{}_index".format(table, column)), quote(table), quote(column)))
+            connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    return counts
@@ -0,0 +1,169 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import json
+
+"""
+.. module:: export_tables
+
+Normalization of projects into flat tables for tabular export formats. Every project becomes one row of the table
+``projects``, the elements of its lists (commits, issues, ...) become rows of separate tables, which refer to the
+project by the column ``project_id``. Nested dictionaries are flattened into dotted column names like in filters
+(e.g. ``namespace.full_path``), lists, which are not exported as a table, are stored as JSON text.
+"""
+
+# Tables with the elements of project attributes, which are lists
+CHILD_TABLES = ["commits", "issues", "mergerequests", "users", "milestones", "releases", "files"]
+
+TABLES = ["projects"] + CHILD_TABLES + ["languages"]
+
+# Types of columns, ordered from the most specific to the most general one
+COLUMN_TYPES = ["bool", "int", "float", "str"]
+
+INT64_RANGE = range(-(1 << 63), 1 << 63)
+
+
+def flatten(value, prefix="", row=None):
+    """This function flattens a dictionary into a row. Nested dictionaries are flattened into dotted column names,
+    lists are converted to JSON text.
+
+    :param value: The dictionary
+    :param prefix: Prefix of the column names (Default value = "")
+    :param row: Row the columns are added to (Default value = None)
+    :returns: The row
+    :rtype: dict
+
+    """
+    if row is None:
+        row = {}
+    for key, element in value.items():
+        if isinstance(element, dict):
+            flatten(element, prefix + key + ".", row)
+        elif isinstance(element, list):
+            row[prefix + key] = json.dumps(element)
+        else:
+            row[prefix + key] = element
+    return row
+
+
+def iter_rows(project):
+    """This function normalizes a project into rows of the tables in ``TABLES``.
+
+    :param project: The project
+    :returns: Iterator of tuples ``(table, row)``
+
+    """
+    project_id = project.get("id")
+    yield "projects", flatten({key: value for key, value in project.items()
+                               if key not in CHILD_TABLES and key != "languages"})
+    for table in CHILD_TABLES:
+        elements = project.get(table)
+        if not isinstance(elements, list):
+            continue
+        for element in elements:
+            row = {"project_id": project_id}
+            if isinstance(element, dict):
+                flatten(element, row=row)
+                row["project_id"] = project_id  # the key wins over an attribute of the same name
+            else:
+                row["value"] = element
+            yield table, row
+    languages = project.get("languages")
+    if isinstance(languages, dict):
+        for name, value in languages.items():
+            yield "languages", {"project_id": project_id, "name": name, "value": value}
+
+
+def value_type(value):
+    """This function determines the column type of a value.
+
+    :param value: A value of a flattened row
+    :returns: The column type of the value, ``None`` for ``None``
+    :rtype: str or None
+
+    """
+    if value is None:
+        return None
+    elif isinstance(value, bool):
+        return "bool"
+    elif isinstance(value, int):
+        return "int" if value in INT64_RANGE else "str"
+    elif isinstance(value, float):
+        return "float"
+    return "str"
+
+
+class ColumnTypes:
+    """This class collects the columns of a table and the most specific type, which can store all values of a
+    column. Integers and floats are stored as floats, all other mixed columns as text.
+
+    Methods:
+        __init__(self)
+        update(self, row)
+        resolve(self)
+
+
+    """
+
+    def __init__(self):
+        """ColumnTypes class constructor to initialize the object."""
+        self.types = {}
+
+    def update(self, row):
+        """This method adds the values of a row.
+
+        :param row: The row
+
+        """
+        for column, value in row.items():
+            kind = value_type(value)
+            current = self.types.get(column)
+            if kind is None or kind == current:
+                self.types.setdefault(column, None)
+            elif current is None:
+                self.types[column] = kind
+            elif {kind, current} == {"int", "float"}:
+                self.types[column] = "float"
+            else:
+                self.types[column] = "str"
+
+    def resolve(self):
+        """This method returns the columns and their types. Columns without values are typed as text.
+
+        :returns: Dictionary of the column names and types
+        :rtype: dict
+
+        """
+        return {column: kind if kind is not None else "str" for column, kind in self.types.items()}
+
+
+def convert_value(value, kind):
+    """This function converts a value to the type of its column.
+
+    :param value: The value
+    :param kind: Type of the column
+    :returns: The converted value
+
+    """
+    if value is None:
+        return None
+    elif kind == "str" and not isinstance(value, str):
+        return json.dumps(value)
+    elif kind == "float":
+        return float(value)
+    return value
+
+
+def table_types(projects):
+    """This function collects the columns and types of all tables.
+
+    :param projects: Iterable of projects
+    :returns: Dictionary of the tables and the column types of each table, see :meth:`ColumnTypes.resolve`
+    :rtype: dict
+
+    """
+    types = {table: ColumnTypes() for table in TABLES}
+    for project in projects:
+        for table, row in iter_rows(project):
+            types[table].update(row)
+    return {table: column_types.resolve() for table, column_types in types.items()}
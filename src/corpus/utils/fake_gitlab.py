@@ -0,0 +1,244 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import copy
+import threading
+import time
+
+from gitlab.v4.objects import ProjectManager
+
+"""
+.. module:: fake_gitlab
+
+In-process stand-in for the part of python-gitlab, which is used by :class:`corpus.extract.Extractor`. The objects
+are built from projects of a corpus, e.g. a synthetic one, so that the extraction can be benchmarked without a GitLab
+instance. Every call, which would be a request to the server, is counted and can be delayed by a fixed latency.
+"""
+
+
+class FakeObject:
+    """This class is a GitLab object with attributes, e.g. a commit or a merge request.
+
+    Methods:
+        __init__(self, server, attributes, **related)
+        commits(self)
+        closes_issues(self)
+
+
+    """
+
+    def __init__(self, server, attributes, **related):
+        """FakeObject class constructor to initialize the object.
+
+        :param server: The fake server, which counts the requests
+        :param attributes: Dictionary of the attributes
+        :param related: Lists of attributes of related objects, which are returned by methods
+
+        """
+        self.server = server
+        self.attributes = attributes
+        self.related = related
+
+    def commits(self):
+        """This method returns the commits of the merge request.
+
+        :returns: The commits of a merge request
+        :rtype: list
+
+        """
+        self.server.request()
+        return [FakeObject(self.server, commit) for commit in self.related.get("commits", [])]
+
+    def closes_issues(self):
+        """This method returns the issues, which the merge request closes.
+
+        :returns: The issues closed by a merge request
+        :rtype: list
+
+        """
+        self.server.request()
+        return [FakeObject(self.server, issue) for issue in self.related.get("close_issues", [])]
+
+
+class FakeManager:
+    """This class is a manager of GitLab objects of a project, e.g. ``project.issues``.
+
+    Methods:
+        __init__(self, server, objects)
+        list(self, **kwargs)
+        get(self, **kwargs)
+
+
+    """
+
+    def __init__(self, server, objects):
+        """FakeManager class constructor to initialize the object.
+
+        :param server: The fake server, which counts the requests
+        :param objects: Function, which returns the objects of the manager
+
+        """
+        self.server = server
+        self.objects = objects
+
+    def list(self, **kwargs):
+        """This method lists the objects of the manager.
+
+        :param kwargs: Parameters of the request, which are ignored
+        :returns: The objects of the manager
+        :rtype: list
+
+        """
+        self.server.request()
+        return self.objects()
+
+    def get(self, **kwargs):
+        """This method returns the single object of the manager.
+
+        :param kwargs: Parameters of the request, which are ignored
+        :returns: The single object of the manager, e.g. the issue statistics
+
+        """
+        self.server.request()
+        return self.objects()
+
+
+class FakeProject:
+    """This class is a GitLab project, whose attributes and elements are taken from a project of a corpus.
+
+    Methods:
+        __init__(self, server, project)
+        languages(self)
+        repository_contributors(self)
+        repository_tree(self, ref=None)
+
+
+    """
+
+    # Attributes of a corpus project, which are added by the extraction and are no attributes of the API object
+    EXTRACTED = ["issue_statistics", "languages", "users", "commits", "first_commit", "last_commit", "contributors",
+                 "issues", "mergerequests", "pipelines", "milestones", "files", "project_statistics", "releases"]
+
+    def __init__(self, server, project):
+        """FakeProject class constructor to initialize the object.
+
+        :param server: The fake server, which counts the requests
+        :param project: The project of the corpus
+
+        """
+        self.server = server
+        self.project = project
+        self.attributes = copy.deepcopy({key: value for key, value in project.items()
+                                         if key not in self.EXTRACTED})
+
+        def elements(name, **related):
+            return lambda: [FakeObject(server, copy.deepcopy({key: value for key, value in element.items()
+                                                              if key not in related}),
+                                       **{key: element.get(key, []) for key in related})
+                            for element in project.get(name) or []]
+
+        statistics = {"statistics": project.get("issue_statistics", {"counts": {"all": 0, "closed": 0, "opened": 0}})}
+        self.issuesstatistics = FakeManager(server, lambda: FakeObject(server, statistics))
+        self.users = FakeManager(server, elements("users"))
+        self.commits = FakeManager(server, elements("commits"))
+        self.issues = FakeManager(server, elements("issues"))
+        self.mergerequests = FakeManager(server, elements("mergerequests", commits=True, close_issues=True))
+        self.pipelines = FakeManager(server, lambda: [])
+        self.milestones = FakeManager(server, elements("milestones"))
+        self.releases = FakeManager(server, elements("releases"))
+        self.additionalstatistics = FakeManager(server, lambda: FakeObject(server, {"fetches": {"total": 0}}))
+
+    def languages(self):
+        """This method returns the languages of the project.
+
+        :returns: The languages of the project
+        :rtype: dict
+
+        """
+        self.server.request()
+        return dict(self.project.get("languages") or {})
+
+    def repository_contributors(self):
+        """This method returns the contributors of the project.
+
+        :returns: The contributors of the project
+        :rtype: list
+
+        """
+        self.server.request()
+        return copy.deepcopy(self.project.get("contributors") or [])
+
+    def repository_tree(self, ref=None):
+        """This method returns the files of the project.
+
+        :param ref: Name of the branch, which is ignored (Default value = None)
+        :returns: The files of the root directory of the project
+        :rtype: list
+
+        """
+        self.server.request()
+        return copy.deepcopy(self.project.get("files") or [])
+
+
+class FakeProjectManager(ProjectManager):
+    """This class lists the projects of a fake server. It is a :class:`gitlab.v4.objects.ProjectManager`, so that the
+    extractor treats it like the manager of a GitLab instance.
+
+    Methods:
+        __init__(self, server, projects)
+        list(self, **kwargs)
+
+
+    """
+
+    def __init__(self, server, projects):
+        """FakeProjectManager class constructor to initialize the object.
+
+        :param server: The fake server, which counts the requests
+        :param projects: List of projects of a corpus
+
+        """
+        self.server = server
+        self.projects = projects
+
+    def list(self, **kwargs):
+        """This method lists the projects of the server.
+
+        :param kwargs: Parameters of the request, which are ignored
+        :returns: The projects of the server
+        :rtype: list
+
+        """
+        self.server.request()
+        return [FakeProject(self.server, project) for project in self.projects]
+
+
+class FakeGitlab:
+    """This class is a GitLab instance with the projects of a corpus, which can be passed to
+    :class:`corpus.extract.Extractor` instead of a :class:`gitlab.Gitlab` object.
+
+    Methods:
+        __init__(self, projects, latency=0.0)
+        request(self)
+
+
+    """
+
+    def __init__(self, projects, latency=0.0):
+        """FakeGitlab class constructor to initialize the object.
+
+        :param projects: List of projects of a corpus
+        :param latency: Seconds, by which every request is delayed (Default value = 0.0)
+
+        """
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.projects = FakeProjectManager(self, projects)
+
+    def request(self):
+        """This method counts a request and waits for the latency."""
+        with self.lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
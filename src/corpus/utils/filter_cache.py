@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+import shutil
+
+"""
+.. module:: filter_cache
+
+Cache for the results of single filter predicates on a corpus file. For every predicate, a bitmap with one bit per
+project (set, if the project passes the predicate) is stored next to the corpus in the directory
+``<corpus file>.filtercache/<corpus fingerprint>/``, prefixed by the number of projects. A later filter run on the
+same corpus file reuses the bitmaps of all predicates it shares with earlier runs.
+"""
+
+# Increase, if the semantics of the predicates change and cached bitmaps become invalid
+CACHE_VERSION = 1
+
+
+def corpus_fingerprint(corpus_file, hash_content=False):
+    """This function computes the fingerprint of a corpus file. By default, the fingerprint is derived from the
+    path, size and modification time of the file. If ``hash_content`` is set, the content of the file is hashed.
+
+    :param corpus_file: Path to the corpus file
+    :param hash_content: Hash the content of the file instead of its metadata (Default value = False)
+    :returns: The fingerprint as hex string
+    :rtype: str
+
+    """
+    digest = hashlib.sha1("v{}".format(CACHE_VERSION).encode())
+    if hash_content:
+        with open(corpus_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    else:
+        stat = os.stat(corpus_file)
+        digest.update("{}:{}:{}".format(os.path.abspath(corpus_file), stat.st_size, stat.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+
+def predicate_fingerprint(key):
+    """This function computes the fingerprint of a compiled predicate from its canonical key.
+
+    :param key: Key of the predicate, see :mod:`corpus.utils.filter_expressions`
+    :returns: The fingerprint as hex string
+    :rtype: str
+
+    """
+    return hashlib.sha1("v{}:{}".format(CACHE_VERSION, key).encode()).hexdigest()
+
+
+class FilterCache:
+    """This class stores the pass bitmaps of filter predicates for one corpus file.
+
+    Methods:
+        __init__(self, corpus_file, hash_content=False)
+        load(self, key, size)
+        store(self, key, bitmap, size)
+
+
+    """
+
+    def __init__(self, corpus_file, hash_content=False):
+        """FilterCache class constructor to initialize the object. Bitmaps cached for older versions of the corpus
+        file are removed.
+
+        :param corpus_file: Path to the corpus file
+        :param hash_content: Fingerprint the content of the corpus instead of its metadata (Default value = False)
+
+        """
+        self.root = corpus_file + ".filtercache"
+        fingerprint = corpus_fingerprint(corpus_file, hash_content)
+        self.directory = os.path.join(self.root, fingerprint)
+        self.hits = 0
+        self.misses = 0
+        if os.path.isdir(self.root):
+            for entry in os.listdir(self.root):
+                if entry != fingerprint:
+                    shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+
+    def path(self, key):
+        """This method returns the path of the cache file of a predicate.
+
+        :param key: Key of the predicate
+        :returns: Path to the file
+        :rtype: str
+
+        """
+        return os.path.join(self.directory, predicate_fingerprint(key) + ".bits")
+
+    def load(self, key, size):
+        """This method loads the bitmap of a predicate.
+
+        :param key: Key of the predicate
+        :param size: Number of projects in the corpus
+        :returns: The bitmap or ``None``, if it is not cached
+        :rtype: int or None
+
+        """
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        if int.from_bytes(data[:8], "little") != size:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return int.from_bytes(data[8:], "little")
+
+    def store(self, key, bitmap, size):
+        """This method stores the bitmap of a predicate.
+
+        :param key: Key of the predicate
+        :param bitmap: The bitmap, bit ``i`` is set if project ``i`` passes the predicate
+        :param size: Number of projects in the corpus
+
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(size.to_bytes(8, "little"))
+            f.write(bitmap.to_bytes((size + 7) // 8, "little"))
+        os.replace(path + ".tmp", path)
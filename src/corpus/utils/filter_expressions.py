@@ -0,0 +1,393 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import json
+import re
+
+import click
+
+"""
+.. module:: filter_expressions
+
+Boolean filter expressions, which can be written in the ``expressions`` section of a filter file, e.g.::
+
+    expressions:
+        - 10 <= star_count < 1000 and (name regex "^ml" or not archived == true)
+        - namespace.kind == "group" and count(commits.committed_date >= "2024-01-01") > 10
+
+An expression is parsed into a tree of :class:`And`, :class:`Or`, :class:`Not` and leaf nodes. The planner
+(:func:`plan`) flattens the tree, removes duplicated subexpressions and orders the branches by their estimated cost,
+before the tree is compiled into a predicate by the :class:`corpus.filter.Filter`.
+"""
+
+# Estimated evaluation cost of a leaf, cheap conditions are evaluated first
+OPERATOR_COSTS = {
+    "==": 1,
+    "!=": 1,
+    "<": 1,
+    "<=": 1,
+    ">": 1,
+    ">=": 1,
+    "contains": 2,
+    "regex": 8,
+}
+LANGUAGES_COST = 4
+AGGREGATE_COST = 20
+
+# Functions, which aggregate all values found under a path
+AGGREGATES = {"count", "distinct", "min", "max", "sum"}
+
+# Operators to be used, if the value is written on the left side of a comparison
+FLIPPED_OPERATORS = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+KEYWORDS = {"and", "or", "not", "contains", "regex", "true", "false", "null"}
+CONSTANTS = {"true": True, "false": False, "null": None}
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)(?![\w.])
+        |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<operator>==|!=|<=|>=|<|>)
+        |(?P<paren>[()])
+        |(?P<name>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)*)
+    )""", re.VERBOSE)
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+STRING_ESCAPE = re.compile(r"""\\(["'\\])""")
+
+
+class InvalidExpressionException(Exception):
+    """ """
+    def __init__(self, message, value):
+        super().__init__(message)
+        click.echo("\n{}: '{}'".format(message, value))
+
+
+class Aggregate:
+    """Attribute, which aggregates all values found under a path of a project, e.g. ``count(commits)`` or
+    ``max(commits.committed_date)``. Lists on the path are expanded. Optionally, only values passing a condition are
+    aggregated, e.g. ``count(commits.committed_date >= "2024-01-01")``.
+    """
+
+    def __init__(self, function, path, operator=None, value=None):
+        self.function = function
+        self.path = path
+        self.operator = operator
+        self.value = value
+        if operator is None:
+            self.key = "{}({})".format(function, path)
+        else:
+            self.key = "{}({} {} {})".format(function, path, operator, json.dumps(value, sort_keys=True, default=str))
+        self.cost = AGGREGATE_COST + (OPERATOR_COSTS.get(operator, 1) if operator is not None else 0)
+
+    def __str__(self):
+        return self.key
+
+    def __repr__(self):
+        return "Aggregate({})".format(self.key)
+
+
+class Comparison:
+    """Leaf node, which compares an attribute of a project to a value. The attribute is either the name of a
+    top-level attribute, a dotted path to a nested attribute (e.g. ``namespace.kind``) or an :class:`Aggregate`.
+    """
+
+    def __init__(self, path, operator, value):
+        self.path = path
+        self.operator = operator
+        self.value = value
+        self.key = "{} {} {}".format(path, operator, json.dumps(value, sort_keys=True, default=str))
+        self.cost = OPERATOR_COSTS.get(operator, 1) + (path.cost if isinstance(path, Aggregate) else 0)
+
+    def __repr__(self):
+        return "Comparison({})".format(self.key)
+
+
+class Languages:
+    """Leaf node, which applies one of the language filter categories to a project."""
+
+    def __init__(self, category, languages):
+        self.category = category
+        self.languages = languages
+        self.key = "{} {}".format(category, json.dumps(languages, sort_keys=True, default=str))
+        self.cost = LANGUAGES_COST
+
+    def __repr__(self):
+        return "Languages({})".format(self.category)
+
+
+class And:
+    """Node, which is true if all of its children are true."""
+
+    def __init__(self, children):
+        self.children = list(children)
+        self.key = "and({})".format(", ".join(child.key for child in self.children))
+        self.cost = sum(child.cost for child in self.children)
+
+    def __repr__(self):
+        return "And({})".format(self.children)
+
+
+class Or:
+    """Node, which is true if any of its children is true."""
+
+    def __init__(self, children):
+        self.children = list(children)
+        self.key = "or({})".format(", ".join(child.key for child in self.children))
+        self.cost = sum(child.cost for child in self.children)
+
+    def __repr__(self):
+        return "Or({})".format(self.children)
+
+
+class Not:
+    """Node, which negates its child."""
+
+    def __init__(self, child):
+        self.child = child
+        self.key = "not({})".format(child.key)
+        self.cost = child.cost
+
+    def __repr__(self):
+        return "Not({})".format(self.child)
+
+
+def tokenize(text):
+    """This function splits an expression into a list of ``(kind, value)`` tokens.
+
+    :param text: The expression
+    :returns: List of tokens
+    :rtype: list
+
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            raise InvalidExpressionException("Invalid token in filter expression", text[position:].strip())
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            value = float(value) if re.search(r"[.eE]", value) else int(value)
+        elif kind == "string":
+            value = STRING_ESCAPE.sub(r"\1", value[1:-1])
+        elif kind == "name" and value.lower() in KEYWORDS:
+            kind = "keyword"
+            value = value.lower()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser for filter expressions.
+
+    The grammar is::
+
+        expression := conjunction ("or" conjunction)*
+        conjunction := negation ("and" negation)*
+        negation := "not" negation | "(" expression ")" | comparison
+        comparison := operand (operator operand)+
+        operand := value | path | aggregate "(" path [operator value] ")"
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None, None
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise InvalidExpressionException("Unexpected end of filter expression", self.text)
+        self.position += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.expression()
+        if self.peek()[0] is not None:
+            raise InvalidExpressionException("Unexpected token in filter expression", self.peek()[1])
+        return node
+
+    def expression(self):
+        children = [self.conjunction()]
+        while self.accept("keyword", "or"):
+            children.append(self.conjunction())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def conjunction(self):
+        children = [self.negation()]
+        while self.accept("keyword", "and"):
+            children.append(self.negation())
+        return children[0] if len(children) == 1 else And(children)
+
+    def negation(self):
+        if self.accept("keyword", "not"):
+            return Not(self.negation())
+        if self.accept("paren", "("):
+            node = self.expression()
+            if not self.accept("paren", ")"):
+                raise InvalidExpressionException("Missing closing parenthesis in filter expression", self.text)
+            return node
+        return self.comparison()
+
+    def operand(self):
+        kind, value = self.next()
+        if kind == "name" and value in AGGREGATES and self.accept("paren", "("):
+            return "path", self.aggregate(value)
+        if kind == "name":
+            return "path", value
+        if kind in ("number", "string"):
+            return "value", value
+        if kind == "keyword" and value in CONSTANTS:
+            return "value", CONSTANTS[value]
+        raise InvalidExpressionException("Expected an attribute or a value in filter expression", value)
+
+    def aggregate(self, function):
+        kind, path = self.next()
+        if kind != "name":
+            raise InvalidExpressionException("Expected a path as argument of '{}'".format(function), path)
+        operator = self.operator()
+        value = None
+        if operator is not None:
+            value_kind, value = self.operand()
+            if value_kind != "value":
+                raise InvalidExpressionException("Expected a value in the condition of '{}'".format(function),
+                                                 value)
+        if not self.accept("paren", ")"):
+            raise InvalidExpressionException("Missing closing parenthesis in filter expression", self.text)
+        return Aggregate(function, path, operator, value)
+
+    def operator(self):
+        kind, value = self.peek()
+        if kind == "operator" or (kind == "keyword" and value in ("contains", "regex")):
+            self.position += 1
+            return value
+        return None
+
+    def comparison(self):
+        operands = [self.operand()]
+        operators = []
+        operator = self.operator()
+        while operator is not None:
+            operators.append(operator)
+            operands.append(self.operand())
+            operator = self.operator()
+        if not operators:
+            raise InvalidExpressionException("Expected a comparison in filter expression", self.text)
+        # chained comparisons like 10 <= star_count < 1000 are split into pairs
+        children = [make_comparison(operands[i], operators[i], operands[i + 1]) for i in range(len(operators))]
+        return children[0] if len(children) == 1 else And(children)
+
+
+def make_comparison(left, operator, right):
+    """This function creates a comparison of an attribute and a value, independent of the side the attribute is
+    written on.
+
+    :param left: Left operand as ``(kind, value)`` tuple
+    :param operator: Operator of the comparison
+    :param right: Right operand as ``(kind, value)`` tuple
+    :returns: The comparison
+    :rtype: Comparison
+
+    """
+    if left[0] == "path" and right[0] == "value":
+        return Comparison(left[1], operator, right[1])
+    if left[0] == "value" and right[0] == "path" and operator in FLIPPED_OPERATORS:
+        return Comparison(right[1], FLIPPED_OPERATORS[operator], left[1])
+    raise InvalidExpressionException("A comparison needs exactly one attribute and one value",
+                                     "{} {} {}".format(left[1], operator, right[1]))
+
+
+def parse_expression(text):
+    """This function parses a filter expression into a tree of nodes.
+
+    :param text: The expression
+    :returns: Root node of the expression
+    :rtype: And, Or, Not or Comparison
+
+    """
+    return _Parser(str(text)).parse()
+
+
+def parse_attribute(text):
+    """This function parses the attribute of a filter in the ``filters`` section, which can be the name of a
+    top-level attribute, a dotted path or an aggregate.
+
+    :param text: The attribute as written in the filter file
+    :returns: The attribute
+    :rtype: str or Aggregate
+
+    """
+    text = str(text)
+    if IDENTIFIER.fullmatch(text):
+        return text
+    parser = _Parser(text)
+    kind, attribute = parser.operand()
+    if kind != "path" or parser.peek()[0] is not None:
+        raise InvalidExpressionException("Invalid attribute in filter file", text)
+    return attribute
+
+
+def plan(node):
+    """This function optimizes an expression tree for evaluation. Nested nodes of the same kind are flattened,
+    double negations are removed, duplicated children are dropped and the children of ``And`` and ``Or`` nodes are
+    ordered by their estimated cost, so that cheap conditions can short-circuit expensive ones.
+
+    :param node: Root node of the expression
+    :returns: Root node of the optimized expression
+
+    """
+    if isinstance(node, Not):
+        child = plan(node.child)
+        if isinstance(child, Not):
+            return child.child
+        return Not(child)
+    if isinstance(node, (And, Or)):
+        children = []
+        seen = set()
+        for child in node.children:
+            child = plan(child)
+            for part in (child.children if type(child) is type(node) else [child]):
+                if part.key not in seen:
+                    seen.add(part.key)
+                    children.append(part)
+        if len(children) == 1:
+            return children[0]
+        children.sort(key=lambda part: part.cost)
+        return type(node)(children)
+    return node
+
+
+def shared_subexpressions(*nodes):
+    """This function returns the keys of all subexpressions, which occur more than once in one or more expression
+    trees. Their results should be computed once per project only.
+
+    :param nodes: Root nodes of the expressions
+    :returns: Keys of the repeated subexpressions
+    :rtype: set
+
+    """
+    counts = {}
+    stack = list(nodes)
+    while stack:
+        current = stack.pop()
+        counts[current.key] = counts.get(current.key, 0) + 1
+        if isinstance(current, (And, Or)):
+            stack.extend(current.children)
+        elif isinstance(current, Not):
+            stack.append(current.child)
+    return {key for key, count in counts.items() if count > 1}
@@ -0,0 +1,162 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import functools
+import re
+from re import _parser as sre_parse
+from re import _constants as sre_constants
+
+"""
+.. module:: filter_regex
+
+Helpers for the ``regex`` operator of filters. Patterns are compiled once and kept in a cache, which is larger than
+the internal cache of :mod:`re`. From every pattern, the literal substrings are extracted, which a string has to
+contain to match the pattern, so that most strings are rejected by a substring test without running the regex.
+"""
+
+REGEX_CACHE_SIZE = 4096
+
+REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT)
+GROUP_REFERENCES = (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS)
+
+
+@functools.lru_cache(maxsize=REGEX_CACHE_SIZE)
+def compile_regex(pattern):
+    """This function compiles a pattern. Compiled patterns are cached.
+
+    :param pattern: The regular expression
+    :returns: The compiled pattern
+    :rtype: re.Pattern
+    :raises re.error: If the pattern is invalid
+
+    """
+    return re.compile(pattern)
+
+
+def required_literals(items):
+    """This function extracts the literals, which every match of a parsed pattern contains.
+
+    :param items: Parsed pattern or subpattern
+    :returns: List of requirements. A requirement is either a string, which has to be contained, or a list of
+        alternatives, of which at least one has to be satisfied. Every alternative is a list of requirements itself.
+    :rtype: list
+
+    """
+    required, run = [], []
+    for operator, argument in items:
+        if operator is sre_constants.LITERAL:
+            run.append(chr(argument))
+            continue
+        if len(run) > 0:
+            required.append("".join(run))
+            run = []
+        if operator is sre_constants.SUBPATTERN and not argument[1] and not argument[2]:  # group without flags
+            required.extend(required_literals(argument[3]))
+        elif operator in REPEATS and argument[0] >= 1:
+            required.extend(required_literals(argument[2]))
+        elif operator is sre_constants.BRANCH:
+            alternatives = [required_literals(alternative) for alternative in argument[1]]
+            if all(len(alternative) > 0 for alternative in alternatives):
+                required.append(alternatives)
+    if len(run) > 0:
+        required.append("".join(run))
+    return required
+
+
+def contains_literals(text, required):
+    """This function checks, if a string contains the required literals of a pattern.
+
+    :param text: The string
+    :param required: Requirements as returned by :func:`required_literals`
+    :returns: ``False``, if the string cannot match the pattern
+    :rtype: bool
+
+    """
+    for requirement in required:
+        if isinstance(requirement, str):
+            if requirement not in text:
+                return False
+        elif not any(contains_literals(text, alternative) for alternative in requirement):
+            return False
+    return True
+
+
+@functools.lru_cache(maxsize=REGEX_CACHE_SIZE)
+def analyze_regex(pattern):
+    """This function parses a pattern once and returns, what is needed to accelerate and combine it.
+
+    :param pattern: The regular expression
+    :returns: Tuple of the required literals and whether the pattern can be part of an alternation
+    :rtype: tuple
+    :raises re.error: If the pattern is invalid
+
+    """
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & ~re.UNICODE:  # case insensitive literals cannot be tested as substrings
+        return [], False
+    combinable = len(parsed.state.groupdict) == 0 and not any(operator in GROUP_REFERENCES
+                                                              for operator, _ in iter_operators(parsed))
+    return required_literals(parsed), combinable
+
+
+def iter_operators(items):
+    """This function yields all operators of a parsed pattern including the operators of nested subpatterns.
+
+    :param items: Parsed pattern or subpattern
+
+    """
+    for operator, argument in items:
+        yield operator, argument
+        if operator is sre_constants.SUBPATTERN:
+            yield from iter_operators(argument[3])
+        elif operator in REPEATS:
+            yield from iter_operators(argument[2])
+        elif operator is sre_constants.BRANCH:
+            for alternative in argument[1]:
+                yield from iter_operators(alternative)
+        elif operator is sre_constants.GROUPREF_EXISTS:
+            for alternative in argument[1:]:
+                if alternative is not None:
+                    yield from iter_operators(alternative)
+        elif operator in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            yield from iter_operators(argument[1])
+        elif operator is sre_constants.ATOMIC_GROUP:
+            yield from iter_operators(argument)
+
+
+def combine_patterns(patterns):
+    """This function combines patterns into one alternation, which matches a string at its beginning, if any of the
+    patterns matches it.
+
+    :param patterns: List of patterns, which are combinable according to :func:`analyze_regex`
+    :returns: The combined pattern
+    :rtype: str
+
+    """
+    return "|".join("(?:{})".format(pattern) for pattern in patterns)
+
+
+def compile_matcher(pattern):
+    """This function compiles a pattern into a function, which tests the required literals of the pattern before the
+    pattern is matched at the beginning of a string.
+
+    :param pattern: The regular expression
+    :returns: Function, which returns ``True`` if the pattern matches a string
+    :rtype: callable
+    :raises re.error: If the pattern is invalid
+
+    """
+    match = compile_regex(pattern).match
+    required, _ = analyze_regex(pattern)
+    if len(required) == 0:
+        return lambda text: match(text) is not None
+    if all(isinstance(requirement, str) for requirement in required):
+        literals = sorted(required, key=len, reverse=True)  # long literals are the most selective
+
+        def matcher(text):
+            for literal in literals:
+                if literal not in text:
+                    return False
+            return match(text) is not None
+        return matcher
+    return lambda text: contains_literals(text, required) and match(text) is not None
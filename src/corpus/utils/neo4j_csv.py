@@ -0,0 +1,266 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import csv
+import os
+
+from corpus.utils.export_tables import ColumnTypes
+
+"""
+.. module:: neo4j_csv
+
+Export of nodes and relationships into CSV files for the offline import with ``neo4j-admin database import`` (or
+``neo4j-admin import`` before Neo4J 5). Every label gets one node file and every relationship type one file per pair
+of start and end label. The headers are written into separate files, when all values are known, so that the columns
+can be typed. Since ``neo4j-admin`` rejects relationships to missing nodes, a relationship is written only, when both
+of its nodes are written. The arguments for ``neo4j-admin`` are written into the file ``neo4j-admin.args``.
+"""
+
+# Neo4J import types of the column types of :mod:`corpus.utils.export_tables`
+IMPORT_TYPES = {"bool": "boolean", "int": "long", "float": "double", "str": "string"}
+
+# Delimiter of the elements of array properties, the unit separator, which does not occur in the text of GitLab
+# elements, unlike ";" (the default of neo4j-admin), and its notation for neo4j-admin
+ARRAY_DELIMITER = "\x1f"
+ARRAY_DELIMITER_ARGUMENT = "U+001F"
+
+# Options of neo4j-admin, which are written before the files into neo4j-admin.args. Commit messages, descriptions
+# and notes contain line breaks, which are only accepted with multiline fields.
+IMPORT_OPTIONS = ["--multiline-fields=true", "--array-delimiter={}".format(ARRAY_DELIMITER_ARGUMENT)]
+
+
+def csv_value(value):
+    """This function converts a property into the value of a CSV cell. The elements of a list are joined by
+    ``ARRAY_DELIMITER``, which is removed from them, so that an element is never split by the import.
+
+    :param value: Value of a property
+    :returns: The value as written into a CSV file, ``None`` for a missing property
+    :rtype: str or None
+
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ARRAY_DELIMITER.join(str(csv_value(element)).replace(ARRAY_DELIMITER, "") for element in value)
+    return value
+
+
+class Neo4jCsvWriter:
+    """This class writes nodes and relationships into CSV files for ``neo4j-admin``. Nodes are written only once per
+    primary key, relationships only once per start and end node. A relationship, whose nodes are not written yet, is
+    kept until close and left out, if one of them is still missing then, e.g. the user of a merge request, who is no
+    member of any project. Columns are added, when a property occurs for the first time, files with rows written
+    before are padded on close.
+
+    Methods:
+        __init__(self, directory)
+        node(self, label, key, properties)
+        relationship(self, rel_type, start, end, properties=None)
+        close(self)
+        abort(self)
+
+
+    """
+
+    def __init__(self, directory):
+        """Neo4jCsvWriter class constructor to initialize the object.
+
+        :param directory: Output directory
+
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.files = {}
+        self.writers = {}
+        self.columns = {}
+        self.types = {}
+        self.arrays = {}
+        self.ragged = set()
+        self.keys = {}
+        self.written = {}
+        self.pending = []
+        self.node_count = 0
+        self.relationship_count = 0
+        self.dropped = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self, name):
+        """This method opens a data file.
+
+        :param name: Name of the file without suffix
+
+        """
+        self.files[name] = open(os.path.join(self.directory, name + ".csv"), "w", newline="", encoding="utf-8")
+        self.writers[name] = csv.writer(self.files[name])
+        self.columns[name] = []
+        self.types[name] = ColumnTypes()
+        self.arrays[name] = ColumnTypes()
+        self.written[name] = set()
+
+    def values(self, name, properties):
+        """This method adds new columns of a file and collects the types of the values.
+
+        :param name: Name of the file
+        :param properties: Dictionary of the properties of a row
+        :returns: The values of the row in the order of the columns
+        :rtype: list
+
+        """
+        columns = self.columns[name]
+        for column in properties:
+            if column not in columns:
+                if len(self.written[name]) > 0:
+                    self.ragged.add(name)
+                columns.append(column)
+        for column, value in properties.items():
+            if isinstance(value, list):
+                self.arrays[name].update({column: None})
+                for element in value:
+                    self.arrays[name].update({column: element})
+            else:
+                self.types[name].update({column: value})
+        return [csv_value(properties.get(column)) for column in columns]
+
+    def node(self, label, key, properties):
+        """This method writes a node, if no node with the same primary key was written before.
+
+        :param label: Label of the node
+        :param key: Name of the primary key, which has to be contained in the properties
+        :param properties: Dictionary of the node properties
+
+        """
+        if label not in self.files:
+            self.open(label)
+            self.keys[label] = key
+        if properties[key] in self.written[label]:
+            return
+        row = [properties[key], label] + self.values(label, properties)
+        self.written[label].add(properties[key])
+        self.writers[label].writerow(row)
+        self.node_count += 1
+
+    def relationship(self, rel_type, start, end, properties=None):
+        """This method writes a relationship between two nodes, which are referred to by their primary keys, or keeps
+        it until close, if one of the nodes is not written yet.
+
+        :param rel_type: Type of the relationship
+        :param start: Tuple ``(label, key, value)`` of the start node
+        :param end: Tuple ``(label, key, value)`` of the end node
+        :param properties: Dictionary of the relationship properties (Default value = None)
+
+        """
+        if self.is_written(start) and self.is_written(end):
+            self.write_relationship(rel_type, start, end, properties)
+        else:
+            self.pending.append((rel_type, start, end, properties))
+
+    def is_written(self, node):
+        """This method checks, if a node is written.
+
+        :param node: Tuple ``(label, key, value)`` of the node
+        :returns: ``True``, if a node with the label and the primary key is written
+        :rtype: bool
+
+        """
+        return node[0] in self.keys and node[2] in self.written[node[0]]
+
+    def write_relationship(self, rel_type, start, end, properties=None):
+        """This method writes a relationship, if it was not written before.
+
+        :param rel_type: Type of the relationship
+        :param start: Tuple ``(label, key, value)`` of the start node
+        :param end: Tuple ``(label, key, value)`` of the end node
+        :param properties: Dictionary of the relationship properties (Default value = None)
+
+        """
+        name = "{}_{}_{}".format(rel_type, start[0], end[0])
+        if name not in self.files:
+            self.open(name)
+        if (start[2], end[2]) in self.written[name]:
+            return
+        row = [start[2], end[2], rel_type] + self.values(name, properties or {})
+        self.written[name].add((start[2], end[2]))
+        self.writers[name].writerow(row)
+        self.relationship_count += 1
+
+    def header(self, name):
+        """This method returns the header of a node or relationship file.
+
+        :param name: Name of a file
+        :returns: The header of the file
+        :rtype: list
+
+        """
+        types, arrays = self.types[name].resolve(), self.arrays[name].resolve()
+        columns = []
+        for column in self.columns[name]:
+            if column in arrays:
+                columns.append("{}:{}[]".format(column, IMPORT_TYPES[arrays[column]]))
+            else:
+                columns.append("{}:{}".format(column, IMPORT_TYPES[types.get(column, "str")]))
+        if name in self.keys:
+            return [":ID({})".format(name), ":LABEL"] + columns
+        _, start_label, end_label = name.rsplit("_", 2)
+        return [":START_ID({})".format(start_label), ":END_ID({})".format(end_label), ":TYPE"] + columns
+
+    def pad(self, name):
+        """This method pads the rows of a file, which were written before columns were added.
+
+        :param name: Name of the file without suffix
+
+        """
+        path = os.path.join(self.directory, name + ".csv")
+        width = len(self.header(name))
+        with open(path, newline="", encoding="utf-8") as source, \
+                open(path + ".tmp", "w", newline="", encoding="utf-8") as target:
+            writer = csv.writer(target)
+            for row in csv.reader(source):
+                writer.writerow(row + [""] * (width - len(row)))
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        """This method writes the kept relationships, whose nodes are written now, and leaves out the others. Then it
+        writes the header files and the arguments for ``neo4j-admin``.
+
+        """
+        for rel_type, start, end, properties in self.pending:
+            if self.is_written(start) and self.is_written(end):
+                self.write_relationship(rel_type, start, end, properties)
+            else:
+                self.dropped += 1
+        self.pending = []
+        arguments = []
+        for name, file in self.files.items():
+            file.close()
+            if name in self.ragged:
+                self.pad(name)
+            header_path = os.path.join(self.directory, name + "_header.csv")
+            with open(header_path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(self.header(name))
+            arguments.append("{}={},{}".format("--nodes" if name in self.keys else "--relationships",
+                                               os.path.abspath(header_path),
+                                               os.path.abspath(os.path.join(self.directory, name + ".csv"))))
+        self.files, self.writers = {}, {}
+        arguments.sort(key=lambda argument: argument.startswith("--relationships"))
+        with open(os.path.join(self.directory, "neo4j-admin.args"), "w", encoding="utf-8") as f:
+            f.write("\n".join(IMPORT_OPTIONS + arguments) + "\n")
+
+    def abort(self):
+        """This method closes the CSV files without writing the header files and the arguments for ``neo4j-admin``,
+        so that the incomplete files are not imported by mistake.
+
+        """
+        for file in self.files.values():
+            file.close()
+        self.files, self.writers, self.pending = {}, {}, []
+        arguments = os.path.join(self.directory, "neo4j-admin.args")
+        if os.path.exists(arguments):
+            os.remove(arguments)
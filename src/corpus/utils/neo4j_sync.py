@@ -0,0 +1,154 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import datetime
+import hashlib
+import json
+import threading
+
+"""
+.. module:: neo4j_sync
+
+Incremental synchronization of a corpus with a Neo4J database. Every exported node stores a hash of the element it
+was created from. Before a node is written, its hash is compared with the stored one, so that only new and changed
+elements and their relationships are written again. The relationships, which are derived from the attributes of a
+changed element, are removed before they are written again, so that e.g. a former assignee of an issue is not related
+to it anymore. Nodes of elements, which are not contained in the corpus anymore, can be marked as deleted.
+"""
+
+HASH_PROPERTY = "content_hash"
+TOMBSTONE_PROPERTY = "deleted_at"
+
+HASH_QUERY = "MATCH (n:`{label}`) WHERE n.`{hash}` IS NOT NULL " \
+             "RETURN n.`{key}`, CASE WHEN n.`{tombstone}` IS NULL THEN n.`{hash}` END"
+
+TOMBSTONE_QUERY = "UNWIND $keys AS key MATCH (n:`{label}` {{`{key}`: key}}) SET n.`{tombstone}` = $time"
+
+OUTGOING_QUERY = "UNWIND $rows AS key MATCH (n:`{label}` {{`{key}`: key}})-[r:`{type}`]->() DELETE r RETURN count(r)"
+INCOMING_QUERY = "UNWIND $rows AS key MATCH (n:`{label}` {{`{key}`: key}})<-[r:`{type}`]-() DELETE r RETURN count(r)"
+
+
+def content_hash(element):
+    """This function computes a hash of an element, which does not depend on the order of its attributes.
+
+    :param element: The element
+    :returns: The hash as hexadecimal string
+    :rtype: str
+
+    """
+    text = json.dumps(element, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class GraphSync:
+    """This class keeps the hashes of the nodes stored in the database and the nodes, which are written in the
+    current export. It can be shared by several writers, also in different threads.
+
+    Methods:
+        __init__(self, graph, keys, owned=None)
+        stored(self, label)
+        changed(self, label, key, value)
+        is_dirty(self, label, key)
+        detach_queries(self, label)
+        tombstone(self, batch_size=1000)
+
+
+    """
+
+    def __init__(self, graph, keys, owned=None):
+        """GraphSync class constructor to initialize the object.
+
+        :param graph: The graph instance
+        :param keys: Dictionary of the labels and the names of their primary keys
+        :param owned: Dictionary of the labels and the relationships derived from the attributes of their elements as
+            tuples ``(type, outgoing)``, which are removed, when a node is written again (Default value = None)
+
+        """
+        self.graph = graph
+        self.keys = keys
+        self.owned = owned or {}
+        self.hashes = {}
+        self.seen = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def stored(self, label):
+        """This method loads the hashes of the nodes with a label from the database, when they are needed first.
+        Nodes, which are marked as deleted, have no hash, so that they are written again.
+
+        :param label: Label of the nodes
+        :returns: Dictionary of the primary keys of the nodes and their hashes
+        :rtype: dict
+
+        """
+        with self.lock:
+            if label not in self.hashes:
+                query = HASH_QUERY.format(label=label, key=self.keys[label], hash=HASH_PROPERTY,
+                                          tombstone=TOMBSTONE_PROPERTY)
+                self.hashes[label] = {key: value for key, value in self.graph.run(query)}
+                self.seen[label] = set()
+            return self.hashes[label]
+
+    def changed(self, label, key, value):
+        """This method checks, if a node has to be written, because it is new or its hash has changed.
+
+        :param label: Label of the node
+        :param key: Primary key of the node
+        :param value: Hash of the node
+        :returns: ``True``, if the node has to be written
+        :rtype: bool
+
+        """
+        stored = self.stored(label)
+        with self.lock:
+            self.seen[label].add(key)
+            if stored.get(key) == value:
+                return False
+            self.dirty.add((label, key))
+            return True
+
+    def is_dirty(self, label, key):
+        """This method checks, if a node is written in the current export.
+
+        :param label: Label of a node
+        :param key: Primary key of the node
+        :returns: ``True``, if the node is written in the current export
+        :rtype: bool
+
+        """
+        return (label, key) in self.dirty
+
+    def detach_queries(self, label):
+        """This method returns the queries, which remove the relationships derived from the attributes of written
+        nodes, before the relationships of the current export are written.
+
+        :param label: Label of the nodes
+        :returns: List of queries, which get the primary keys of the nodes as parameter ``rows``
+        :rtype: list
+
+        """
+        return [(OUTGOING_QUERY if outgoing else INCOMING_QUERY).format(label=label, key=self.keys[label],
+                                                                         type=rel_type)
+                for rel_type, outgoing in self.owned.get(label, [])]
+
+    def tombstone(self, batch_size=1000):
+        """This method marks the nodes as deleted, which were written by a former export, but not by the current one.
+
+        :param batch_size: Number of nodes marked in one transaction (Default value = 1000)
+        :returns: Number of the marked nodes
+        :rtype: int
+
+        """
+        count = 0
+        time = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        for label, key in self.keys.items():
+            stored = self.stored(label)
+            removed = [value for value, hash_value in stored.items()
+                       if value not in self.seen[label] and hash_value is not None]
+            query = TOMBSTONE_QUERY.format(label=label, key=key, tombstone=TOMBSTONE_PROPERTY)
+            for start in range(0, len(removed), batch_size):
+                tx = self.graph.begin()
+                tx.run(query, keys=removed[start:start + batch_size], time=time)
+                self.graph.commit(tx)
+            count += len(removed)
+        return count
@@ -0,0 +1,350 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import json
+import time
+
+from py2neo import Graph
+from py2neo.errors import Neo4jError, TransientError
+from py2neo.ogm import Property
+
+from corpus.utils.neo4j_sync import HASH_PROPERTY, content_hash
+from corpus.utils.profiling import profiled
+
+"""
+.. module:: neo4j_writer
+
+Batched export of nodes and relationships into a Neo4J database. Nodes are grouped by label and relationships by
+type, every group is written with one ``UNWIND $rows AS row MERGE ...`` query per batch, so that a batch of
+thousands of entities needs only one round-trip to the database. Every query returns the number of entities it has
+written, since a relationship is left out, if one of its nodes does not exist. With a
+:class:`corpus.utils.neo4j_sync.GraphSync`, only new and changed nodes and their relationships are written.
+"""
+
+BATCH_SIZE = 5000
+
+# Labels of nodes, which are shared by projects and written before the projects
+SHARED_LABELS = ["User", "Language", "Namespace", "Milestone"]
+
+# Number of retries of a transaction, which failed with a transient error, e.g. a deadlock
+RETRIES = 3
+RETRY_DELAY = 0.5
+
+NODE_QUERY = "UNWIND $rows AS row MERGE (n:`{label}` {{`{key}`: row.key}}) SET n += row.properties " \
+             "RETURN count(n)"
+
+# Replaces all properties of a node, so that properties removed from an element and a deletion mark are removed
+SYNC_NODE_QUERY = "UNWIND $rows AS row MERGE (n:`{label}` {{`{key}`: row.key}}) SET n = row.properties " \
+                  "RETURN count(n)"
+
+RELATIONSHIP_QUERY = "UNWIND $rows AS row " \
+                     "MATCH (a:`{start_label}` {{`{start_key}`: row.start}}) " \
+                     "MATCH (b:`{end_label}` {{`{end_key}`: row.end}}) " \
+                     "MERGE (a)-[r:`{type}`]->(b) SET r += row.properties RETURN count(r)"
+
+VERSION_QUERY = "CALL dbms.components() YIELD name, versions WHERE name = 'Neo4j Kernel' RETURN versions[0]"
+
+
+def connect(neo4j_config):
+    """This function connects to the configured Neo4J database.
+
+    :param neo4j_config: The Neo4J configuration
+    :returns: The graph instance of the configured database
+    :rtype: py2neo.Graph
+
+    """
+    return Graph(f"{neo4j_config['NEO4J']['protocol']}://"
+                 f"{neo4j_config['NEO4J']['hostname']}:"
+                 f"{neo4j_config['NEO4J']['port']}",
+                 user=neo4j_config['NEO4J']['user'],
+                 password=neo4j_config['NEO4J']['password'])
+
+
+def neo4j_version(graph):
+    """This function determines the version of the Neo4J server.
+
+    :param graph: The graph instance
+    :returns: The version as tuple ``(major, minor)``, ``(5, 0)`` if the version cannot be determined
+    :rtype: tuple
+
+    """
+    try:
+        version = graph.run(VERSION_QUERY).evaluate()
+        return tuple(int(part) for part in version.split(".")[:2])
+    except (Neo4jError, AttributeError, ValueError):
+        return 5, 0
+
+
+def property_values(key, value, json_values=False, properties=None):
+    """This function converts the value of an attribute into properties, which Neo4J can store. Scalars and lists of
+    scalars of the same type are stored as they are, dictionaries are flattened into properties with dotted names
+    (e.g. ``time_stats.time_estimate``). Other lists, e.g. lists of users, are left out, because they are exported as
+    relationships. If ``json_values`` is set, dictionaries and lists, which are no lists of scalars, are stored as
+    JSON text instead.
+
+    :param key: Name of the property
+    :param value: Value of the attribute
+    :param json_values: Stores nested values as JSON text, if set to ``True`` (Default value = False)
+    :param properties: Dictionary, to which the properties are added (Default value = None)
+    :returns: Dictionary of the properties
+    :rtype: dict
+
+    """
+    if properties is None:
+        properties = {}
+    if isinstance(value, list) and len({type(element) for element in value}) <= 1 \
+            and not any(isinstance(element, (dict, list)) or element is None for element in value):
+        properties[key] = value
+    elif isinstance(value, (dict, list)):
+        if json_values:
+            properties[key] = json.dumps(value)
+        elif isinstance(value, dict):
+            for name, element in value.items():
+                property_values(key + "." + name, element, json_values, properties)
+    else:
+        properties[key] = value
+    return properties
+
+
+def model_properties(model, attributes, json_values=False):
+    """This function selects the attributes of an element, which are properties of its export model, and converts
+    them with :func:`property_values`.
+
+    :param model: The export model
+    :param attributes: Dictionary of the attributes of the element
+    :param json_values: Stores nested values as JSON text, if set to ``True`` (Default value = False)
+    :returns: Dictionary of the node properties
+    :rtype: dict
+
+    """
+    properties = {}
+    for attr, attr_value in attributes.items():
+        prop = vars(model).get(attr)
+        if isinstance(prop, Property):
+            property_values(prop.key, attr_value, json_values, properties)
+    return properties
+
+
+class Neo4jWriter:
+    """This class collects nodes and relationships and writes them in batches to a Neo4J database. If a
+    :class:`corpus.utils.neo4j_sync.GraphSync` is given, nodes are written only, if their content hash differs from
+    the stored one, and relationships only, if one of their nodes is written. The relationships derived from the
+    attributes of a written node are removed, before the relationships of the batch are written.
+
+    Methods:
+        __init__(self, graph, batch_size=BATCH_SIZE, sync=None)
+        node(self, label, key, properties)
+        relationship(self, rel_type, start, end, properties=None)
+        flush(self)
+        close(self)
+        abort(self)
+
+
+    """
+
+    def __init__(self, graph, batch_size=BATCH_SIZE, sync=None):
+        """Neo4jWriter class constructor to initialize the object.
+
+        :param graph: The graph instance
+        :param batch_size: Number of nodes or relationships written in one transaction (Default value = BATCH_SIZE)
+        :param sync: Incremental synchronization, which can be shared by several writers (Default value = None)
+
+        """
+        self.graph = graph
+        self.batch_size = batch_size
+        self.sync = sync
+        self.skipped = 0
+        self.nodes = {}
+        self.relationships = {}
+        self.pending = 0
+        self.node_count = 0
+        self.relationship_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def node(self, label, key, properties):
+        """This method adds a node, which is merged by its primary key. In a synchronization, the node is skipped, if it
+        is unchanged. Its hash is taken from the property ``content_hash`` or computed from the properties.
+
+        :param label: Label of the node
+        :param key: Name of the primary key, which has to be contained in the properties
+        :param properties: Dictionary of the node properties
+
+        """
+        if self.sync is not None:
+            if HASH_PROPERTY not in properties:
+                properties = dict(properties, **{HASH_PROPERTY: content_hash(properties)})
+            if not self.sync.changed(label, properties[key], properties[HASH_PROPERTY]):
+                self.skipped += 1
+                return
+        self.nodes.setdefault((label, key), []).append({"key": properties[key], "properties": properties})
+        self.added()
+
+    def relationship(self, rel_type, start, end, properties=None):
+        """This method adds a relationship between two nodes, which are matched by a property. If one of the nodes
+        does not exist, no relationship is created and it is not counted as written.
+
+        :param rel_type: Type of the relationship
+        :param start: Tuple ``(label, key, value)`` of the start node
+        :param end: Tuple ``(label, key, value)`` of the end node
+        :param properties: Dictionary of the relationship properties (Default value = None)
+
+        """
+        if self.sync is not None and not (self.sync.is_dirty(start[0], start[2]) or self.sync.is_dirty(end[0], end[2])):
+            self.skipped += 1
+            return
+        group = (rel_type, start[0], start[1], end[0], end[1])
+        self.relationships.setdefault(group, []).append({"start": start[2], "end": end[2],
+                                                         "properties": properties or {}})
+        self.added()
+
+    def added(self):
+        """This method flushes the collected entities, if a batch is full."""
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """This method writes all collected nodes and then all collected relationships."""
+        node_query = NODE_QUERY if self.sync is None else SYNC_NODE_QUERY
+        for (label, key), rows in self.nodes.items():
+            self.node_count += self.run(node_query.format(label=label, key=key), rows)
+            if self.sync is not None:
+                for query in self.sync.detach_queries(label):
+                    self.run(query, [row["key"] for row in rows])
+        for (rel_type, start_label, start_key, end_label, end_key), rows in self.relationships.items():
+            query = RELATIONSHIP_QUERY.format(type=rel_type, start_label=start_label, start_key=start_key,
+                                              end_label=end_label, end_key=end_key)
+            self.relationship_count += self.run(query, rows)
+        self.nodes, self.relationships, self.pending = {}, {}, 0
+
+    @profiled("neo4j.transactions")
+    def run(self, query, rows):
+        """This method runs a query in transactions of at most ``batch_size`` rows. Transactions, which fail with a
+        transient error like a deadlock, are retried.
+
+        :param query: The query, which gets the rows as parameter ``rows`` and returns the number of written entities
+        :param rows: List of rows
+        :returns: Number of written entities
+        :rtype: int
+
+        """
+        written = 0
+        for start in range(0, len(rows), self.batch_size):
+            for attempt in range(RETRIES + 1):
+                tx = self.graph.begin()
+                try:
+                    count = tx.run(query, rows=rows[start:start + self.batch_size]).evaluate()
+                    self.graph.commit(tx)
+                    written += count or 0
+                    break
+                except TransientError:
+                    self.graph.rollback(tx)
+                    if attempt == RETRIES:
+                        raise
+                    time.sleep(RETRY_DELAY * (attempt + 1))
+        return written
+
+    def close(self):
+        """This method writes the remaining nodes and relationships."""
+        self.flush()
+
+    def abort(self):
+        """This method discards the nodes and relationships, which were not written yet, e.g. because the project
+        they belong to could not be exported completely. The batches written before are kept.
+
+        """
+        self.nodes, self.relationships, self.pending = {}, {}, 0
+
+
+class GraphPartition:
+    """This class passes a part of the nodes and relationships to a writer, so that a graph can be written in two
+    passes: first the nodes with the labels in ``SHARED_LABELS``, which are shared by projects, each only once per
+    primary key unless it gains properties, and then all other nodes and the relationships. A relationship of the
+    second pass, whose node is neither shared nor passed before by the partition, e.g. because it belongs to a later
+    project or to the projects of another concurrent writer, is deferred until all nodes are written, so that no
+    relationship is written before its nodes.
+
+    Methods:
+        __init__(self, sink, shared)
+        node(self, label, key, properties)
+        relationship(self, rel_type, start, end, properties=None)
+        is_written(self, node)
+        write_deferred(self, sink)
+
+
+    """
+
+    def __init__(self, sink, shared):
+        """GraphPartition class constructor to initialize the object.
+
+        :param sink: Writer, which receives the nodes and relationships
+        :param shared: Passes the shared nodes, if set to ``True``, otherwise all other nodes and the relationships
+
+        """
+        self.sink = sink
+        self.shared = shared
+        self.written = {}
+        self.deferred = []
+
+    def node(self, label, key, properties):
+        """This method passes a node to the writer, if it belongs to the pass. A shared node is passed only, if it was
+        not passed before with the same properties, e.g. a user, which is the owner of a project with a few
+        attributes and its member with all.
+
+        :param label: Label of the node
+        :param key: Name of the primary key, which has to be contained in the properties
+        :param properties: Dictionary of the node properties
+
+        """
+        if (label in SHARED_LABELS) != self.shared:
+            return
+        if self.shared:
+            written = self.written.get((label, properties[key]))
+            if written is not None and properties.items() <= written.items():
+                return
+            self.written[(label, properties[key])] = dict(written or {}, **properties)
+        else:
+            self.written[(label, properties[key])] = True
+        self.sink.node(label, key, properties)
+
+    def relationship(self, rel_type, start, end, properties=None):
+        """This method passes a relationship to the writer in the second pass or defers it, if one of its nodes is
+        not written yet.
+
+        :param rel_type: Type of the relationship
+        :param start: Tuple ``(label, key, value)`` of the start node
+        :param end: Tuple ``(label, key, value)`` of the end node
+        :param properties: Dictionary of the relationship properties (Default value = None)
+
+        """
+        if self.shared:
+            return
+        if self.is_written(start) and self.is_written(end):
+            self.sink.relationship(rel_type, start, end, properties)
+        else:
+            self.deferred.append((rel_type, start, end, properties))
+
+    def is_written(self, node):
+        """This method checks, if a node is written before the relationships of the second pass.
+
+        :param node: Tuple ``(label, key, value)`` of the node
+        :returns: ``True``, if the node is shared or was passed by the partition
+        :rtype: bool
+
+        """
+        return node[0] in SHARED_LABELS or (node[0], node[2]) in self.written
+
+    def write_deferred(self, sink):
+        """This method passes the deferred relationships to a writer, after all nodes are written.
+
+        :param sink: Writer, which receives the relationships
+
+        """
+        for rel_type, start, end, properties in self.deferred:
+            sink.relationship(rel_type, start, end, properties)
+        self.deferred = []
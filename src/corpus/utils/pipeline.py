@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import queue
+import threading
+
+from corpus.utils.profiling import timed_call, timed_source, timed_stage
+
+"""
+.. module:: pipeline
+
+Streaming pipeline, whose stages run concurrently and pass the projects through bounded queues. The source and every
+stage run in their own thread, the sink in the calling thread. A full queue blocks the stage before it, so that only
+a fixed number of projects is held in memory, independent of the size of the corpus. An exception in any stage stops
+all stages and is raised by :func:`stream`.
+"""
+
+QUEUE_SIZE = 16
+
+# Seconds, after which a blocked stage checks, if the pipeline was stopped
+POLL_INTERVAL = 0.1
+
+END = object()
+
+
+def put(target, item, stop):
+    """This function puts an item into a queue, while the pipeline is not stopped.
+
+    :param target: The queue
+    :param item: The item
+    :param stop: Event, which is set, when the pipeline is stopped
+    :returns: ``False``, if the pipeline was stopped
+    :rtype: bool
+
+    """
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def consume(source, stop):
+    """This function takes the items of a queue until the end of the stream or until the pipeline is stopped.
+
+    :param source: The queue
+    :param stop: Event, which is set, when the pipeline is stopped
+    :returns: Iterator of the items
+
+    """
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        if item is END:
+            return
+        yield item
+
+
+def stream(source, stages, sink, queue_size=QUEUE_SIZE):
+    """This function streams the items of a source through stages into a sink.
+
+    :param source: Iterable of the items, e.g. a generator of extracted projects
+    :param stages: List of functions, which map an iterable of items to an iterable of items, e.g.
+        :meth:`corpus.filter.Filter.iter_filtered`
+    :param sink: Function, which receives every resulting item, e.g. the method ``write`` of a writer
+    :param queue_size: Maximal number of items in each queue (Default value = QUEUE_SIZE)
+    :returns: Number of items passed to the sink
+    :rtype: int
+
+    """
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    def produce(items, target):
+        try:
+            for item in items():
+                if not put(target, item, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        put(target, END, stop)
+
+    def stage_items(function, index):
+        return lambda: function(consume(queues[index], stop))
+
+    threads = [threading.Thread(target=produce, args=(lambda: source, queues[0]), name="pipeline-source",
+                                daemon=True)]
+    for index, stage in enumerate(stages):
+        threads.append(threading.Thread(target=produce, args=(stage_items(stage, index), queues[index + 1]),
+                                        name="pipeline-stage-{}".format(index + 1), daemon=True))
+    for thread in threads:
+        thread.start()
+    count = 0
+    try:
+        for item in consume(queues[-1], stop):
+            sink(item)
+            count += 1
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return count
+
+
+def build_corpus(extractor, corpus_filter, exporter, out="-", all_elements=False, include_private=False,
+                 queue_size=QUEUE_SIZE):
+    """This function runs the stages extract, filter and export as a streaming pipeline. Every project is filtered
+    and passed to the sink of the exporter, as soon as it is extracted. If the command is profiled, the time every
+    stage spends on the projects without waiting for the stage before it is recorded as step ``pipeline.<stage>``.
+
+    :param extractor: The extractor, see :class:`corpus.extract.Extractor`
+    :param corpus_filter: The filter with loaded filters, see :class:`corpus.filter.Filter`
+    :param exporter: The exporter, see :class:`corpus.export.Exporter`
+    :param out: Path to output file (Default value = "-")
+    :param all_elements: Ignores the pagination of the GitLab-API and extracts all projects, if set to ``True``
+        (Default value = False)
+    :param include_private: Includes private GitLab projects as well, if set to ``True`` (Default value = False)
+    :param queue_size: Maximal number of projects in each queue (Default value = QUEUE_SIZE)
+    :returns: Number of exported projects
+    :rtype: int
+
+    """
+    sink = exporter.open_sink(out)
+    try:
+        count = stream(timed_source("pipeline.extract", extractor.iter_projects(all_elements, include_private)),
+                       [timed_stage("pipeline.filter", corpus_filter.iter_filtered)],
+                       timed_call("pipeline.export", sink.write), queue_size)
+    except BaseException:
+        sink.abort()  # an incomplete corpus is neither finished nor synchronized
+        raise
+    sink.close()
+    return count
@@ -0,0 +1,498 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+"""
+.. module:: profiling
+
+Profiling of the corpus commands. A :class:`Profiler` measures the stages of a command, e.g. the extraction, the
+filtering and the export, with their wall time, CPU time and memory, and the steps inside the stages, e.g. every
+fetcher of the extraction, every filter predicate and every category of the Neo4J export, with their number of calls
+and their time. The steps are recorded only while a profiler is started, otherwise the instrumented functions are
+called directly.
+"""
+
+# The profiler of the running command, ``None`` if the command is not profiled
+PROFILER = None
+
+# File names of the dumps in the dump directory
+CPROFILE_FILE = "corpus.prof"
+SNAPSHOT_FILE = "{}.tracemalloc"
+
+# Interval in seconds, in which the resident set size is sampled during a stage
+RSS_INTERVAL = 0.01
+
+
+def peak_rss():
+    """This function returns the peak memory of the process.
+
+    :returns: The peak resident set size of the process since its start in bytes, ``None`` if it cannot be
+        determined
+    :rtype: int or None
+
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss():
+    """This function returns the current memory of the process.
+
+    :returns: The current resident set size of the process in bytes, ``None`` if it cannot be determined, e.g. on
+        systems without ``/proc``
+    :rtype: int or None
+
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """This class samples the resident set size of the process in a background thread, so that the peak of a stage
+    can be measured, while ``ru_maxrss`` only contains the peak since the start of the process.
+
+    Methods:
+        __init__(self, interval=RSS_INTERVAL)
+        start(self)
+        run(self)
+        stop(self)
+        sample(self)
+
+
+    """
+
+    def __init__(self, interval=RSS_INTERVAL):
+        """RssSampler class constructor to initialize the object.
+
+        :param interval: Interval of the samples in seconds (Default value = RSS_INTERVAL)
+
+        """
+        self.interval = interval
+        self.first = None
+        self.last = None
+        self.peak = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """This method takes the first sample and starts the sampling, if the resident set size can be determined."""
+        self.first = self.sample()
+        if self.first is not None:
+            self.thread = threading.Thread(target=self.run, name="rss-sampler", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        """This method samples the resident set size until the sampler is stopped."""
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        """This method stops the sampling and takes the last sample."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.last = self.sample()
+
+    def sample(self):
+        """This method takes a sample of the resident set size.
+
+        :returns: The current resident set size in bytes, which is added to the peak, ``None`` if it cannot be
+            determined
+        :rtype: int or None
+
+        """
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return rss
+
+
+class Profiler:
+    """This class records the stages and steps of a command. Steps can be recorded by several threads, e.g. by the
+    stages of the streaming pipeline of ``corpus build``, so their time can exceed the time of the stage. The memory
+    of a stage is measured by the sampled peak of the resident set size during the stage and its change by the stage.
+    The peak resident set size of the process is reported as well, which is the peak since its start. If a dump
+    directory is given, the command is profiled by :mod:`cProfile` and the allocations are traced by
+    :mod:`tracemalloc`, so that the peak of the allocated memory of every stage is reported and a snapshot of the
+    allocations is written at the end of every stage.
+
+    Methods:
+        __init__(self, dump_directory=None)
+        start(self)
+        stop(self)
+        stage(self, name)
+        record(self, name, seconds, calls=1)
+        report(self, command=None)
+        dump(self)
+
+
+    """
+
+    def __init__(self, dump_directory=None):
+        """Profiler class constructor to initialize the object.
+
+        :param dump_directory: Directory for the :mod:`cProfile` statistics and the :mod:`tracemalloc` snapshots,
+            nothing is dumped if not given (Default value = None)
+
+        """
+        self.dump_directory = dump_directory
+        self.stages = []
+        self.steps = {}
+        self.snapshots = {}
+        self.lock = threading.Lock()
+        self.profile = cProfile.Profile() if dump_directory else None
+        self.started = None
+        self.seconds = None
+
+    def start(self):
+        """This method starts the profiling of the command."""
+        self.started = time.perf_counter()
+        if self.dump_directory:
+            tracemalloc.start()
+            self.profile.enable()
+
+    def stop(self):
+        """This method stops the profiling of the command."""
+        if self.dump_directory:
+            self.profile.disable()
+            tracemalloc.stop()
+        self.seconds = time.perf_counter() - self.started
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """This method measures a stage of the command. Stages are expected to run one after another.
+
+        :param name: Name of the stage
+        :returns: Context manager, which measures the enclosed code
+
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        sampler = RssSampler()
+        sampler.start()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+            sampler.stop()
+            result = {"name": name, "seconds": seconds, "cpu_seconds": cpu_seconds, "peak_rss_bytes": sampler.peak,
+                      "rss_delta_bytes": sampler.last - sampler.first if sampler.first is not None else None,
+                      "process_peak_rss_bytes": peak_rss()}
+            if tracing:
+                result["allocated_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                self.snapshots[name] = tracemalloc.take_snapshot()
+            self.stages.append(result)
+
+    def record(self, name, seconds, calls=1):
+        """This method adds the time of calls to a step.
+
+        :param name: Name of the step, prefixed by the part of the command, e.g. ``extract.get_commits``
+        :param seconds: Duration of the calls in seconds
+        :param calls: Number of calls (Default value = 1)
+
+        """
+        with self.lock:
+            step = self.steps.setdefault(name, {"calls": 0, "seconds": 0.0})
+            step["calls"] += calls
+            step["seconds"] += seconds
+
+    def report(self, command=None):
+        """This method returns the report of the profiled command.
+
+        :param command: Name of the profiled command (Default value = None)
+        :returns: The report with the stages and the steps ordered by their time
+        :rtype: dict
+
+        """
+        with self.lock:
+            steps = [{"name": name, "calls": step["calls"], "seconds": step["seconds"],
+                      "seconds_per_call": step["seconds"] / max(step["calls"], 1)}
+                     for name, step in self.steps.items()]
+        steps.sort(key=lambda step: step["seconds"], reverse=True)
+        return {"command": command, "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(), "platform": platform.platform(), "seconds": self.seconds,
+                "process_peak_rss_bytes": peak_rss(), "stages": list(self.stages), "steps": steps}
+
+    def dump(self):
+        """This method writes the :mod:`cProfile` statistics, which can be read with :mod:`pstats` or viewers like
+        SnakeViz, and a :mod:`tracemalloc` snapshot of every stage into the dump directory.
+
+        :returns: Paths of the written files
+        :rtype: list
+
+        """
+        if not self.dump_directory:
+            return []
+        os.makedirs(self.dump_directory, exist_ok=True)
+        paths = [os.path.join(self.dump_directory, CPROFILE_FILE)]
+        self.profile.dump_stats(paths[0])
+        for name, snapshot in self.snapshots.items():
+            paths.append(os.path.join(self.dump_directory, SNAPSHOT_FILE.format(re.sub(r"[^\w.-]", "_", name))))
+            snapshot.dump(paths[-1])
+        return paths
+
+
+def start(dump_directory=None):
+    """This function starts a profiler for the running command.
+
+    :param dump_directory: Directory for the dumps, see :class:`Profiler` (Default value = None)
+    :returns: The started profiler
+    :rtype: Profiler
+
+    """
+    global PROFILER
+    PROFILER = Profiler(dump_directory)
+    PROFILER.start()
+    return PROFILER
+
+
+def stop():
+    """This function stops the profiler of the running command.
+
+    :returns: The stopped profiler, ``None`` if no profiler was started
+    :rtype: Profiler or None
+
+    """
+    global PROFILER
+    profiler, PROFILER = PROFILER, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def stage(name):
+    """This function measures a stage of the running command.
+
+    :param name: Name of the stage
+    :returns: Context manager, which measures the enclosed code as stage, if a profiler is started
+
+    """
+    if PROFILER is None:
+        return contextlib.nullcontext()
+    return PROFILER.stage(name)
+
+
+@contextlib.contextmanager
+def measure(profiler, name):
+    """This function measures a call of a step.
+
+    :param profiler: The profiler
+    :param name: Name of the step
+    :returns: Context manager, which records the enclosed code as a call of the step
+
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record(name, time.perf_counter() - start)
+
+
+def step(name):
+    """This function measures a call of a step of the running command.
+
+    :param name: Name of the step
+    :returns: Context manager, which records the enclosed code as a call of the step, if a profiler is started
+
+    """
+    if PROFILER is None:
+        return contextlib.nullcontext()
+    return measure(PROFILER, name)
+
+
+def profiled(name):
+    """This function returns a decorator, which records every call of a function as a call of a step, if a profiler
+    is started.
+
+    :param name: Name of the step
+    :returns: The decorator
+
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = PROFILER
+            if profiler is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def timed_predicate(name, predicate):
+    """This function records the calls of a filter predicate.
+
+    :param name: Name of the step
+    :param predicate: Filter predicate, which is called with a project and a dictionary of intermediate results
+    :returns: The predicate, which records its calls, if a profiler is started, otherwise the predicate itself
+    :rtype: callable
+
+    """
+    profiler = PROFILER
+    if profiler is None:
+        return predicate
+
+    def timed(project, memo):
+        start = time.perf_counter()
+        try:
+            return predicate(project, memo)
+        finally:
+            profiler.record(name, time.perf_counter() - start)
+    return timed
+
+
+def waiting(items, waited):
+    """This function yields the items of an iterable and adds the time spent waiting for them to a counter.
+
+    :param items: The iterable
+    :param waited: List, to whose first value the time is added
+    :returns: Iterator of the items
+
+    """
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            waited[0] += time.perf_counter() - start
+        yield item
+
+
+def timed_items(name, items, profiler, waited=None):
+    """This function yields the items of an iterable and records the time spent producing them as a step.
+
+    :param name: Name of the step
+    :param items: The iterable
+    :param profiler: The profiler
+    :param waited: List, whose first value is the time spent waiting for the input of the iterable, which is not
+        recorded (Default value = None)
+    :returns: Iterator of the items
+
+    """
+    produced = [0.0]
+    calls = 0
+    try:
+        for item in waiting(items, produced):
+            calls += 1
+            yield item
+    finally:
+        profiler.record(name, produced[0] - (waited[0] if waited is not None else 0.0), calls)
+
+
+def timed_source(name, items):
+    """This function records the time spent producing the items of a source.
+
+    :param name: Name of the step
+    :param items: Iterable of items, e.g. the extracted projects
+    :returns: Iterator of the items, which records the time spent producing them, if a profiler is started
+    :rtype: iterable
+
+    """
+    if PROFILER is None:
+        return items
+    return timed_items(name, items, PROFILER)
+
+
+def timed_stage(name, function):
+    """This function records the time spent in a stage of a pipeline.
+
+    :param name: Name of the step
+    :param function: Stage of a pipeline, which maps an iterable of items to an iterable of items
+    :returns: The stage, which records the time spent producing its items without the time spent waiting for its
+        input, if a profiler is started, otherwise the stage itself
+    :rtype: callable
+
+    """
+    profiler = PROFILER
+    if profiler is None:
+        return function
+
+    def stage_function(items):
+        waited = [0.0]
+        return timed_items(name, function(waiting(items, waited)), profiler, waited)
+    return stage_function
+
+
+def timed_call(name, function):
+    """This function records the calls of a function.
+
+    :param name: Name of the step
+    :param function: The function, e.g. the sink of a pipeline
+    :returns: The function, which records its calls, if a profiler is started, otherwise the function itself
+    :rtype: callable
+
+    """
+    if PROFILER is None:
+        return function
+    return profiled(name)(function)
+
+
+def format_report(report):
+    """This function formats a report as text.
+
+    :param report: The report, see :meth:`Profiler.report`
+    :returns: Lines of a table of the stages, the peak memory of the process and a table of the steps
+    :rtype: list
+
+    """
+    def megabytes(value, sign=""):
+        return ("{:" + sign + ".1f}").format(value / 2 ** 20) if value is not None else "-"
+
+    lines = ["{:<40} {:>10} {:>10} {:>12} {:>12} {:>14}".format("stage", "seconds", "cpu", "peak RSS MiB",
+                                                                 "RSS +/- MiB", "allocated MiB")]
+    for result in report["stages"]:
+        lines.append("{:<40} {:>10.3f} {:>10.3f} {:>12} {:>12} {:>14}".format(
+            result["name"][:40], result["seconds"], result["cpu_seconds"], megabytes(result["peak_rss_bytes"]),
+            megabytes(result["rss_delta_bytes"], "+"), megabytes(result.get("allocated_peak_bytes"))))
+    lines.append("Peak RSS of the process since its start: {} MiB".format(megabytes(report["process_peak_rss_bytes"])))
+    lines.append("")
+    lines.append("{:<40} {:>10} {:>10} {:>12}".format("step", "calls", "seconds", "ms per call"))
+    for result in report["steps"]:
+        lines.append("{:<40} {:>10} {:>10.3f} {:>12.3f}".format(
+            result["name"][:40], result["calls"], result["seconds"], result["seconds_per_call"] * 1000))
+    return lines
+
+
+def save_report(report, path):
+    """This function writes a report into a JSON file.
+
+    :param report: The report, see :meth:`Profiler.report`
+    :param path: Path to the JSON file
+
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
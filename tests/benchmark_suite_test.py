@@ -0,0 +1,54 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import pytest
+
+from corpus.extract import Extractor
+from corpus.synth import Synthesizer
+from corpus.utils.benchmark_suite import CASES, compare, load_results, run_suite, save_results
+from corpus.utils.fake_gitlab import FakeGitlab
+from corpus.utils.helpers import Corpus
+
+
+def test_fake_gitlab():
+    projects = list(Synthesizer(5, seed=2).generate())
+    gitlab = FakeGitlab(projects)
+    corpus = Corpus()
+    Extractor(False, gitlab, corpus).extract(all_elements=True)
+    extracted = corpus.data["Projects"]
+    assert [project["id"] for project in extracted] == [project["id"] for project in projects]
+    for project, original in zip(extracted, projects):
+        for key in ["commits", "issues", "mergerequests", "releases", "users", "languages"]:
+            assert project.get(key) == (original[key] or None)
+    assert gitlab.requests > len(projects) * 10
+
+
+def test_run_suite(tmp_path):
+    results = run_suite(sizes=[10], cases=["extract", "filter", "export-neo4j"], isolate=False)
+    cases = [result["case"] for result in results["results"]]
+    assert cases == ["extract", "filter-scalar", "filter-regex", "filter-languages", "export-neo4j"]
+    for result in results["results"]:
+        assert result["size"] == 10 and result["seconds"] > 0 and result["allocated_peak_bytes"] > 0
+    save_results(results, str(tmp_path / "results.json"))
+    assert load_results(str(tmp_path / "results.json")) == results
+
+
+def test_run_suite_filter_file(tmp_path):
+    filter_file = tmp_path / "stars.yaml"
+    filter_file.write_text("filters:\n    star_count:\n        operator: '>'\n        value: 2\nattributes:\n")
+    results = run_suite(sizes=[10], cases=["filter-stars"], isolate=False, filter_files={"stars": str(filter_file)})
+    assert [result["case"] for result in results["results"]] == ["filter-stars"]
+    assert "filter-stars" not in CASES
+
+
+def test_compare():
+    def results(seconds, rss):
+        return {"results": [{"case": "export-json", "size": 100, "seconds": seconds, "peak_rss_bytes": rss,
+                             "allocated_peak_bytes": 1000},
+                            {"case": "export-arrow", "size": 100, "skipped": "No module named 'pyarrow'"}]}
+
+    assert compare(results(1.1, 100), results(1.0, 100)) == []
+    regressions = compare(results(1.5, 100), results(1.0, None), threshold=0.2)
+    assert [(regression["case"], regression["metric"]) for regression in regressions] == [("export-json", "seconds")]
+    assert regressions[0]["ratio"] == pytest.approx(1.5)
+    assert len(compare(results(1.0, 200), results(1.0, 100))) == 1
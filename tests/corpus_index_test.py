@@ -0,0 +1,97 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import json
+import pytest
+from unittest import mock
+from corpus.filter import Filter
+from corpus.utils.corpus_index import CorpusIndex
+from corpus.utils.helpers import Corpus
+
+projects = {"Projects": [{"id": index, "star_count": index % 7 if index != 3 else None,
+                          "namespace": {"full_path": "group-{}".format(index % 3)},
+                          "languages": {"C": 100.0} if index % 2 else {"Python": 60.0, "C": 40.0}}
+                         for index in range(20)]}
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(projects, f, indent=4)
+    return corpus_file
+
+
+def run_filter(corpus_file, mocked_filters):
+    filter = Filter(False, Corpus())
+    filter.filtered_corpus = Corpus()
+    with mock.patch("builtins.open", mock.mock_open(read_data=mocked_filters), create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    filter.load_corpus(corpus_file)
+    filter.filter()
+    return filter
+
+
+def test_build_index(corpus_file):
+    CorpusIndex.build(corpus_file).save()
+    index = CorpusIndex.load(corpus_file)
+    assert index.size == 20
+    assert index.range("id", 5, 7) == {5, 6, 7}
+    assert index.range("star_count", low=6) == {3, 6, 13}  # null values are always selected
+    assert index.lookup("namespace.full_path", "group-1") == {1, 4, 7, 10, 13, 16, 19}
+    assert {project for project, _ in index.languages("Python")} == set(range(0, 20, 2))
+    assert not index.has_column("namespace.full_path")
+    with open(corpus_file, "rb") as f:
+        raw = f.read()
+    for project, (offset, length) in zip(projects["Projects"], index.locations(range(20))):
+        assert json.loads(raw[offset:offset + length]) == project
+
+
+def test_index_invalidated_on_change(corpus_file):
+    CorpusIndex.build(corpus_file).save()
+    with open(corpus_file, "w") as f:
+        json.dump({"Projects": projects["Projects"][:5]}, f)
+    assert CorpusIndex.load(corpus_file) is None
+
+
+@pytest.mark.parametrize("mocked_filters, selected", [
+    ("""
+        filters:
+            id:
+                operator: ">="
+                value: 15
+        attributes:
+    """, 5),
+    ("""
+        filters:
+            any_languages:
+                Python:
+                    operator: ">"
+                    value: 50.0
+        expressions:
+            - namespace.full_path == "group-0" or star_count < 2
+        attributes:
+            - id
+    """, 8),
+    ("""
+        filters:
+        expressions:
+            - not id == 1
+        attributes:
+            - id
+    """, 20),
+    ("""
+        filters:
+            atleast_languages:
+                Python:
+                    value: 50.0
+        attributes:
+            - id
+    """, 20),
+])
+def test_filter_with_index(corpus_file, mocked_filters, selected):
+    expected = run_filter(corpus_file, mocked_filters).filtered_corpus.data["Projects"]
+    CorpusIndex.build(corpus_file).save()
+    filter = run_filter(corpus_file, mocked_filters)
+    assert filter.filtered_corpus.data["Projects"] == expected
+    assert len(filter.input_corpus.data["Projects"]) == selected
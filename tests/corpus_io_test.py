@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import io
+import json
+import pytest
+from corpus.utils.corpus_io import (CorpusReader, CorpusWriter, SERIALIZERS, load_corpus, iter_projects, read_projects,
+                                    open_reader, is_json_lines, compression)
+
+corpus_data = {"Projects": [
+    {"id": 1, "name": "Test Project", "description": "ünïcode \"quoted\" ]}", "languages": {"Python": 100.0},
+     "commits": [{"id": "123abc", "parent_ids": ["456def"]}]},
+    {"id": 2, "name": "Second Project", "description": None, "languages": {}, "star_count": 12345}
+]}
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_reader(indent, chunk_size):
+    raw = json.dumps(corpus_data, indent=indent, ensure_ascii=False)
+    reader = CorpusReader(io.StringIO(raw, newline=""), chunk_size=chunk_size)
+    elements = list(reader)
+    assert [element for _, _, _, element in elements] == corpus_data["Projects"]
+    for category, offset, length, element in elements:
+        assert category == "Projects"
+        assert json.loads(raw.encode()[offset:offset + length]) == element
+
+
+def test_reader_keys():
+    raw = json.dumps(corpus_data)
+    reader = CorpusReader(io.StringIO(raw), keys=["id", "star_count"], chunk_size=5)
+    assert [element for _, _, _, element in reader] == [{"id": 1}, {"id": 2, "star_count": 12345}]
+
+
+def test_reader_metadata():
+    reader = CorpusReader(io.StringIO('{"version": 2, "Projects": []}'))
+    assert list(reader) == []
+    assert reader.metadata == {"version": 2}
+
+
+@pytest.mark.parametrize("raw", ['{"Projects": [{"id": 1}', '{"Projects": [{"id": 1} {"id": 2}]}', '[]'])
+def test_reader_invalid(raw):
+    with pytest.raises(ValueError):
+        list(CorpusReader(io.StringIO(raw)))
+
+
+def test_load_corpus(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(corpus_data, f, indent=4)
+    assert load_corpus(corpus_file) == corpus_data
+    assert load_corpus(corpus_file, {"name"}) == {"Projects": [{"name": "Test Project"}, {"name": "Second Project"}]}
+    assert [project["id"] for project in iter_projects(corpus_file, ["id"])] == [1, 2]
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+@pytest.mark.parametrize("projects", [corpus_data["Projects"], []])
+def test_writer(tmp_path, indent, projects):
+    corpus_file = str(tmp_path / "corpus.json")
+    with CorpusWriter(corpus_file, indent=indent) as writer:
+        for project in projects:
+            writer.write(project)
+    with open(corpus_file) as f:
+        data = f.read()
+    assert json.loads(data) == {"Projects": projects}
+    if indent is not None:
+        assert data.rstrip() == json.dumps({"Projects": projects}, indent=indent)
+    else:
+        assert "\n" not in data and '", "' not in data
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+@pytest.mark.parametrize("serializer", SERIALIZERS.values())
+def test_writer_corpus(tmp_path, indent, serializer):
+    corpus_file = str(tmp_path / "corpus.json")
+    data = {"version": {"major": 2}, "Projects": corpus_data["Projects"], "Groups": [], "Users": [{"id": 1 << 70}]}
+    with CorpusWriter(corpus_file, indent=indent, serializer=serializer, buffer_size=16) as writer:
+        writer.write_corpus(data)
+    assert writer.count == 3
+    with open(corpus_file, encoding="utf-8") as f:
+        assert json.load(f) == data
+    if indent is not None:
+        with open(corpus_file, encoding="utf-8") as f:
+            assert f.read() == json.dumps(data, indent=indent) + "\n"
+
+
+@pytest.mark.parametrize("suffix", [".json", ".json.gz", ".jsonl", ".jsonl.gz", ".json.zst", ".jsonl.zst"])
+def test_compressed_formats(tmp_path, suffix):
+    if suffix.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    corpus_file = str(tmp_path / ("corpus" + suffix))
+    with CorpusWriter(corpus_file, buffer_size=16) as writer:
+        writer.write_corpus(corpus_data)
+    assert load_corpus(corpus_file) == corpus_data
+    assert [project["id"] for project in iter_projects(corpus_file, ["id"])] == [1, 2]
+    assert is_json_lines(corpus_file) == (".jsonl" in suffix)
+    with open(corpus_file, "rb") as f:
+        raw = f.read()
+    assert (raw[:1] == b"{") == (compression(corpus_file) is None)
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl.gz"])
+def test_writer_aborted(tmp_path, suffix):
+    corpus_file = str(tmp_path / ("corpus" + suffix))
+    with CorpusWriter(corpus_file) as writer:
+        writer.write_corpus(corpus_data)
+    with pytest.raises(RuntimeError):
+        with CorpusWriter(corpus_file, buffer_size=16) as writer:
+            writer.write(corpus_data["Projects"][0])
+            raise RuntimeError("export failed")
+    # the complete corpus of the former run is kept and no temporary file is left
+    assert load_corpus(corpus_file) == corpus_data
+    assert [path.name for path in tmp_path.iterdir()] == ["corpus" + suffix]
+
+
+def test_json_lines_offsets(tmp_path):
+    corpus_file = str(tmp_path / "corpus.jsonl")
+    with CorpusWriter(corpus_file, indent=4) as writer:
+        writer.write_corpus({"version": 2, "Projects": corpus_data["Projects"]})
+    with open(corpus_file, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    assert len(lines) == 2
+    with open_reader(corpus_file) as reader:
+        locations = [(offset, length) for _, offset, length, _ in reader]
+    assert locations == [(0, len(lines[0])), (len(lines[0]), len(lines[1]))]
+    assert list(read_projects(corpus_file, locations[1:], ["id"])) == [{"id": 2}]
@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+from corpus.synth import Synthesizer
+from corpus.utils.export_benchmark import RecordingGraph, run_benchmark
+
+
+def synthetic_projects(count, seed=0):
+    return list(Synthesizer(count, seed).generate())
+
+
+def test_run_benchmark():
+    result = run_benchmark(synthetic_projects(50), batch_size=1000)
+    assert result["projects"] == 50
+    assert result["rows"] == result["nodes"] + result["relationships"]
+    assert result["transactions"] == result["queries"]
+    assert result["round_trips"] == result["statements"] + result["queries"] + result["transactions"]
+    assert result["entities_per_second"] > 0
+
+
+def test_round_trips_per_project():
+    small = run_benchmark(synthetic_projects(50), batch_size=1000)
+    large = run_benchmark(synthetic_projects(200), batch_size=1000)
+    # a query per node or project would need at least one round-trip per row
+    assert large["round_trips"] * 10 < large["rows"]
+    assert large["round_trips_per_project"] <= small["round_trips_per_project"] * 1.5
+
+
+def test_run_benchmark_parallel():
+    projects = synthetic_projects(120)
+    serial = run_benchmark(projects)
+    parallel = run_benchmark(projects, workers=4)
+    assert parallel["relationships"] == serial["relationships"]
+    assert parallel["rollbacks"] == 0
+
+
+def test_recording_graph_forwards():
+    class Target:
+        def __init__(self):
+            self.calls = []
+
+        def run(self, statement):
+            self.calls.append(("run", statement))
+
+        def begin(self):
+            return "tx"
+
+        def commit(self, tx):
+            self.calls.append(("commit", tx))
+
+    target = Target()
+    graph = RecordingGraph(target)
+    graph.run("CREATE INDEX")
+    graph.commit(graph.begin())
+    assert target.calls == [("run", "CREATE INDEX"), ("commit", "tx")]
+    assert graph.statistics()["round_trips"] == 2
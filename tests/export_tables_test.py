@@ -0,0 +1,33 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+from corpus.utils.export_tables import ColumnTypes, convert_value, flatten, iter_rows, table_types
+
+project = {"id": 7, "name": "Test", "namespace": {"id": 1, "full_path": "group"}, "tag_list": ["a"],
+           "commits": [{"id": "abc", "stats": {"additions": 3}}, {"id": "def", "project_id": 8}],
+           "files": ["README.md"], "languages": {"Python": 75.5, "C": 24.5}}
+
+
+def test_flatten():
+    assert flatten({"a": {"b": {"c": 1}}, "d": [1, 2], "e": None}) == {"a.b.c": 1, "d": "[1, 2]", "e": None}
+
+
+def test_iter_rows():
+    rows = list(iter_rows(project))
+    assert rows == [
+        ("projects", {"id": 7, "name": "Test", "namespace.id": 1, "namespace.full_path": "group", "tag_list": '["a"]'}),
+        ("commits", {"project_id": 7, "id": "abc", "stats.additions": 3}),
+        ("commits", {"project_id": 7, "id": "def"}),
+        ("files", {"project_id": 7, "value": "README.md"}),
+        ("languages", {"project_id": 7, "name": "Python", "value": 75.5}),
+        ("languages", {"project_id": 7, "name": "C", "value": 24.5}),
+    ]
+
+
+def test_column_types():
+    types = ColumnTypes()
+    for row in [{"a": 1, "b": 1, "c": None, "d": True}, {"a": 2.5, "b": "x", "c": None, "d": False, "e": 1 << 70}]:
+        types.update(row)
+    assert types.resolve() == {"a": "float", "b": "str", "c": "str", "d": "bool", "e": "str"}
+    assert convert_value(1, "float") == 1.0 and convert_value(1, "str") == "1" and convert_value(None, "int") is None
+    assert table_types([project])["commits"] == {"project_id": "int", "id": "str", "stats.additions": "int"}
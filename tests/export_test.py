@@ -1,9 +1,21 @@
+import copy
+import csv
 import json
-from unittest.mock import patch
+import os
+import re
+import sqlite3
+import pytest
+from unittest import mock
+from py2neo.errors import TransientError
 
 from corpus.export import Exporter
+from corpus.utils.export_helpers import IdentityIndex
+from corpus.utils.export_models import File as FileModel
+from corpus.utils.export_models import Release as ReleaseModel
+from corpus.utils.export_models import User as UserModel
+from corpus.utils.neo4j_csv import Neo4jCsvWriter
+from corpus.utils.neo4j_writer import GraphPartition, Neo4jWriter, neo4j_version, property_values
 from corpus.utils.helpers import Corpus
-from unittest import mock
 
 corpus = Corpus()
 corpus.data = {"Projects": [
@@ -363,7 +375,8 @@ corpus.data = {"Projects": [
             {
                 "id": "hash123",
                 "name": "test.py",
-                "type": "blob"
+                "type": "blob",
+                "path": "test.py"
             }
         ]
     }
@@ -378,202 +391,468 @@ class Config:
                                        "password": "corpus"}}
 
 
-class Graph:
-
-    nodes = []
-
-    def __init__(self, neo4j_url, user, password):
-        self.neo4j_url = neo4j_url
-        self.user = user
-        self.password = password
+class Transaction:
 
-    def push(self, element):
-        self.nodes.append(element)
+    def __init__(self, graph):
+        self.graph = graph
 
+    def run(self, query, **parameters):
+        rows = parameters["rows"] if "rows" in parameters else parameters["keys"]
+        self.graph.queries.append((query, rows))
+        return Cursor(self.graph.write(query, rows))
 
-class RelationMock:
-
-    def __init__(self):
-        self.related_to = []
 
-    def update(self, element):
-        self.related_to.append(element)
-
-
-class LanguageRelationMock:
-
-    def __init__(self):
-        self.related_to = []
-
-    def update(self, element1, element2):
-        self.related_to.append([element1, element2])
-
-
-class ProjectMock:
-
-    def __init__(self):
-        self.id = 1
+class Cursor:
 
+    def __init__(self, value, records=()):
+        self.value = value
+        self.records = records
 
-class NamespaceMock:
-
-    def __init__(self):
-        self.id = 123
-        self.belongs_to = RelationMock()
-
-
-class OwnerMock:
-
-    def __init__(self):
-        self.id = 123
-        self.owns = RelationMock()
-
-
-class UserMock:
-
-    def __init__(self):
-        self.id = 123
-        self.name = "User, Test"
-        self.belongs_to = RelationMock()
-        self.contributes_to = RelationMock()
-
-
-class CommitMock:
-
-    def __init__(self):
-        self.id = "123abc"
-        self.committer_name = "User, Test"
-        self.belongs_to = RelationMock()
-        self.committed_by = RelationMock()
-
-
-class FileMock:
-
-    def __init__(self):
-        self.id = "hash123"
-        self.belongs_to = RelationMock()
+    def evaluate(self):
+        return self.value
 
+    def __iter__(self):
+        return iter(self.records)
 
-class LanguageMock:
 
-    def __init__(self):
-        self.name = "Python"
-        self.value = 100.0
-        self.is_contained_in = LanguageRelationMock()
-
-
-class MilestoneMock:
-
-    def __init__(self):
-        self.id = 12
-        self.belongs_to_project = RelationMock()
-
-
-class IssueMock:
-
-    def __init__(self):
-        self.id = 1234
-        self.author = "{'id': 123, 'name': 'User, Test', 'username': 'user_t'}"
-        self.assignees = "[{'id': 123, 'name': 'User, Test', 'username': 'user_t'}]"
-        self.milestone = "{'id': 12, 'iid': 1, 'project_id': 1}"
-        self.authored_by = RelationMock()
-        self.assigned_to = RelationMock()
-        self.belongs_to_milestone = RelationMock()
-
-
-class MergerequestMock:
-
-    def __init__(self):
-        self.id = 123
-        self.iid = 54
-        self.title = "Title"
-        self.author = "{'id': 123, 'name': 'User, Test', 'username': 'user_t'}"
-        self.merged_by = "{'id': 123, 'name': 'User, Test', 'username': 'user_t'}"
-        self.closed_by = "{'id': 123, 'name': 'User, Test', 'username': 'user_t'}"
-        self.assignees = "[{'id': 123, 'name': 'User, Test', 'username': 'user_t'}]"
-        self.commits = "[{'id': '123abc', 'committer_name': 'User, Test'}]"
-        self.close_issues = "[{'id': 1234, 'name': 'User, Test', 'username': 'user_t'}]"
-        self.is_closed_by = RelationMock()
-        self.is_merged_by = RelationMock()
-        self.has_commit = RelationMock()
-        self.closes = RelationMock()
-        self.authored_by = RelationMock()
-        self.assigned_to = RelationMock()
-
-
-class ReleaseMock:
+class Graph:
 
-    def __init__(self):
-        self.tag_name = "v1.2"
-        self.name = "Release name"
-        self.author = "{'id': 123, 'name': 'User, Test', 'username': 'user_t'}"
-        self.commit = """{'id': '123abc', 'short_id': '1a', 'title': 'Initial commit', 'author_name': 'Test User',
-        'author_email': 'test@us.er', 'authored_date': '2021-09-20T12:00:00+01:00', 'committer_name': 'Tester',
-        'committer_email': 'tester@example.com', 'committed_date': '2021-09-20T12:00:00+01:00', 
-        'created_at': '2021-09-20T12:00:00+01:00', 'message': 'test commit',
-        'parent_ids': [ '456def' ], 'web_url': 'test.com'}"""
-        self.milestones = """{ "id": 1, "iid": 2, "project_id": 123, "title": "1.0", "description": "Version",
-            "due_date": "2021-08-04", "start_date": "2021-07-10", "state": "active", 
-            "updated_at": "2021-07-12T19:31:15Z", "created_at": "2021-07-10T08:13:12Z", "expired": False }"""
-        self.authored_by = RelationMock()
-        self.committed_through = RelationMock()
-        self.belongs_to = RelationMock()
-
-
-def test_export_json():
+    def __init__(self, neo4j_url, user, password, version="4.3.2"):
+        self.neo4j_url = neo4j_url
+        self.user = user
+        self.password = password
+        self.version = version
+        self.queries = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.hashes = {}
+        self.nodes = set()
+        self.relationships = []
+
+    def run(self, statement):
+        self.statements.append(statement)
+        if "content_hash" in statement:
+            return Cursor(None, self.hashes.get(statement.split("`")[1], []))
+        return Cursor(self.version if "dbms.components" in statement else None)
+
+    def begin(self):
+        return Transaction(self)
+
+    def commit(self, tx):
+        self.commits += 1
+
+    def rollback(self, tx):
+        self.rollbacks += 1
+
+    def write(self, query, rows):
+        node = re.match(r"UNWIND \$rows AS row MERGE \(n:`(\w+)`", query)
+        if node:
+            self.nodes.update((node.group(1), row["key"]) for row in rows)
+            return len(rows)
+        detach = re.search(r"key\}\)(-|<-)\[r:`(\w+)`\]", query)
+        if detach is not None:
+            position = 1 if detach.group(1) == "-" else 2
+            removed = [relationship for relationship in self.relationships
+                       if relationship[0] == detach.group(2) and relationship[position] in rows]
+            self.relationships = [relationship for relationship in self.relationships if relationship not in removed]
+            return len(removed)
+        relationship = re.search(r"\(a:`(\w+)`.*\(b:`(\w+)`.*\[r:`(\w+)`\]", query)
+        if relationship is None:
+            return len(rows)
+        start, end, rel_type = relationship.groups()
+        matched = [(rel_type, row["start"], row["end"]) for row in rows
+                   if (start, row["start"]) in self.nodes and (end, row["end"]) in self.nodes]
+        self.relationships.extend(matched)
+        return len(matched)
+
+    def rows(self, pattern):
+        return [row for query, rows in self.queries if pattern in query for row in rows]
+
+
+def test_export_json(tmp_path):
     exporter = Exporter(Config(), corpus, "json")
-    exporter.export("out/test.json")
-    with open("out/test.json", "r") as f:
+    exporter.export(str(tmp_path / "test.json"))
+    with open(str(tmp_path / "test.json"), "r") as f:
         data = f.read()
 
     exported_data = json.loads(data)
     assert exported_data == corpus.data
 
 
-@patch('corpus.export.ReleaseModel')
-@patch('corpus.export.MergerequestModel')
-@patch('corpus.export.IssueModel')
-@patch('corpus.export.MilestoneModel')
-@patch('corpus.export.LanguageModel')
-@patch('corpus.export.transform_language_dict')
-@patch('corpus.export.FileModel')
-@patch('corpus.export.CommitModel')
-@patch('corpus.export.find_user_by_name')
-@patch('corpus.export.UserModel')
-@patch('corpus.export.NamespaceModel')
-@patch('corpus.export.ProjectModel')
-def test_export_neo4j(projectmodel_patch, namespacemodel_patch, usermodel_patch, find_user_by_name_patch,
-                      commitmodel_patch, filemodel_patch, transform_language_dict_patch, languagemodel_patch,
-                      milestonemodel_patch, issuemodel_patch, mergerequestmodel_patch, releasemodel_patch):
-    projectmodel_patch.create = mock.Mock(return_value=ProjectMock())
-    namespacemodel_patch.create = mock.Mock(return_value=NamespaceMock())
-    user = UserMock()
-    usermodel_patch.create = mock.Mock(return_value=OwnerMock())
-    usermodel_patch.get_or_create = mock.Mock(return_value=user)
-    find_user_by_name_patch = mock.Mock(return_value=user)
-    commitmodel_patch.get_or_create = mock.Mock(return_value=CommitMock())
-    filemodel_patch.create = mock.Mock(return_value=FileMock())
-    transform_language_dict_patch = mock.Mock(return_value=[{"name": "Python", "value": 100.0}])
-    languagemodel_patch.get_or_create = mock.Mock(return_value=LanguageMock())
-    milestone = MilestoneMock()
-    milestonemodel_patch.create = mock.Mock(return_value=milestone)
-    milestonemodel_patch.get = mock.Mock(return_value=milestone)
-    issuemodel_patch.create = mock.Mock(return_value=IssueMock())
-    mergerequestmodel_patch.create = mock.Mock(return_value=MergerequestMock())
-    releasemodel_patch.create = mock.Mock(return_value=ReleaseMock())
-
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_export_tables(tmp_path, output_format):
+    pyarrow = pytest.importorskip("pyarrow")
+    pytest.importorskip("pyarrow.parquet")
+    exporter = Exporter(Config(), corpus, output_format)
+    exporter.export(str(tmp_path / "tables"))
+
+    def read(table):
+        path = str(tmp_path / "tables" / "{}.{}".format(table, output_format))
+        if output_format == "parquet":
+            return pyarrow.parquet.read_table(path)
+        with pyarrow.memory_map(path) as source:
+            return pyarrow.ipc.open_file(source).read_all()
+
+    projects = read("projects")
+    assert projects.num_rows == 1
+    assert projects.column("namespace.id").to_pylist() == [123]
+    assert read("commits").column("project_id").to_pylist() == [1] * len(corpus.data["Projects"][0]["commits"])
+    assert read("languages").to_pylist() == [{"project_id": 1, "name": name, "value": value}
+                                             for name, value in corpus.data["Projects"][0]["languages"].items()]
+
+
+def test_export_sqlite(tmp_path):
+    path = str(tmp_path / "corpus.db")
+    project = corpus.data["Projects"][0]
+    exporter = Exporter(Config(), corpus, "sqlite")
+    exporter.export(path)
+    exporter.export(path)  # existing tables are replaced
+
+    connection = sqlite3.connect(path)
+    assert connection.execute('SELECT id, namespace_id FROM projects').fetchall() == [(1, 123)]
+    assert connection.execute('SELECT id, full_path FROM namespaces').fetchall() == [(123, "user_t")]
+    assert connection.execute("SELECT count(*) FROM commits WHERE project_id = 1").fetchone()[0] == \
+        len(project["commits"])
+    assert connection.execute("SELECT language, value FROM project_languages").fetchall() == \
+        list(project["languages"].items())
+    assert connection.execute("SELECT count(*) FROM users").fetchone()[0] == \
+        len({user["id"] for user in project["users"] + [project["owner"]]})
+    indexes = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert "projects_id_key" in indexes and "commits_project_id_index" in indexes
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    connection.close()
+
+
+def test_export_neo4j():
+    project = corpus.data["Projects"][0]
     exporter = Exporter(Config(), corpus, "neo4j")
     exporter.graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
     exporter.export_to_neo4j()
+    graph = exporter.graph
+
+    assert [row["key"] for row in graph.rows("MERGE (n:`Project` {`id`: row.key})")] == [1]
+    assert graph.rows("MERGE (n:`Project`")[0]["properties"]["name"] == "Test Project"
+    assert [row["key"] for row in graph.rows("MERGE (n:`Namespace`")] == [123]
+    # the owner is also a member with the same attributes
+    assert len(graph.rows("MERGE (n:`User`")) == len(project["users"])
+    assert len(graph.rows("MERGE (n:`Commit`")) == len(project["commits"])
+    for label in ["Issue", "Mergerequest", "Milestone", "Release", "File", "Language"]:
+        assert len(graph.rows("MERGE (n:`{}`".format(label))) > 0
+    assert {"start": "Python", "end": 1, "properties": {"value": 100.0}} in graph.rows("[r:`IS_CONTAINED_IN`]")
+    assert {"start": 1234, "end": 12, "properties": {}} in graph.rows("[r:`BELONGS_TO_MILESTONE`]")
+    assert {"start": 1234, "end": 123, "properties": {}} in graph.rows("[r:`AUTHORED_BY`]")
+    assert {"start": "123abc", "end": 123, "properties": {}} in graph.rows("[r:`COMMITTED_BY`]")
+    assert all("MATCH (b:`User` {`id`: row.end})" in query for query, _ in graph.queries if "(b:`User`" in query)
+    assert {"start": 1, "end": "123abc", "properties": {}} in graph.rows("[r:`IS_MERGED_BY`]")
+    assert {"start": "1:v0.1", "end": "123abc", "properties": {}} in graph.rows("[r:`COMMITTED_THROUGH`]")
+    assert [row["key"] for row in graph.rows("MERGE (n:`Release` {`key`: row.key})")] == ["1:v0.1"]
+    assert {"start": "1:test.py", "end": 1, "properties": {}} in graph.rows("[r:`BELONGS_TO`]")
+    assert graph.commits == len(graph.queries)
+    issue = graph.rows("MERGE (n:`Issue`")[0]["properties"]
+    assert issue["author.id"] == 123 and "author" not in issue and "assignees" not in issue
+    assert "CREATE CONSTRAINT project_id_unique IF NOT EXISTS ON (n:`Project`) ASSERT n.`id` IS UNIQUE" \
+        in graph.statements
+    assert "CREATE INDEX issue_iid_index IF NOT EXISTS FOR (n:`Issue`) ON (n.`iid`)" in graph.statements
+
+    node_queries = [index for index, (query, _) in enumerate(graph.queries) if "MERGE (n:" in query]
+    assert max(node_queries) < min(index for index, (query, _) in enumerate(graph.queries) if "MERGE (a)" in query)
+
+
+@pytest.mark.parametrize("version, statement", [
+    ((5, 12), "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (n:`User`) REQUIRE n.`id` IS UNIQUE"),
+    ((4, 4), "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (n:`User`) REQUIRE n.`id` IS UNIQUE"),
+    ((4, 2), "CREATE CONSTRAINT user_id_unique IF NOT EXISTS ON (n:`User`) ASSERT n.`id` IS UNIQUE"),
+])
+def test_schema_statements(version, statement):
+    assert UserModel.schema_statements(version) == [
+        statement, "CREATE INDEX user_username_index IF NOT EXISTS FOR (n:`User`) ON (n.`username`)"]
+    graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus", version="{}.{}.0".format(*version))
+    assert neo4j_version(graph) == version
+
+
+def test_schema_statements_project_keys():
+    assert ReleaseModel.schema_statements((5, 0)) == [
+        "CREATE CONSTRAINT release_key_unique IF NOT EXISTS FOR (n:`Release`) REQUIRE n.`key` IS UNIQUE",
+        "CREATE INDEX release_tag_name_index IF NOT EXISTS FOR (n:`Release`) ON (n.`tag_name`)"]
+    assert FileModel.schema_statements((5, 0)) == [
+        "CREATE CONSTRAINT file_key_unique IF NOT EXISTS FOR (n:`File`) REQUIRE n.`key` IS UNIQUE",
+        "CREATE INDEX file_id_index IF NOT EXISTS FOR (n:`File`) ON (n.`id`)"]
+
+
+@pytest.mark.parametrize("value, json_values, properties", [
+    ({"id": 1, "name": "User"}, False, {"author.id": 1, "author.name": "User"}),
+    ({"id": 1, "name": "User"}, True, {"author": '{"id": 1, "name": "User"}'}),
+    (["bug", "ui"], False, {"author": ["bug", "ui"]}),
+    ([{"id": 1}], False, {}),
+    ([{"id": 1}], True, {"author": '[{"id": 1}]'}),
+    ([1, "a"], False, {}),
+    ("User", True, {"author": "User"}),
+])
+def test_property_values(value, json_values, properties):
+    assert property_values("author", value, json_values) == properties
+
+
+def test_export_neo4j_json_properties():
+    config = Config()
+    config.neo4j_config = {"NEO4J": dict(config.neo4j_config["NEO4J"], json_properties="true")}
+    exporter = Exporter(config, corpus, "neo4j")
+    exporter.graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    exporter.export_to_neo4j()
+    issue = exporter.graph.rows("MERGE (n:`Issue`")[0]["properties"]
+    assert json.loads(issue["assignees"]) == corpus.data["Projects"][0]["issues"][0]["assignees"]
+
+
+def test_identity_index():
+    identities = IdentityIndex()
+    identities.add({"id": 1, "name": "User, Test", "username": "user_t", "public_email": "Test.User@example.com"})
+    identities.add({"id": 2, "name": "User, Test", "username": "user_t2"})
+    assert identities.lookup("User, Test") == 1
+    assert identities.lookup("Test User") == 1
+    assert identities.lookup("user_t2") == 2
+    assert identities.lookup("Someone", "test.user@example.com") == 1
+    assert identities.lookup("Someone Else") is None
+    assert identities.lookup() is None
+    assert IdentityIndex.build(corpus.data["Projects"]).lookup("User, Test") == 123
+
+
+def test_export_neo4j_parallel():
+    projects = []
+    for id in range(1, 121):
+        project = copy.deepcopy(corpus.data["Projects"][0])
+        project["id"] = id
+        projects.append(project)
+    projects[0]["mergerequests"][0]["commits"] = [{"id": "later"}]
+    projects[-1]["commits"].append(dict(projects[-1]["commits"][0], id="later"))
+    parallel_corpus = Corpus()
+    parallel_corpus.data = {"Projects": projects}
+    config = Config()
+    config.neo4j_config = {"NEO4J": dict(config.neo4j_config["NEO4J"], workers=4)}
+    exporter = Exporter(config, parallel_corpus, "neo4j")
+    exporter.graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    exporter.export_to_neo4j()
+    graph = exporter.graph
+
+    assert sorted(row["key"] for row in graph.rows("MERGE (n:`Project`")) == list(range(1, 121))
+    assert len(graph.rows("MERGE (n:`User`")) == 1
+    assert len(graph.rows("MERGE (n:`Milestone`")) == 1
+    assert {row["key"] for row in graph.rows("MERGE (n:`Commit`")} == {"123abc", "later"}
+    assert len(graph.rows("MERGE (n:`Release`")) == 120
+    assert len([relationship for relationship in graph.relationships if relationship[0] == "BELONGS_TO_PROJECT"]) == 120
+    assert len([relationship for relationship in graph.relationships if relationship[0] == "COMMITTED_THROUGH"]) == 120
+    # the shared nodes exist, before the projects are written in parallel
+    shared = [index for index, (query, _) in enumerate(graph.queries)
+              if re.match(r"UNWIND \$rows AS row MERGE \(n:`(User|Language|Namespace|Milestone)`", query)]
+    assert max(shared) < min(index for index, (query, _) in enumerate(graph.queries) if "MERGE (a)" in query)
+    # the commit of the last chunk, which a merge request of the first chunk refers to, is related anyway
+    assert ("HAS_COMMIT", 1, "later") in graph.relationships
+
+
+@pytest.mark.parametrize("batch_size", [1, 1000])
+def test_export_neo4j_user_of_later_project(batch_size):
+    first, second = copy.deepcopy(corpus.data["Projects"][0]), copy.deepcopy(corpus.data["Projects"][0])
+    second["id"] = 2
+    second["users"] = [{"id": 456, "name": "Later, User", "username": "later", "public_email": "later@example.com"}]
+    first["commits"][0]["committer_name"], first["commits"][0]["committer_email"] = "Later, User", "later@example.com"
+    later_corpus = Corpus()
+    later_corpus.data = {"Projects": [first, second]}
+    config = Config()
+    config.neo4j_config = {"NEO4J": dict(config.neo4j_config["NEO4J"], batch_size=batch_size)}
+    exporter = Exporter(config, later_corpus, "neo4j")
+    exporter.graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    node_count, relationship_count = exporter.export_to_neo4j()
+
+    assert ("COMMITTED_BY", first["commits"][0]["id"], 456) in exporter.graph.relationships
+    assert relationship_count == len(exporter.graph.relationships)
+
+
+def test_export_neo4j_sync():
+    exporter = Exporter(Config(), corpus, "neo4j", sync=True)
+    exporter.graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    exporter.export_to_neo4j()
+    hashes = {}
+    for query, rows in exporter.graph.queries:
+        if "MERGE (n:" in query:
+            assert "SET n = row.properties" in query
+            hashes.setdefault(query.split("`")[1], []).extend(
+                (row["key"], row["properties"]["content_hash"]) for row in rows)
+
+    changed_corpus = Corpus()
+    changed_corpus.data = copy.deepcopy(corpus.data)
+    changed_corpus.data["Projects"][0]["issues"][0]["title"] = "Changed title"
+    exporter = Exporter(Config(), changed_corpus, "neo4j", sync=True, tombstone=True)
+    exporter.graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    exporter.graph.hashes = dict(hashes, Issue=hashes["Issue"] + [(999, "removed")])
+    exporter.export_to_neo4j()
+    graph = exporter.graph
+
+    assert [row["key"] for row in graph.rows("MERGE (n:`Issue`")] == [1234]
+    assert [row["key"] for row in graph.rows("MERGE (n:`Project`")] == [1]
+    assert graph.rows("MERGE (n:`Commit`") == [] and graph.rows("MERGE (n:`User`") == []
+    assert {"start": 1234, "end": 123, "properties": {}} in graph.rows("[r:`AUTHORED_BY`]")
+    assert graph.rows("[r:`COMMITTED_BY`]") == []
+    assert graph.rows("SET n.`deleted_at`") == [999]
+
+
+def test_export_neo4j_sync_relationships():
+    graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    exporter = Exporter(Config(), corpus, "neo4j", sync=True)
+    exporter.graph = graph
+    exporter.export_to_neo4j()
+    assert ("ASSIGNED_TO", 1234, 123) in graph.relationships
+    assert ("IS_CONTAINED_IN", "Python", 1) in graph.relationships
+    for query, rows in graph.queries:
+        if "MERGE (n:" in query:
+            graph.hashes.setdefault(query.split("`")[1], []).extend(
+                (row["key"], row["properties"]["content_hash"]) for row in rows)
+
+    changed_corpus = Corpus()
+    changed_corpus.data = copy.deepcopy(corpus.data)
+    project = changed_corpus.data["Projects"][0]
+    project["users"].append({"id": 456, "name": "Other, User", "username": "other"})
+    project["issues"][0]["assignees"] = [{"id": 456, "name": "Other, User"}]
+    project["languages"] = {"C": 100.0}
+    exporter = Exporter(Config(), changed_corpus, "neo4j", sync=True)
+    exporter.graph = graph
+    exporter.export_to_neo4j()
 
-    assert any(isinstance(x, NamespaceMock) for x in Graph.nodes)
-    assert any(isinstance(x, OwnerMock) for x in Graph.nodes)
-    assert any(isinstance(x, UserMock) for x in Graph.nodes)
-    assert any(isinstance(x, MergerequestMock) for x in Graph.nodes)
-    assert any(isinstance(x, CommitMock) for x in Graph.nodes)
-    assert any(isinstance(x, MilestoneMock) for x in Graph.nodes)
-    assert any(isinstance(x, IssueMock) for x in Graph.nodes)
-    assert any(isinstance(x, ReleaseMock) for x in Graph.nodes)
+    assert ("ASSIGNED_TO", 1234, 456) in graph.relationships
+    assert ("ASSIGNED_TO", 1234, 123) not in graph.relationships
+    assert ("AUTHORED_BY", 1234, 123) in graph.relationships
+    assert ("IS_CONTAINED_IN", "C", 1) in graph.relationships
+    assert ("IS_CONTAINED_IN", "Python", 1) not in graph.relationships
+    # the unchanged commit keeps its committer
+    assert ("COMMITTED_BY", "123abc", 123) in graph.relationships
+
+
+def test_neo4j_writer_retry():
+    graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    errors = [TransientError("Deadlock", "Neo.TransientError.Transaction.DeadlockDetected")]
+
+    def commit(tx):
+        if errors:
+            raise errors.pop()
+        graph.commits += 1
+
+    graph.commit = commit
+    with mock.patch("corpus.utils.neo4j_writer.RETRY_DELAY", 0):
+        with Neo4jWriter(graph) as writer:
+            writer.node("User", "id", {"id": 1})
+    assert graph.rollbacks == 1 and graph.commits == 1
+
+
+def test_neo4j_writer_batches():
+    graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    with Neo4jWriter(graph, batch_size=3) as writer:
+        for id in range(7):
+            writer.node("User", "id", {"id": id, "name": "User {}".format(id)})
+    assert [len(rows) for _, rows in graph.queries] == [3, 3, 1]
+    assert writer.node_count == 7
+
+
+def test_graph_partition():
+    graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    with Neo4jWriter(graph, batch_size=1) as writer:
+        shared, partition = GraphPartition(writer, shared=True), GraphPartition(writer, shared=False)
+        for sink in [shared, partition]:
+            sink.node("User", "id", {"id": 1, "name": "User"})
+            sink.node("User", "id", {"id": 1})
+            sink.node("User", "id", {"id": 1, "email": "user@example.com"})
+            sink.node("Project", "id", {"id": 2})
+            sink.relationship("OWNS", ("User", "id", 1), ("Project", "id", 2))
+            sink.relationship("BELONGS_TO", ("Commit", "id", "abc"), ("Project", "id", 2))
+            sink.node("Commit", "id", {"id": "abc"})
+        partition.write_deferred(writer)
+    assert [row["properties"] for row in graph.rows("MERGE (n:`User`")] == [{"id": 1, "name": "User"},
+                                                                             {"id": 1, "email": "user@example.com"}]
+    assert [row["key"] for row in graph.rows("MERGE (n:`Project`")] == [2]
+    # the relationship to the commit is deferred until the commit is written
+    assert graph.relationships == [("OWNS", 1, 2), ("BELONGS_TO", "abc", 2)]
+
+
+def test_neo4j_writer_relationship_count():
+    graph = Graph("bolt://localhost:7687", user="neo4j", password="corpus")
+    with Neo4jWriter(graph) as writer:
+        writer.node("User", "id", {"id": 1})
+        writer.node("Project", "id", {"id": 2})
+        writer.relationship("OWNS", ("User", "id", 1), ("Project", "id", 2))
+        writer.relationship("OWNS", ("User", "id", 3), ("Project", "id", 2))
+    assert len(graph.rows("[r:`OWNS`]")) == 2
+    # the relationship of the missing user is not written
+    assert graph.relationships == [("OWNS", 1, 2)]
+    assert writer.node_count == 2 and writer.relationship_count == 1
+
+
+def test_export_neo4j_csv(tmp_path):
+    directory = tmp_path / "neo4j"
+    Exporter(Config(), corpus, "neo4j-csv").export(str(directory))
+
+    def read(name):
+        with open(str(directory / "{}.csv".format(name)), newline="") as f:
+            return list(csv.reader(f))
+
+    assert read("User_header")[0][:3] == [":ID(User)", ":LABEL", "id:long"]
+    assert [row[:3] for row in read("User")] == [["123", "User", "123"]]
+    issue_header = read("Issue_header")[0]
+    assert "author.id:long" in issue_header
+    assert all(len(row) == len(issue_header) for row in read("Issue"))
+    assert "tag_list:string[]" in read("Project_header")[0]
+    assert read("COMMITTED_BY_Commit_User_header") == [[":START_ID(Commit)", ":END_ID(User)", ":TYPE"]]
+    assert read("COMMITTED_BY_Commit_User") == [["123abc", "123", "COMMITTED_BY"]]
+    assert read("IS_CONTAINED_IN_Language_Project_header")[0][-1] == "value:double"
+    with open(str(directory / "neo4j-admin.args")) as f:
+        arguments = f.read().split()
+    assert "--nodes={},{}".format(directory / "Project_header.csv", directory / "Project.csv") in arguments
+    assert arguments[-1].startswith("--relationships=")
+    assert arguments[:2] == ["--multiline-fields=true", "--array-delimiter=U+001F"]
+
+
+def test_export_neo4j_csv_values(tmp_path):
+    directory = str(tmp_path / "neo4j")
+    with Neo4jCsvWriter(directory) as writer:
+        writer.node("Commit", "id", {"id": "abc", "message": "Title\n\nBody", "labels": ["a;b", "c\x1fd"]})
+    with open(os.path.join(directory, "Commit_header.csv"), newline="", encoding="utf-8") as f:
+        header = [name.split(":")[0] for name in next(csv.reader(f))]
+    with open(os.path.join(directory, "Commit.csv"), newline="", encoding="utf-8") as f:
+        row = dict(zip(header, next(csv.reader(f))))
+    assert row["message"] == "Title\n\nBody"
+    assert row["labels"].split("\x1f") == ["a;b", "cd"]
+
+
+def test_export_neo4j_csv_missing_nodes(tmp_path):
+    directory = str(tmp_path / "neo4j")
+    with Neo4jCsvWriter(directory) as writer:
+        writer.node("Mergerequest", "id", {"id": 10})
+        writer.relationship("IS_MERGED_BY", ("Mergerequest", "id", 10), ("User", "id", 99))
+        writer.relationship("AUTHORED_BY", ("Mergerequest", "id", 10), ("User", "id", 1))
+        writer.node("User", "id", {"id": 1})
+    with open(os.path.join(directory, "AUTHORED_BY_Mergerequest_User.csv"), newline="") as f:
+        assert list(csv.reader(f)) == [["10", "1", "AUTHORED_BY"]]
+    # the relationship to the missing user is left out
+    with open(os.path.join(directory, "neo4j-admin.args")) as f:
+        assert "IS_MERGED_BY" not in f.read()
+    assert writer.relationship_count == 1 and writer.dropped == 1
+
+
+def test_export_neo4j_csv_project_keys(tmp_path):
+    projects = []
+    for id in (1, 2):
+        project = copy.deepcopy(corpus.data["Projects"][0])
+        project["id"] = id
+        projects.append(project)
+    two_projects = Corpus()
+    two_projects.data = {"Projects": projects}
+    directory = tmp_path / "neo4j"
+    Exporter(Config(), two_projects, "neo4j-csv").export(str(directory))
+
+    def read(name):
+        with open(str(directory / "{}.csv".format(name)), newline="") as f:
+            return list(csv.reader(f))
+
+    # the same tag and the same file in two projects are different nodes
+    assert [row[0] for row in read("Release")] == ["1:v0.1", "2:v0.1"]
+    assert [row[0] for row in read("File")] == ["1:test.py", "2:test.py"]
+    assert [row[:2] for row in read("BELONGS_TO_File_Project")] == [["1:test.py", "1"], ["2:test.py", "2"]]
 
 
 def test_export_console(capfd):
@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+from unittest import mock
+from corpus.filter import Filter
+from corpus.utils.filter_cache import FilterCache, corpus_fingerprint, predicate_fingerprint
+from corpus.utils.helpers import Corpus
+
+projects = {"Projects": [{"id": index, "star_count": index % 7, "languages": {"C": 100.0} if index % 2 else {}}
+                         for index in range(20)]}
+
+
+def run_filter(corpus_file, mocked_filters):
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, Corpus(), True, corpus_file, cache=True)
+    filter.filtered_corpus = Corpus()
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    filter.filter()
+    return filter
+
+
+def test_fingerprints(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(projects, f)
+    assert corpus_fingerprint(corpus_file) == corpus_fingerprint(corpus_file)
+    assert corpus_fingerprint(corpus_file, True) != corpus_fingerprint(corpus_file)
+    assert predicate_fingerprint("id == 1") != predicate_fingerprint("id == 2")
+
+
+def test_cache_store_and_load(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(projects, f)
+    cache = FilterCache(corpus_file)
+    assert cache.load("id == 1", 20) is None
+    cache.store("id == 1", 0b10, 20)
+    assert cache.load("id == 1", 20) == 0b10
+    assert cache.load("id == 1", 21) is None
+
+
+def test_filter_with_cache(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(projects, f)
+
+    filter = run_filter(corpus_file, """
+        filters:
+            any_languages:
+                C:
+                    operator: ">"
+                    value: 0.0
+        expressions:
+            - star_count >= 3 or id == 0
+        attributes:
+            - id
+    """)
+    expected = [{"id": project["id"]} for project in projects["Projects"]
+                if project["languages"] and project["star_count"] >= 3]
+    assert filter.filtered_corpus.data["Projects"] == expected
+    assert filter.cache.hits == 0
+    assert len(os.listdir(filter.cache.directory)) == 3
+
+    filter = run_filter(corpus_file, """
+        filters:
+            any_languages:
+                C:
+                    operator: ">"
+                    value: 0.0
+        expressions:
+            - star_count >= 5 or id == 0
+        attributes:
+            - id
+    """)
+    expected = [{"id": project["id"]} for project in projects["Projects"]
+                if project["languages"] and project["star_count"] >= 5]
+    assert filter.filtered_corpus.data["Projects"] == expected
+    assert (filter.cache.hits, filter.cache.misses) == (2, 1)
+
+
+def test_cache_invalidated_on_change(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(projects, f)
+    cache = FilterCache(corpus_file)
+    cache.store("id == 1", 0b10, 20)
+    with open(corpus_file, "w") as f:
+        json.dump({"Projects": projects["Projects"][:5]}, f)
+    cache = FilterCache(corpus_file)
+    assert cache.load("id == 1", 5) is None
+    assert os.listdir(str(tmp_path / "corpus.json.filtercache")) == []
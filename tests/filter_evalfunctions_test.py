@@ -154,4 +154,11 @@ def test_eval_condition_str_contains(attribute, operator, condition, result):
     ('String123', 'regex', '(.*\d)', True), ('example project 123', 'regex', '(.*example\s.*)', True)
 ])
 def test_eval_condition_regex(attribute, operator, condition, result):
-    assert eval_condition(attribute, operator, condition) == result
\ No newline at end of file
+    assert eval_condition(attribute, operator, condition) == result
+
+
+@pytest.mark.parametrize("attribute, operator, condition, result", [
+    ('2021-05-10T15:00:00.000Z', '>=', '2021-01-01', True), ('2021-05-10T15:00:00.000Z', '<', '2021-01-01', False)
+])
+def test_eval_condition_str_ordering(attribute, operator, condition, result):
+    assert eval_condition(attribute, operator, condition) == result
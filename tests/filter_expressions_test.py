@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import pytest
+from corpus.utils.filter_expressions import (And, Or, Not, Comparison, Aggregate, InvalidExpressionException,
+                                             tokenize, parse_expression, parse_attribute, plan,
+                                             shared_subexpressions)
+
+
+def test_tokenize():
+    assert tokenize('star_count >= 10 and name regex "^ml\\s"') == [
+        ("name", "star_count"), ("operator", ">="), ("number", 10), ("keyword", "and"), ("name", "name"),
+        ("keyword", "regex"), ("string", "^ml\\s")]
+
+
+def test_parse_comparison():
+    node = parse_expression("forks_count > 2.5")
+    assert isinstance(node, Comparison)
+    assert (node.path, node.operator, node.value) == ("forks_count", ">", 2.5)
+
+
+def test_parse_flipped_comparison():
+    node = parse_expression("10 <= star_count")
+    assert (node.path, node.operator, node.value) == ("star_count", ">=", 10)
+
+
+def test_parse_range():
+    node = parse_expression("10 <= star_count < 1000")
+    assert isinstance(node, And)
+    assert [child.key for child in node.children] == ["star_count >= 10", "star_count < 1000"]
+
+
+def test_parse_precedence():
+    node = parse_expression("archived == false or not visibility == 'private' and name contains 'ml'")
+    assert isinstance(node, Or)
+    assert isinstance(node.children[1], And)
+    assert isinstance(node.children[1].children[0], Not)
+
+
+def test_parse_parentheses():
+    node = parse_expression("(id == 1 or id == 2) and archived == false")
+    assert isinstance(node, And)
+    assert isinstance(node.children[0], Or)
+
+
+def test_parse_nested_path():
+    node = parse_expression("issue_statistics.counts.opened > 0")
+    assert node.path == "issue_statistics.counts.opened"
+
+
+def test_parse_aggregate():
+    node = parse_expression('count(commits.committed_date >= "2024-01-01") > 10')
+    assert isinstance(node.path, Aggregate)
+    assert (node.path.function, node.path.path, node.path.operator, node.path.value) == \
+           ("count", "commits.committed_date", ">=", "2024-01-01")
+    assert node.key == 'count(commits.committed_date >= "2024-01-01") > 10'
+
+
+@pytest.mark.parametrize("text, result", [
+    ("star_count", "star_count"), ("namespace.kind", "namespace.kind"), ("distinct(commits.author_email)",
+                                                                          "distinct(commits.author_email)")
+])
+def test_parse_attribute(text, result):
+    assert str(parse_attribute(text)) == result
+
+
+@pytest.mark.parametrize("expression", [
+    "id ==", "id == 1 and", "(id == 1", "id == 1)", "1 == 2", "name", "id === 1", "'ml' contains name",
+    "count(commits", "count(1) > 1", "max(commits.id > id) > 1"
+])
+def test_parse_invalid(expression):
+    with pytest.raises(InvalidExpressionException):
+        parse_expression(expression)
+
+
+def test_plan_flatten_and_dedupe():
+    node = plan(parse_expression("id == 1 and (id == 1 and (name regex 'x' and archived == false))"))
+    assert isinstance(node, And)
+    assert [child.key for child in node.children] == ['id == 1', 'archived == false', 'name regex "x"']
+
+
+def test_plan_double_negation():
+    node = plan(parse_expression("not not id == 1"))
+    assert isinstance(node, Comparison)
+
+
+def test_plan_orders_by_cost():
+    node = plan(parse_expression("name regex 'x' or description contains 'y' or id == 1"))
+    assert [child.operator for child in node.children] == ["==", "contains", "regex"]
+
+
+def test_shared_subexpressions():
+    node = plan(parse_expression("(id == 1 and name regex 'x') or (id == 2 and name regex 'x')"))
+    assert shared_subexpressions(node) == {'name regex "x"'}
+
+
+def test_plan_aggregates_last():
+    node = plan(parse_expression("count(commits) > 10 and name regex 'x' and id == 1"))
+    assert [child.key for child in node.children] == ['id == 1', 'name regex "x"', 'count(commits) > 10']
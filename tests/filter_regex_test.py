@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import re
+import pytest
+from corpus.filter import Filter, combine_regexes, compile_comparison
+from corpus.utils.filter_expressions import Comparison, Or, InvalidExpressionException, parse_expression, plan
+from corpus.utils.filter_regex import analyze_regex, combine_patterns, compile_matcher, compile_regex
+from corpus.utils.helpers import Corpus
+
+texts = ["", "machine learning", "A machine learning toolkit", "deep learning for images", "fix: learning rate",
+         "Machine Learning", "abd", "abc", "xxyxyz", "ml-pipeline 2", "ΔT solver"]
+
+patterns = [".*machine learning.*", "^ml[-_]", "abc|abd", "(?:x+y)+z", "(?i).*machine.*", ".*(deep|machine) learn",
+            "fix(?=:)", "(?!deep).*learning", "(a)(b)?", "\\w+ \\d", ".*ΔT", "a{0}b", "(?P<word>ab)(?P=word)?"]
+
+
+@pytest.mark.parametrize("pattern", patterns)
+def test_matcher(pattern):
+    matcher = compile_matcher(pattern)
+    for text in texts:
+        assert matcher(text) == (re.match(pattern, text) is not None)
+
+
+@pytest.mark.parametrize("pattern, required, combinable", [
+    (".*machine learning.*", ["machine learning"], True),
+    ("abc|abd", ["ab"], True),
+    (".*(deep|machine) learn", [[["deep"], ["machine"]], " learn"], True),
+    ("(?:x+y)+z", ["x", "y", "z"], True),
+    ("(?i)machine", [], False),
+    ("(a)\\1", ["a"], False),
+    ("(?P<word>ab)", ["ab"], False),
+    ("x?y*", [], True),
+])
+def test_analyze_regex(pattern, required, combinable):
+    assert analyze_regex(pattern) == (required, combinable)
+
+
+def test_compile_regex_cache():
+    assert compile_regex("^ml[-_]") is compile_regex("^ml[-_]")
+
+
+def test_combine_regexes():
+    nodes = [Comparison("name", "regex", "^ml"), Comparison("id", "==", 1),
+             Comparison("name", "regex", ".*learning"), Comparison("name", "regex", "(?i)deep"),
+             Comparison("description", "regex", "x")]
+    combined = combine_regexes(nodes)
+    assert [node.key for node in combined] == ['name regex "(?:^ml)|(?:.*learning)"', 'id == 1',
+                                               'name regex "(?i)deep"', 'description regex "x"']
+    assert combined[3] is nodes[4]
+    assert combine_patterns(["a", "b|c"]) == "(?:a)|(?:b|c)"
+
+    predicate = compile_comparison(combined[0])
+    assert [predicate({"name": text}, {}) for text in texts] == [
+        any(re.match(pattern, text) for pattern in ["^ml", ".*learning"]) for text in texts]
+
+
+def test_invalid_regex():
+    with pytest.raises(InvalidExpressionException):
+        compile_comparison(Comparison("name", "regex", "(unclosed"))
+
+
+def test_regex_or_expression():
+    filter = Filter(False, Corpus())
+    node = plan(parse_expression("name regex '^ml' or name regex '.*learning' or id == 3"))
+    assert isinstance(node, Or)
+    predicate = filter.compile_predicate(node)
+    assert predicate({"id": 1, "name": "deep learning"}, {})
+    assert predicate({"id": 3, "name": "other"}, {})
+    assert not predicate({"id": 1, "name": "other"}, {})
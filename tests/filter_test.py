@@ -1,7 +1,9 @@
 # SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
 # SPDX-License-Identifier: MIT
+import json
+import pytest
 from unittest import mock
-from corpus.filter import Filter
+from corpus.filter import Filter, run_filters
 from corpus.utils.helpers import Corpus
 
 corpus = Corpus()
@@ -372,6 +374,51 @@ def test_check_languages_exact_false():
     assert filter.check_languages("exact_languages", test_project) is False
 
 
+def test_language_masks():
+    mocked_filters = """
+        filters:
+            atleast_languages:
+                C:
+                    operator: "<="
+                    value: 100.0
+            atmost_languages:
+                C:
+                    operator: "<="
+                    value: 100.0
+                Python:
+                    operator: "<="
+                    value: 100.0
+
+        attributes:
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, language_test_corpus, False, "")
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    assert filter.language_bits == {"C": 2, "Python": 4}
+    assert filter.language_masks["atleast_languages"] == 2
+    assert filter.language_masks["atmost_languages"] == 6
+    assert filter.language_mask(test_project) == 7
+
+
+def test_check_languages_any_second_language():
+    mocked_filters = """
+        filters:
+            any_languages:
+                TeX:
+                    operator: ">="
+                    value: 10.0
+
+        attributes:
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, language_test_corpus, False, "")
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    assert filter.check_languages("any_languages", test_project) is True
+    assert filter.check_languages("any_languages", {"id": 1, "languages": {}}) is False
+
+
 def test_filter_project_true_1():
     mocked_filters = """
             filters:
@@ -494,6 +541,244 @@ def test_filter_no_filters():
     assert filter.filtered_corpus.data == corpus.data
 
 
+def test_filter_with_expressions():
+    mocked_filters = """
+            filters:
+                any_languages:
+                    C:
+                        operator: ">="
+                        value: 50.0
+            expressions:
+                - 2 <= id < 4 or id == 1
+                - not id == 3
+            attributes:
+                - id
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, language_test_corpus, False, "")
+    filter.filtered_corpus = Corpus()
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    filter.filter()
+    assert filter.filtered_corpus.data == {"Projects": [{"id": 1}, {"id": 2}]}
+
+
+def test_load_filters_invalid_expression():
+    mocked_filters = """
+            filters:
+            expressions: id ==
+            attributes:
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, corpus, False, "")
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        with pytest.raises(SystemExit):
+            filter.load_filters(filter_file="mocked_filters.yaml")
+
+
+aggregate_test_corpus = Corpus()
+aggregate_test_corpus.data = {"Projects": [
+    {
+        "id": 1,
+        "namespace": {"kind": "group"},
+        "commits": [
+            {"author_email": "a@example.com", "committed_date": "2021-01-01T12:00:00.000Z"},
+            {"author_email": "a@example.com", "committed_date": "2024-06-01T12:00:00.000Z"},
+            {"author_email": "b@example.com", "committed_date": "2024-07-01T12:00:00.000Z"}
+        ]
+    },
+    {
+        "id": 2,
+        "namespace": {"kind": "user"},
+        "commits": [
+            {"author_email": "c@example.com", "committed_date": "2024-06-01T12:00:00.000Z"}
+        ]
+    },
+    {
+        "id": 3,
+        "namespace": None
+    }
+]}
+
+
+@pytest.mark.parametrize("expression, ids", [
+    ('namespace.kind == "group"', [1]),
+    ('count(commits) >= 1', [1, 2]),
+    ('count(commits) == 0', [3]),
+    ('distinct(commits.author_email) == 2', [1]),
+    ('max(commits.committed_date) >= "2024-06-15"', [1]),
+    ('count(commits.committed_date >= "2024-01-01") == 1', [2]),
+])
+def test_filter_nested_attributes(expression, ids):
+    mocked_filters = """
+            filters:
+            expressions:
+                - '{}'
+            attributes:
+                - id
+        """.format(expression)
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, aggregate_test_corpus, False, "")
+    filter.filtered_corpus = Corpus()
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    filter.filter()
+    assert [project["id"] for project in filter.filtered_corpus.data["Projects"]] == ids
+
+
+def test_filter_nested_attributes_in_filters():
+    mocked_filters = """
+            filters:
+                namespace.kind:
+                    operator: "=="
+                    value: "user"
+                count(commits):
+                    operator: ">"
+                    value: 0
+            attributes:
+                - id
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, aggregate_test_corpus, False, "")
+    filter.filtered_corpus = Corpus()
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    filter.filter()
+    assert filter.filtered_corpus.data == {"Projects": [{"id": 2}]}
+
+
+def test_required_attributes():
+    mocked_filters = """
+            filters:
+                any_languages:
+                    C:
+                        operator: ">="
+                        value: 50.0
+                namespace.kind:
+                    operator: "=="
+                    value: "group"
+            expressions:
+                - count(commits.committed_date >= "2024-01-01") > 1 or star_count > 10
+            attributes:
+                - id
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, corpus, False, "")
+    assert filter.required_attributes() is None
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    assert filter.required_attributes() == {"id", "languages", "namespace", "commits", "star_count"}
+
+
+def test_load_corpus_with_attributes(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(aggregate_test_corpus.data, f)
+    mocked_filters = """
+            filters:
+                count(commits):
+                    operator: ">"
+                    value: 0
+            attributes:
+                - id
+        """
+    mocked_filter_file = mock.mock_open(read_data=mocked_filters)
+    filter = Filter(False, Corpus(), False, "")
+    filter.filtered_corpus = Corpus()
+    with mock.patch("builtins.open", mocked_filter_file, create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    filter.load_corpus(corpus_file)
+    assert all(set(project) <= {"id", "commits"} for project in filter.input_corpus.data["Projects"])
+    filter.filter()
+    assert filter.filtered_corpus.data == {"Projects": [{"id": 1}, {"id": 2}]}
+
+
+def test_run_filters(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(language_test_corpus.data, f)
+    filter_files = ["""
+            filters:
+                any_languages:
+                    C:
+                        operator: ">="
+                        value: 50.0
+            attributes:
+                - id
+        """, """
+            filters:
+                any_languages:
+                    C:
+                        operator: ">="
+                        value: 50.0
+            expressions:
+                - id > 1
+            attributes:
+        """, """
+            filters:
+            attributes:
+                - languages
+        """]
+    corpus_filters = []
+    for mocked_filters in filter_files:
+        corpus_filters.append(Filter(False, Corpus(), False, ""))
+        with mock.patch("builtins.open", mock.mock_open(read_data=mocked_filters), create=True):
+            corpus_filters[-1].load_filters(filter_file="mocked_filters.yaml")
+    outs = [str(tmp_path / "out_{}.json".format(index)) for index in range(3)]
+
+    with mock.patch.object(Filter, "check_languages", autospec=True, side_effect=Filter.check_languages) as check:
+        assert run_filters(corpus_filters, corpus_file, outs) == [2, 1, 4]
+    assert check.call_count == 4  # the shared language filter is evaluated once per project
+
+    with open(outs[0]) as f:
+        assert json.load(f) == {"Projects": [{"id": 1}, {"id": 2}]}
+    with open(outs[1]) as f:
+        assert json.load(f) == {"Projects": [language_test_corpus.data["Projects"][1]]}
+    with open(outs[2]) as f:
+        assert json.load(f) == {"Projects": [{"languages": project["languages"]}
+                                             for project in language_test_corpus.data["Projects"]]}
+
+
+def test_filtered_corpus_per_filter():
+    mocked_filters = """
+        filters:
+        attributes:
+            - id
+    """
+    filters = [Filter(False, language_test_corpus, False, "") for _ in range(2)]
+    for filter in filters:
+        with mock.patch("builtins.open", mock.mock_open(read_data=mocked_filters), create=True):
+            filter.load_filters(filter_file="mocked_filters.yaml")
+        filter.filter()
+    filters[0].filter()  # a second run does not accumulate results
+    assert filters[0].filtered_corpus is not filters[1].filtered_corpus
+    assert filters[0].filtered_corpus.data == filters[1].filtered_corpus.data
+    assert len(filters[0].filtered_corpus.data["Projects"]) == len(language_test_corpus.data["Projects"])
+
+
+def test_filter_iterators(tmp_path):
+    corpus_file = str(tmp_path / "corpus.json")
+    with open(corpus_file, "w") as f:
+        json.dump(language_test_corpus.data, f)
+    mocked_filters = """
+        filters:
+        expressions:
+            - id > 1
+        attributes:
+            - id
+    """
+    filter = Filter(False, language_test_corpus, False, "")
+    with mock.patch("builtins.open", mock.mock_open(read_data=mocked_filters), create=True):
+        filter.load_filters(filter_file="mocked_filters.yaml")
+    expected = [{"id": project["id"]} for project in language_test_corpus.data["Projects"] if project["id"] > 1]
+    assert list(filter.iter_file(corpus_file)) == expected
+
+    sink = mock.Mock()
+    filter.filter(sink=sink)
+    assert [call.args[0] for call in sink.write.call_args_list] == expected
+    assert filter.filtered_corpus.data == {"Projects": []}
+
+
 if __name__ == '__main__':
     test_filter_with_filters()
     test_filter_with_attributes()
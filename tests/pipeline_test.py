@@ -0,0 +1,134 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import csv
+import sqlite3
+
+import pytest
+
+from corpus.export import Exporter
+from corpus.extract import Extractor
+from corpus.filter import Filter
+from corpus.synth import Synthesizer
+from corpus.utils.corpus_io import load_corpus
+from corpus.utils.export_benchmark import RecordingGraph
+from corpus.utils.fake_gitlab import FakeGitlab
+from corpus.utils.helpers import Config, Corpus
+from corpus.utils.pipeline import build_corpus, stream
+
+
+def test_stream():
+    results = []
+    count = stream(range(100), [lambda items: (item * 2 for item in items),
+                                lambda items: (item for item in items if item % 3 == 0)], results.append, 2)
+    assert results == [item * 2 for item in range(100) if item * 2 % 3 == 0]
+    assert count == len(results)
+
+
+def test_stream_bounded():
+    produced = []
+
+    def source():
+        for item in range(1000):
+            produced.append(item)
+            yield item
+
+    def sink(item):
+        # the source is ahead of the sink by at most the items in the queues and in the stages
+        assert len(produced) - item <= 2 * 4 + 3
+
+    stream(source(), [lambda items: (item for item in items)], sink, 4)
+
+
+@pytest.mark.parametrize("failing", ["source", "stage", "sink"])
+def test_stream_error(failing):
+    def items():
+        for item in range(1000):
+            if failing == "source" and item == 10:
+                raise ValueError("source")
+            yield item
+
+    def stage(values):
+        for value in values:
+            if failing == "stage" and value == 10:
+                raise ValueError("stage")
+            yield value
+
+    def sink(value):
+        if failing == "sink" and value == 10:
+            raise ValueError("sink")
+
+    with pytest.raises(ValueError, match=failing):
+        stream(items(), [stage], sink, 2)
+
+
+def build(tmp_path, output_format, out):
+    projects = list(Synthesizer(30, seed=5).generate())
+    filter_file = tmp_path / "filters.yaml"
+    filter_file.write_text("filters:\n    star_count:\n        operator: '>='\n        value: 1\nattributes:\n")
+    corpus_filter = Filter(False, corpus=Corpus())
+    corpus_filter.load_filters(str(filter_file))
+    exporter = Exporter(Config(), Corpus(), output_format)
+    count = build_corpus(Extractor(False, FakeGitlab(projects), Corpus()), corpus_filter, exporter, out,
+                         all_elements=True)
+    return [project for project in projects if project["star_count"] >= 1], count
+
+
+def test_build_corpus_json(tmp_path):
+    out = str(tmp_path / "corpus.jsonl")
+    expected, count = build(tmp_path, "json", out)
+    projects = load_corpus(out)["Projects"]
+    assert count == len(expected) == len(projects)
+    assert [project["id"] for project in projects] == [project["id"] for project in expected]
+
+
+def test_build_corpus_collected(tmp_path):
+    out = str(tmp_path / "corpus.db")
+    expected, count = build(tmp_path, "sqlite", out)
+    connection = sqlite3.connect(out)
+    assert connection.execute("SELECT count(*) FROM projects").fetchone()[0] == count == len(expected)
+    connection.close()
+
+
+def test_build_corpus_neo4j_csv(tmp_path):
+    out = str(tmp_path / "neo4j")
+    expected, count = build(tmp_path, "neo4j-csv", out)
+    with open(str(tmp_path / "neo4j" / "Project.csv"), newline="") as f:
+        assert len(list(csv.reader(f))) == count == len(expected)
+
+
+class FailingExtractor(Extractor):
+    """Extractor, whose GitLab instance fails after some projects."""
+
+    def iter_projects(self, all_elements, include_private=False):
+        for index, project in enumerate(super().iter_projects(all_elements, include_private)):
+            if index == 5:
+                raise RuntimeError("GitLab failed")
+            yield project
+
+
+@pytest.mark.parametrize("output_format, out", [("json", "corpus.json"), ("sqlite", "corpus.db"),
+                                                ("neo4j-csv", "neo4j/neo4j-admin.args")])
+def test_build_corpus_failed(tmp_path, output_format, out):
+    corpus_filter = Filter(False, corpus=Corpus())
+    extractor = FailingExtractor(False, FakeGitlab(list(Synthesizer(10, seed=5).generate())), Corpus())
+    exporter = Exporter(Config(), Corpus(), output_format)
+    with pytest.raises(RuntimeError, match="GitLab failed"):
+        build_corpus(extractor, corpus_filter, exporter, str(tmp_path / out.split("/")[0]), all_elements=True)
+    # no output, which looks complete, is written
+    assert not (tmp_path / out).exists()
+
+
+def test_build_corpus_failed_sync(tmp_path):
+    config = Config()
+    config.neo4j_config = {"NEO4J": {}}
+    corpus_filter = Filter(False, corpus=Corpus())
+    extractor = FailingExtractor(False, FakeGitlab(list(Synthesizer(10, seed=5).generate())), Corpus())
+    exporter = Exporter(config, Corpus(), "neo4j", sync=True, tombstone=True)
+    exporter.graph = RecordingGraph()
+    tombstoned = []
+    exporter.tombstone_removed = tombstoned.append
+    with pytest.raises(RuntimeError, match="GitLab failed"):
+        build_corpus(extractor, corpus_filter, exporter, all_elements=True)
+    assert tombstoned == []
+
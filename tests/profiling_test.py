@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import pstats
+import time
+import tracemalloc
+
+import pytest
+
+from corpus.export import Exporter
+from corpus.extract import Extractor
+from corpus.filter import Filter
+from corpus.synth import Synthesizer
+from corpus.utils import profiling
+from corpus.utils.fake_gitlab import FakeGitlab
+from corpus.utils.helpers import Config, Corpus
+from corpus.utils.pipeline import build_corpus, stream
+
+
+@pytest.fixture
+def profiler():
+    profiler = profiling.start()
+    yield profiler
+    profiling.stop()
+
+
+def test_not_profiled():
+    @profiling.profiled("test.function")
+    def function(value):
+        return value + 1
+
+    assert profiling.PROFILER is None
+    assert function(1) == 2
+    assert profiling.timed_stage("test.stage", list) is list
+    assert profiling.timed_predicate("test.predicate", function) is function
+
+
+def test_profiled(profiler):
+    @profiling.profiled("test.function")
+    def function(value):
+        return value + 1
+
+    with profiling.stage("first"):
+        for value in range(3):
+            function(value)
+        with profiling.step("test.step"):
+            time.sleep(0.01)
+    report = profiler.report("test")
+    assert [stage["name"] for stage in report["stages"]] == ["first"]
+    assert report["stages"][0]["seconds"] >= 0.01
+    steps = {step["name"]: step for step in report["steps"]}
+    assert steps["test.function"]["calls"] == 3
+    assert steps["test.step"]["seconds"] >= 0.01
+    assert report["steps"][0]["name"] == "test.step"
+    assert len(profiling.format_report(report)) == 7
+
+
+def test_stage_memory(profiler):
+    with profiling.stage("allocate"):
+        data = bytearray(64 * 2 ** 20)
+        data[::4096] = b"x" * len(data[::4096])  # touch every page
+        time.sleep(0.05)
+    del data
+    with profiling.stage("free"):
+        pass
+    report = profiler.report()
+    allocate, free = report["stages"]
+    if allocate["peak_rss_bytes"] is None:
+        pytest.skip("The resident set size cannot be determined.")
+    assert allocate["rss_delta_bytes"] >= 60 * 2 ** 20
+    # the peak of a stage is its own, while the peak of the process includes the stages before
+    assert free["peak_rss_bytes"] < allocate["peak_rss_bytes"] - 60 * 2 ** 20
+    assert free["process_peak_rss_bytes"] >= allocate["peak_rss_bytes"] - 2 ** 20
+
+
+def test_timed_stage(profiler):
+    def source():
+        for item in range(5):
+            time.sleep(0.02)
+            yield item
+
+    results = []
+    stream(profiling.timed_source("pipeline.source", source()),
+           [profiling.timed_stage("pipeline.stage", lambda items: (item for item in items))], results.append)
+    steps = {step["name"]: step for step in profiler.report()["steps"]}
+    assert results == list(range(5))
+    assert steps["pipeline.source"]["calls"] == steps["pipeline.stage"]["calls"] == 5
+    assert steps["pipeline.source"]["seconds"] >= 0.1
+    # the stage waits for the source, which is not counted
+    assert steps["pipeline.stage"]["seconds"] < 0.05
+
+
+def test_build_corpus(profiler, tmp_path):
+    filter_file = tmp_path / "filters.yaml"
+    filter_file.write_text("filters:\n    star_count:\n        operator: '>='\n        value: 1\nattributes:\n")
+    corpus_filter = Filter(False, corpus=Corpus())
+    corpus_filter.load_filters(str(filter_file))
+    extractor = Extractor(False, FakeGitlab(list(Synthesizer(10, seed=3).generate())), Corpus())
+    exporter = Exporter(Config(), Corpus(), "neo4j-csv")
+    with profiling.stage("build"):
+        build_corpus(extractor, corpus_filter, exporter, str(tmp_path / "neo4j"), all_elements=True)
+    steps = {step["name"]: step for step in profiler.report("build")["steps"]}
+    for name in ["pipeline.extract", "pipeline.filter", "pipeline.export", "extract.project", "extract.get_commits",
+                 "filter.star_count >= 1"]:
+        assert name in steps
+    assert steps["extract.project"]["calls"] == steps["filter.star_count >= 1"]["calls"] == 10
+    assert steps["export.commits"]["calls"] == steps["pipeline.export"]["calls"]
+
+
+def test_dump(tmp_path):
+    profiler = profiling.start(str(tmp_path / "dump"))
+    try:
+        assert tracemalloc.is_tracing()
+        with profiling.stage("allocate"):
+            data = [bytearray(1024) for _ in range(1000)]
+    finally:
+        profiling.stop()
+    assert not tracemalloc.is_tracing()
+    report = profiler.report()
+    assert report["stages"][0]["allocated_peak_bytes"] >= 1024 * len(data)
+    paths = profiler.dump()
+    assert [os.path.basename(path) for path in paths] == ["corpus.prof", "allocate.tracemalloc"]
+    assert pstats.Stats(paths[0]).total_calls > 0
+    assert tracemalloc.Snapshot.load(paths[1]).statistics("filename")
+    profiling.save_report(report, str(tmp_path / "report" / "profile.json"))
+    with open(str(tmp_path / "report" / "profile.json")) as f:
+        assert json.load(f)["stages"][0]["name"] == "allocate"
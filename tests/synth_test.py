@@ -0,0 +1,97 @@
+# SPDX-FileCopyrightText: 2021 German Aerospace Center (DLR)
+# SPDX-License-Identifier: MIT
+
+import random
+
+import pytest
+
+from corpus.synth import Synthesizer, sample
+from corpus.utils.corpus_io import iter_projects
+from corpus.utils.export_helpers import IdentityIndex
+
+
+def test_reproducible():
+    assert list(Synthesizer(5, seed=1).generate()) == list(Synthesizer(5, seed=1).generate())
+    assert list(Synthesizer(5, seed=1).generate()) != list(Synthesizer(5, seed=2).generate())
+    # a project does not depend on the number of projects
+    assert Synthesizer(5, seed=1, users=10).project(3) == Synthesizer(50, seed=1, users=10).project(3)
+
+
+@pytest.mark.parametrize("distribution, low, high", [
+    ({"distribution": "lognormal", "mu": 3.0, "sigma": 1.5, "min": 1, "max": 50}, 1, 50),
+    ({"distribution": "pareto", "alpha": 1.2, "scale": 2.0}, 2, None),
+    ({"distribution": "uniform", "min": 3, "max": 5}, 3, 5),
+    ({"distribution": "constant", "value": 7}, 7, 7),
+])
+def test_sample(distribution, low, high):
+    rng = random.Random(0)
+    values = [sample(rng, distribution) for _ in range(1000)]
+    assert min(values) >= low
+    assert high is None or max(values) <= high
+
+
+def test_sample_unknown():
+    with pytest.raises(ValueError):
+        sample(random.Random(0), {"distribution": "normal"})
+
+
+def test_project_schema():
+    projects = list(Synthesizer(30, seed=3).generate())
+    commit_counts = sorted(len(project["commits"]) for project in projects)
+    assert commit_counts[-1] > 3 * commit_counts[len(commit_counts) // 2]  # long tail
+    for project in projects:
+        assert abs(sum(project["languages"].values()) - 100) < 0.1
+        assert project["owner"]["id"] == project["namespace"]["id"]
+        commit_ids = {commit["id"] for commit in project["commits"]}
+        for mergerequest in project["mergerequests"]:
+            assert {commit["id"] for commit in mergerequest["commits"]} <= commit_ids
+        for issue in project["issues"]:
+            assert issue["milestone"] is None or issue["milestone"]["id"] in \
+                {milestone["id"] for milestone in project["milestones"]}
+        assert project["issue_statistics"]["counts"]["all"] == len(project["issues"])
+    identities = IdentityIndex.build(projects)
+    commit = projects[0]["commits"][0]
+    assert identities.lookup(commit["committer_name"], commit["committer_email"]) is not None
+
+
+def test_load_distributions(tmp_path):
+    path = tmp_path / "distributions.yaml"
+    path.write_text("distributions:\n  commits: {distribution: constant, value: 2}\nlanguages:\n  Fortran: 1\n")
+    synthesizer = Synthesizer(10)
+    synthesizer.load_distributions(str(path))
+    for project in synthesizer.generate():
+        assert len(project["commits"]) == 2
+        assert list(project["languages"]) == ["Fortran"]
+
+    path.write_text("distributions:\n  pipelines: {distribution: constant, value: 2}\n")
+    with pytest.raises(ValueError):
+        synthesizer.load_distributions(str(path))
+
+
+def test_load_distributions_bounds(tmp_path):
+    path = tmp_path / "distributions.yaml"
+    path.write_text("distributions:\n  commits: {distribution: lognormal, mu: -1, sigma: 1}\n")
+    synthesizer = Synthesizer(20)
+    synthesizer.load_distributions(str(path))
+    assert synthesizer.distributions["commits"]["min"] == 1
+    for project in synthesizer.generate():
+        assert project["commits"]
+
+
+def test_empty_repository():
+    synthesizer = Synthesizer(5, distributions={"commits": {"distribution": "constant", "value": 0, "min": 0},
+                                                "users": {"distribution": "constant", "value": 0, "min": 0},
+                                                "releases": {"distribution": "constant", "value": 2}})
+    for project in synthesizer.generate():
+        assert project["empty_repo"] and not project["commits"] and not project["contributors"]
+        assert [member["id"] for member in project["users"]] == [project["owner"]["id"]]
+        assert all(mergerequest["commits"] == [] for mergerequest in project["mergerequests"])
+        assert [release["commit"] for release in project["releases"]] == [None, None]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl.gz"])
+def test_write(tmp_path, suffix):
+    path = str(tmp_path / ("corpus" + suffix))
+    synthesizer = Synthesizer(20, seed=4)
+    synthesizer.write(path)
+    assert list(iter_projects(path)) == list(synthesizer.generate())